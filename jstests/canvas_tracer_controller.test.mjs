@@ -3300,6 +3300,30 @@ describe('TracerController.poll_for_track_end', () => {
         );
     });
 
+    test('done: sends since_frame and accumulates only the new frames', () => {
+        const movieTrackedSpy = jest.spyOn(tc, 'movie_tracked').mockImplementation(() => {});
+        fireDone({ error: false, metadata: { status: 'tracing', last_frame_tracked: 1 },
+                   frames: { 0: { markers: [] }, 1: { markers: [] } }, next_since_frame: 1 });
+        tc.poll_for_track_end();
+        expect(mockPost.mock.calls[0][1].since_frame).toBe(-1);
+        fireDone({ error: false, metadata: { status: 'tracing completed', last_frame_tracked: 2 },
+                   frames: { 2: { markers: [] } }, next_since_frame: 2 });
+        tc.poll_for_track_end();
+        expect(mockPost.mock.calls[1][1].since_frame).toBe(1);
+        expect(Object.keys(movieTrackedSpy.mock.calls[0][0].frames)).toEqual(['0', '1', '2']);
+        movieTrackedSpy.mockRestore();
+    });
+
+    test('done: next_since_frame behind since_frame drops the cleared frames', () => {
+        tc.polled_frames = { 0: { markers: [] }, 1: { markers: [] }, 2: { markers: [] } };
+        tc.polled_through_frame = 2;
+        fireDone({ error: false, metadata: { status: 'tracing', last_frame_tracked: 0 },
+                   frames: {}, next_since_frame: 0 });
+        tc.poll_for_track_end();
+        expect(Object.keys(tc.polled_frames)).toEqual(['0']);
+        expect(tc.polled_through_frame).toBe(0);
+    });
+
     test('done: error response → increments poll_error_count', () => {
         fireDone({ error: true });
         tc.poll_for_track_end();
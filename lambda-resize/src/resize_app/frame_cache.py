@@ -0,0 +1,96 @@
+"""
+frame_cache.py:
+Two-tier cache of rendered movie frames (rotated, scaled and JPEG-encoded).
+
+Entries are addressed by a digest of everything the rendered bytes depend on: the movie data URN,
+the movie version (bumped when the movie data is replaced), the rotation, the frame number and the
+maximum dimension. A change to any of them is a new key, so entries are never invalidated in place.
+Warm Lambdas serve from an in-process LRU bounded by total bytes; cold ones from S3 objects stored
+next to the movie (removed by purge_movie_frame_cache).
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
+
+from .src.app import s3_presigned
+from .src.app.constants import C
+from .src.app.odb_movie_data import read_object, write_object
+
+LOGGER = Logger(service="planttracer")
+
+
+class FrameCacheKey(NamedTuple):
+    movie_data_urn: str
+    version: int
+    rotation: int
+    frame_number: int
+    max_dimension: int
+
+    def digest(self) -> str:
+        return hashlib.sha256(json.dumps(list(self)).encode("utf-8")).hexdigest()
+
+
+class LRUByteCache:
+    """Thread-safe LRU of bytes values, evicting least recently used entries beyond max_bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> bytes | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+MEMORY_CACHE = LRUByteCache(C.FRAME_CACHE_MAX_BYTES)
+
+
+def get_or_render(key: FrameCacheKey, render: Callable[[], bytes]) -> bytes:
+    """Return the cached JPEG for key, calling render() and filling both tiers on a miss.
+    S3 write failures are logged; the rendered frame is still returned."""
+    data = MEMORY_CACHE.get(key)
+    if data is not None:
+        return data
+    if not key.movie_data_urn.startswith(f"{C.SCHEME_S3}://"):
+        data = render()
+        MEMORY_CACHE.put(key, data)
+        return data
+    urn = s3_presigned.frame_cache_urn(movie_data_urn=key.movie_data_urn, digest=key.digest())
+    data = read_object(urn)
+    if data is None:
+        data = render()
+        try:
+            write_object(urn, data)
+        except ClientError:
+            LOGGER.exception("cannot write frame cache object %s", urn)
+    MEMORY_CACHE.put(key, data)
+    return data
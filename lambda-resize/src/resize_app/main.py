@@ -28,11 +28,13 @@ from aws_lambda_powertools.event_handler import APIGatewayHttpResolver, CORSConf
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 from . import async_work
+from . import frame_cache
 from . import movie_glue
 from . import mpeg_jpeg_zip
 from . import lambda_tracing_handler
 from . import upload_event
 from .src.app.constants import (
+    C,
     __version__,
     stack_name,
     stack_parameter_overrides,
@@ -174,9 +176,11 @@ def api_process_upload():
 @app.get("/resize-api/v1/first-frame")
 def handle_first_frame() -> Any:
     """GET /api/v1/first-frame.
-    Returns the first frame (frame 0) with proper rotation.
+    Returns the first frame (frame 0), or frame_number if given, with proper rotation.
+    Rendered JPEGs are served from frame_cache when this movie version, rotation and frame were rendered before.
     :param api_key: the actual api_key
     :param movie_id: the movie_id of the movie
+    :param frame_number: optional frame to return; seeks via the movie's frame index when it has one
     Note: special values for movie_id:
     'red-0'   - a 640x480 red rectangle not rotated
     'red-90'  - a 640x480 red rectangle rotated 90 degrees
@@ -186,7 +190,8 @@ def handle_first_frame() -> Any:
 
     api_key = app.current_event.get_query_string_value(name="api_key", default_value=None)
     movie_id = app.current_event.get_query_string_value(name="movie_id", default_value=None)
-    LOGGER.info("first_frame movie_id=%s",movie_id)
+    frame_number = app.current_event.get_query_string_value(name="frame_number", default_value="0")
+    LOGGER.info("first_frame movie_id=%s frame_number=%s",movie_id,frame_number)
     match movie_id:
         case "red-0":
             data = mpeg_jpeg_zip.generate_test_jpeg(0)
@@ -198,9 +203,23 @@ def handle_first_frame() -> Any:
             data = mpeg_jpeg_zip.generate_test_jpeg(270)
         case _:
             try:
+                frame_number = int(frame_number)
+                if frame_number < 0:
+                    raise ValueError("frame_number must be >= 0")
                 obj = movie_glue.get_movie_url_and_rotation(api_key=api_key, movie_id=movie_id)
-                frame = mpeg_jpeg_zip.get_first_frame_from_url(obj.signed_url,obj.rotation)
-                data = mpeg_jpeg_zip.convert_frame_to_jpeg(frame)
+
+                def render_frame():
+                    frame_index = movie_glue.load_frame_index(obj.frame_index_urn) if frame_number else None
+                    frame = mpeg_jpeg_zip.get_first_frame_from_url(obj.signed_url, obj.rotation,
+                                                                   frame_number=frame_number,
+                                                                   frame_index=frame_index)
+                    return mpeg_jpeg_zip.convert_frame_to_jpeg(frame)
+
+                data = frame_cache.get_or_render(
+                    frame_cache.FrameCacheKey(movie_data_urn=obj.movie_data_urn, version=obj.version,
+                                              rotation=obj.rotation, frame_number=frame_number,
+                                              max_dimension=C.MOVIE_MAX_WIDTH),
+                    render_frame)
             except ValueError as e:
                 LOGGER.exception("e=%s",e)
                 return Response(status_code=403, body=str(e.args))
@@ -256,6 +275,7 @@ def process_eventbridge_event(event: Dict[str, Any]) -> Dict[str, Any]:
 @LOGGER.inject_lambda_context(log_event=False)
 def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
     """Dispatch one EventBridge asynchronous event or HTTP API request."""
-    if isinstance(event, dict) and event.get("source") in EVENTBRIDGE_SOURCES:
-        return process_eventbridge_event(event)
-    return app.resolve(event, context)
+    with movie_glue.odb.read_cache():
+        if isinstance(event, dict) and event.get("source") in EVENTBRIDGE_SOURCES:
+            return process_eventbridge_event(event)
+        return app.resolve(event, context)
@@ -4,6 +4,7 @@ Routines for providing access to the movies for the lambda
 """
 
 import os
+import struct
 import time
 from typing import NamedTuple
 from pathlib import Path
@@ -18,11 +19,10 @@ from .src.app.constants import C
 from .src.app.odb import (
     get_movie_metadata,
     get_movie_trackpoints,
-    put_frame_trackpoints,
     clear_movie_tracking_after_frame,
-    LAST_FRAME_TRACKED,
 )
-from .src.app.odb_movie_data import (write_object_from_path )
+from .src.app.odb_movie_data import (S3RangeReader, copy_object_to_path, read_object, write_object,
+                                     write_object_from_path )
 from .src.app import mp4_metadata_lib
 from .src.app import s3_presigned
 from .src.app import odb
@@ -30,11 +30,17 @@ from .src.app.odb import (
     DDBO,
     ENABLED,
     MOVIE_DATA_URN,
+    MOVIE_FRAME_INDEX_URN,
     MOVIE_ID,
     MOVIE_ROTATION,
     MOVIE_TRACED_URN,
     MOVIE_ZIPFILE_URN,
     NEEDS_RETRACING,
+    TRACED_MOVIE_GOP,
+    TRACED_MOVIE_FRAME_START,
+    TRACED_MOVIE_FRAME_END,
+    TRACED_MOVIE_STALE_FROM,
+    TRACED_AT,
     MOVIE_STATUS,
     MOVIE_STATE_READY,
     MOVIE_STATE_PROCESSING,
@@ -55,10 +61,12 @@ from .src.app.odb import (
     FPS,
     USER_ID,
     USER_NAME,
+    VERSION,
 )
 
 from . import async_work
 from . import local_queue
+from . import mp4_index
 from . import mpeg_jpeg_zip
 from . import tracer
 
@@ -69,6 +77,9 @@ class MovieInfo(NamedTuple):
     signed_url: str
     signed_zipfile_url: str | None
     rotation: int
+    frame_index_urn: str | None = None
+    movie_data_urn: str | None = None
+    version: int = 0
 
 
 class MovieDownloadInfo(NamedTuple):
@@ -322,22 +333,22 @@ def prepare_tracing_request(*, api_key: str, movie_id: str, frame_start: int,
         movie=movie, started_by_user_id=user_id,
         started_by_user_name=ddbo.get_user(user_id)[USER_NAME],
         analysis_lease_id=analysis_lease_id)
-    cleared_frames = clear_movie_tracking_after_frame(
+    trackpoint_generation = clear_movie_tracking_after_frame(
         movie_id=movie_id,
         frame_number=source_frame_number,
         frame_end=frame_end_number,
     )
     LOGGER.info(
-        "Prepared tracing request: movie_id=%s source_frame=%s frame_end=%s cleared_frames=%s",
+        "Prepared tracing request: movie_id=%s source_frame=%s frame_end=%s trackpoint_generation=%s",
         movie_id,
         source_frame_number,
         frame_end_number,
-        cleared_frames,
+        trackpoint_generation,
     )
     ddbo.put_movie_log(event_type="movie.tracing.started", movie=movie, ipaddr="lambda-resize",
                         event_id=lock.job_id)
-    ret = {"movie_id": movie_id, "frame_start": source_frame_number, "cleared_frames": cleared_frames,
-           "job_id": lock.job_id}
+    ret = {"movie_id": movie_id, "frame_start": source_frame_number,
+           "trackpoint_generation": trackpoint_generation, "job_id": lock.job_id}
     if frame_end_number is not None:
         ret["frame_end"] = frame_end_number
     return ret
@@ -365,6 +376,9 @@ def get_movie_url_and_rotation(*,api_key=None,movie_id=None) -> MovieInfo:
         signed_url=s3_presigned.make_signed_url(urn=urn, operation='get', expires=300),
         signed_zipfile_url=None,
         rotation=rotation,
+        frame_index_urn=movie.get(MOVIE_FRAME_INDEX_URN),
+        movie_data_urn=urn,
+        version=int(movie.get(VERSION) or 0),
     )
 
 
@@ -401,6 +415,52 @@ def complete_movie_upload(*, api_key: str, movie_id: str) -> UploadCompletion:
     )
 
 
+def load_frame_index(frame_index_urn: str | None) -> mp4_index.MovieFrameIndex | None:
+    """Return the stored frame index of a movie, or None if it has none or it cannot be read."""
+    if not frame_index_urn:
+        return None
+    try:
+        return mp4_index.MovieFrameIndex.model_validate_json(read_object(frame_index_urn))
+    except Exception:  # pylint: disable=broad-exception-caught
+        LOGGER.exception("cannot read frame index %s", frame_index_urn)
+        return None
+
+
+def store_frame_index(*, movie_urn: str, frame_index: mp4_index.MovieFrameIndex) -> str:
+    """Store the movie's keyframe/sample-offset index next to the movie and return its URN."""
+    frame_index_urn = s3_presigned.frame_index_urn(movie_data_urn=movie_urn)
+    write_object(frame_index_urn, frame_index.model_dump_json().encode("utf-8"))
+    return frame_index_urn
+
+
+def probe_uploaded_movie(movie_urn: str):
+    """Return (metadata, frame_index) read from the movie's moov box with ranged S3 GETs.
+    Only the box headers and the moov box are transferred, not the media data."""
+    reader = S3RangeReader(movie_urn)
+    moov = mp4_index.read_moov(reader)
+    frame_index = mp4_index.frame_index_from_moov(moov)
+    metadata = mp4_index.movie_metadata_from_moov(moov, frame_index)
+    metadata['total_bytes'] = reader.size
+    metadata['metadata_source'] = mpeg_jpeg_zip.METADATA_SOURCE_HEADER
+    LOGGER.info("probed %s: %s of %s bytes in %s requests",
+                movie_urn, reader.bytes_fetched, reader.size, reader.requests)
+    return metadata, frame_index
+
+
+def download_uploaded_movie_metadata(movie_urn: str):
+    """Return (metadata, frame_index or None) by downloading and decoding the whole movie."""
+    bucket, key = s3_presigned.parse_s3_urn(urn=movie_urn)
+    with tempfile.NamedTemporaryFile(suffix=".mov") as movie_file:
+        s3_presigned.s3_client().download_file(bucket, key, movie_file.name)
+        metadata = mpeg_jpeg_zip.extract_movie_metadata(movie_path=movie_file.name)
+        try:
+            frame_index = mp4_index.frame_index_from_path(movie_file.name)
+        except (ValueError, struct.error) as exc:
+            LOGGER.warning("cannot index movie %s: %s", movie_urn, exc)
+            frame_index = None
+    return metadata, frame_index
+
+
 def process_uploaded_movie(*, movie_id: str):
     """Extract post-upload metadata and finish the asynchronous resize phase."""
     ddbo = DDBO()
@@ -437,11 +497,15 @@ def process_uploaded_movie(*, movie_id: str):
     movie_urn = (movie.get(MOVIE_DATA_URN) or "").strip()
     if not movie_urn:
         raise ValueError("MOVIE_DATA_URN not set")
-    bucket, key = s3_presigned.parse_s3_urn(urn=movie_urn)
     t0 = time.time()
-    with tempfile.NamedTemporaryFile(suffix=".mov") as movie_file:
-        s3_presigned.s3_client().download_file(bucket, key, movie_file.name)
-        metadata = mpeg_jpeg_zip.extract_movie_metadata(movie_path=movie_file.name)
+    try:
+        metadata, frame_index = probe_uploaded_movie(movie_urn)
+    except (ValueError, struct.error) as exc:
+        LOGGER.warning("header probe failed for %s (%s); decoding the whole movie", movie_urn, exc)
+        metadata, frame_index = download_uploaded_movie_metadata(movie_urn)
+    LOGGER.info("movie_id=%s metadata_source=%s total_frames=%s duration=%s rotation=%s", movie_id,
+                metadata["metadata_source"], metadata["total_frames"], metadata["duration"], metadata["rotation"])
+    frame_index_urn = store_frame_index(movie_urn=movie_urn, frame_index=frame_index) if frame_index else None
     resized_at = int(time.time())
     updates = {
         WIDTH: metadata["width"],
@@ -452,6 +516,8 @@ def process_uploaded_movie(*, movie_id: str):
         RESIZED_AT: resized_at,
         MOVIE_STATUS: MOVIE_STATE_READY,
     }
+    if frame_index_urn:
+        updates[MOVIE_FRAME_INDEX_URN] = frame_index_urn
     ddbo.update_movie(movie_id, updates)
     completed_movie = ddbo.get_movie(movie_id)
     ddbo.put_movie_log(
@@ -481,6 +547,22 @@ def analysis_frame_height_from_movie(*, movie_url: str, rotation: int) -> int:
     return height
 
 
+def traced_movie_is_patchable(movie, *, source_frame_number, movie_traced_frame_start):
+    """True if a retrace from source_frame_number can keep the analysis zip and the traced MP4 prefix.
+
+    The traced MP4 must have been written with the current keyframe interval over the same range
+    start, must include the source frame, and no frame before the source may have been edited since.
+    """
+    stale_from = movie.get(TRACED_MOVIE_STALE_FROM)
+    traced_frame_end = movie.get(TRACED_MOVIE_FRAME_END)
+    return (bool(movie.get(MOVIE_TRACED_URN)) and bool(movie.get(MOVIE_ZIPFILE_URN))
+            and movie.get(TRACED_MOVIE_GOP) == tracer.TRACED_MOVIE_GOP
+            and movie.get(TRACED_MOVIE_FRAME_START) == movie_traced_frame_start
+            and traced_frame_end is not None
+            and movie_traced_frame_start < source_frame_number <= int(traced_frame_end)
+            and (stale_from is None or int(stale_from) >= source_frame_number))
+
+
 def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
     """Run tracing pipeline and create both zipfile and tracked mp4.
 
@@ -494,13 +576,14 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
     source_frame_number = int(frame_start)
     tracing_frame_start = first_frame_to_track(source_frame_number=source_frame_number)
     frame_end_number = None if frame_end is None else int(frame_end)
-    cleared_frames = 0
     if job_id is None:
-        cleared_frames = clear_movie_tracking_after_frame(
+        clear_movie_tracking_after_frame(
             movie_id=movie_id, frame_number=source_frame_number, frame_end=frame_end_number)
         ddbo.update_movie(movie_id, {MOVIE_STATUS: odb.MOVIE_STATE_TRACING})
-    LOGGER.info("run_tracing movie_id=%s source_frame=%s tracing_frame_start=%s frame_end=%s cleared_frames=%s",
-                movie_id, source_frame_number, tracing_frame_start, frame_end_number, cleared_frames)
+    # Starting a retrace only invalidated the superseded trackpoints; remove them here, off the request path.
+    purged_frames = odb.purge_superseded_trackpoints(movie_id=movie_id)
+    LOGGER.info("run_tracing movie_id=%s source_frame=%s tracing_frame_start=%s frame_end=%s purged_frames=%s",
+                movie_id, source_frame_number, tracing_frame_start, frame_end_number, purged_frames)
 
     movie_record = get_movie_metadata(movie_id=movie_id)
     movie_urn = movie_record.get(MOVIE_DATA_URN)
@@ -508,6 +591,7 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
         raise RuntimeError(f"movie {movie_id} has no movie data URN")
     rotation = movie_rotation(movie_record)
     movie_url = s3_presigned.make_signed_url(urn=movie_urn)
+    frame_index = load_frame_index(movie_record.get(MOVIE_FRAME_INDEX_URN))
     frame_height = analysis_frame_height_from_movie(movie_url=movie_url, rotation=rotation)
     odb.ensure_bottom_left_trackpoints(movie_id=movie_id, frame_height=frame_height)
     input_trackpoints = [Trackpoint(**tpdict) for tpdict in get_movie_trackpoints(movie_id=movie_id)]
@@ -534,13 +618,24 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
 
     movie_zipfile_path = None
     movie_traced_path = None
+    patch_traced_movie_path = None
     try:
-        with tempfile.NamedTemporaryFile(suffix=".zip", mode="wb") as tf:
-            movie_zipfile_path = Path(tf.name)
-
         with tempfile.NamedTemporaryFile(suffix=".mp4", mode="wb") as tf:
             movie_traced_path = Path(tf.name)
 
+        # A retrace keeps the analysis zip and stream-copies the unchanged traced MP4 prefix.
+        if traced_movie_is_patchable(movie_record, source_frame_number=source_frame_number,
+                                     movie_traced_frame_start=movie_traced_frame_start):
+            with tempfile.NamedTemporaryFile(suffix=".mp4", mode="wb") as tf:
+                patch_traced_movie_path = Path(tf.name)
+            copy_object_to_path(movie_record[MOVIE_TRACED_URN], str(patch_traced_movie_path))
+            if not patch_traced_movie_path.exists():
+                patch_traced_movie_path = None
+        if patch_traced_movie_path is None:
+            with tempfile.NamedTemporaryFile(suffix=".zip", mode="wb") as tf:
+                movie_zipfile_path = Path(tf.name)
+        LOGGER.info("run_tracing movie_id=%s patch_traced_movie=%s", movie_id, patch_traced_movie_path is not None)
+
         def tracer_callback(obj:tracer.TracerCallbackArg):
             frame_trackpoints = obj.frame_trackpoints or []
             LOGGER.info(
@@ -553,17 +648,13 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
                 len(frame_trackpoints),
                 [trackpoint.label for trackpoint in frame_trackpoints],
             )
-            if job_id:
-                ddbo.heartbeat_movie_trace_lock(movie_id=movie_id, job_id=job_id)
             if obj.frame_trackpoints and (frame_end_number is None or obj.frame_number <= frame_end_number):
                 frame_trackpoints = odb.flip_trackpoints_y(obj.frame_trackpoints, frame_height)
-                ddbo.update_movie(
-                    movie_id,
-                    {LAST_FRAME_TRACKED: obj.frame_number},
-                    touch_activity=False,
-                )
-                put_frame_trackpoints(movie_id=movie_id, frame_number=obj.frame_number, trackpoints=frame_trackpoints)
+                trackpoint_writer.put(frame_number=obj.frame_number, trackpoints=frame_trackpoints)
+            else:
+                trackpoint_writer.flush_if_due()
 
+        trackpoint_writer = odb.FrameTrackpointWriter(movie_id=movie_id, job_id=job_id)
 
         trackpoints = tracer.trace_movie_v2(movie_url = movie_url,
                                             frame_start = tracing_frame_start,
@@ -577,12 +668,21 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
                                             ),
                                             rotation = rotation,
                                             callback = tracer_callback,
-                                            comment = research_comment )
+                                            comment = research_comment,
+                                            patch_traced_movie_path = patch_traced_movie_path,
+                                            frame_index = frame_index )
+        trackpoint_writer.flush()
+        if frame_end_number is not None:
+            # Frames after frame_end kept their trackpoints; move the frontier back past them.
+            odb.refresh_last_frame_tracked(movie_id=movie_id)
 
         # Upload the zipfile and the traced movie
         total_frames = int(movie_record.get(TOTAL_FRAMES) or max((tp.frame_number for tp in trackpoints)) + 1)
-        movie_zipfile_urn = s3_presigned.analysis_zip_urn(movie_data_urn=movie_urn)
-        write_object_from_path(urn=movie_zipfile_urn, path=movie_zipfile_path)
+        if movie_zipfile_path is None:
+            movie_zipfile_urn = movie_record[MOVIE_ZIPFILE_URN]
+        else:
+            movie_zipfile_urn = s3_presigned.analysis_zip_urn(movie_data_urn=movie_urn)
+            write_object_from_path(urn=movie_zipfile_urn, path=movie_zipfile_path)
 
         # Best-effort snapshot of the capture interval into the traced MP4. DynamoDB remains
         # authoritative; later edits update only the DB (see docs/Development/MOVIE_METADATA.rst).
@@ -600,7 +700,13 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
         # note: should we update width, height and fps?
         updates = {TOTAL_FRAMES: total_frames, MOVIE_STATUS: MOVIE_STATE_TRACING_COMPLETED,
                    NEEDS_RETRACING: 0, MOVIE_TRACED_URN: movie_traced_urn,
-                   MOVIE_ZIPFILE_URN: movie_zipfile_urn}
+                   MOVIE_ZIPFILE_URN: movie_zipfile_urn,
+                   TRACED_MOVIE_GOP: tracer.TRACED_MOVIE_GOP,
+                   TRACED_MOVIE_FRAME_START: movie_traced_frame_start,
+                   TRACED_MOVIE_FRAME_END: (total_frames - 1 if movie_traced_frame_end is None
+                                            else min(total_frames - 1, movie_traced_frame_end)),
+                   TRACED_MOVIE_STALE_FROM: None,
+                   TRACED_AT: int(time.time())}
         if job_id:
             ddbo.finish_movie_trace(movie_id=movie_id, job_id=job_id, updates=updates)
         else:
@@ -631,3 +737,5 @@ def run_tracing(*, movie_id, frame_start, frame_end=None, job_id=None):
             movie_zipfile_path.unlink()
         if movie_traced_path and movie_traced_path.exists():
             movie_traced_path.unlink()
+        if patch_traced_movie_path and patch_traced_movie_path.exists():
+            patch_traced_movie_path.unlink()
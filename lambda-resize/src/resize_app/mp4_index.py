@@ -0,0 +1,284 @@
+"""
+mp4_index.py:
+Frame index for MP4/MOV movies, read from the video track's sample tables (no decoding).
+
+The index maps each frame number (presentation order, as OpenCV numbers frames) to the
+byte offset, size and presentation timestamp of its sample, and lists the keyframes.
+process_uploaded_movie stores it as a JSON sidecar next to the movie so that single-frame
+fetches and ranged retraces can seek to the nearest keyframe instead of decoding from frame 0.
+"""
+
+import bisect
+import math
+import struct
+from typing import BinaryIO, NamedTuple
+
+import numpy as np
+from pydantic import BaseModel
+
+BOX_HEADER = struct.Struct(">I4s")
+BOX_LARGESIZE = struct.Struct(">Q")
+HANDLER_VIDEO = b"vide"
+
+
+class Mp4IndexError(ValueError):
+    """The movie has no parseable video track."""
+
+
+class VideoTrack(NamedTuple):
+    """Where the first video track's headers and sample tables are in a moov payload."""
+
+    timescale: int
+    edit: tuple[int, int | None] | None
+    tkhd: int | None
+    boxes: dict[bytes, int]
+
+
+class MovieFrameIndex(BaseModel):
+    """Per-frame sample table of a movie's video track, in presentation order."""
+
+    timescale: int
+    pts: list[int]
+    offsets: list[int]
+    sizes: list[int]
+    keyframes: list[int]
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts)
+
+    def keyframe_at_or_before(self, frame_number: int) -> int:
+        """Return the last keyframe at or before frame_number (the frame to seek to)."""
+        if not 0 <= frame_number < self.frame_count:
+            raise ValueError(f"invalid frame_number {frame_number}")
+        i = bisect.bisect_right(self.keyframes, frame_number)
+        return self.keyframes[i - 1] if i else 0
+
+
+def iter_boxes(data, start: int, end: int):
+    """Yield (kind, payload_start, box_end) for the boxes in data[start:end]."""
+    pos = start
+    while pos + BOX_HEADER.size <= end:
+        size, kind = BOX_HEADER.unpack_from(data, pos)
+        header_size = BOX_HEADER.size
+        if size == 1:
+            (size,) = BOX_LARGESIZE.unpack_from(data, pos + header_size)
+            header_size += BOX_LARGESIZE.size
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise Mp4IndexError(f"corrupt {kind!r} box at {pos}")
+        yield kind, pos + header_size, pos + size
+        pos += size
+
+
+def find_box(data, start: int, end: int, kind: bytes):
+    """Return (payload_start, box_end) of the first child box of kind, or None."""
+    for child_kind, payload_start, box_end in iter_boxes(data, start, end):
+        if child_kind == kind:
+            return payload_start, box_end
+    return None
+
+
+def read_moov(f: BinaryIO) -> bytes:
+    """Return the payload of the top-level moov box, reading only box headers before it."""
+    f.seek(0, 2)
+    file_size = f.tell()
+    pos = 0
+    while pos + BOX_HEADER.size <= file_size:
+        f.seek(pos)
+        header = f.read(BOX_HEADER.size + BOX_LARGESIZE.size)
+        size, kind = BOX_HEADER.unpack_from(header)
+        header_size = BOX_HEADER.size
+        if size == 1:
+            (size,) = BOX_LARGESIZE.unpack_from(header, header_size)
+            header_size += BOX_LARGESIZE.size
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            raise Mp4IndexError(f"corrupt {kind!r} box at {pos}")
+        if kind == b"moov":
+            f.seek(pos + header_size)
+            return f.read(size - header_size)
+        pos += size
+    raise Mp4IndexError("no moov box")
+
+
+def _full_box_table(data, start, dtype, columns=1, count_offset=4):
+    """Return the big-endian entry table of a full box whose entry count is at count_offset."""
+    (count,) = struct.unpack_from(">I", data, start + count_offset)
+    table_start = start + count_offset + 4
+    table = np.frombuffer(data, dtype=dtype, count=count * columns, offset=table_start)
+    return table.astype(np.int64).reshape(count, columns) if columns > 1 else table.astype(np.int64)
+
+
+def _timescale(data, payload_start: int) -> int:
+    """Return the timescale of an mvhd or mdhd payload."""
+    version = data[payload_start]
+    (timescale,) = struct.unpack_from(">I", data, payload_start + (20 if version == 1 else 12))
+    return timescale
+
+
+def _edit_window(data, edts, movie_timescale: int, media_timescale: int):
+    """Return the (start, end) media time presented by the first non-empty edit, or None."""
+    elst = find_box(data, *edts, b"elst") if edts else None
+    if elst is None:
+        return None
+    version = data[elst[0]]
+    entry = struct.Struct(">Qqi" if version == 1 else ">Iii")
+    (count,) = struct.unpack_from(">I", data, elst[0] + 4)
+    for i in range(count):
+        segment_duration, media_time, _rate = entry.unpack_from(data, elst[0] + 8 + i * entry.size)
+        if media_time >= 0:
+            if not segment_duration:
+                return media_time, None
+            return media_time, media_time + segment_duration * media_timescale // movie_timescale
+    return None
+
+
+def video_track(moov: bytes) -> VideoTrack:
+    """Return the first video track of a moov payload."""
+    mvhd = find_box(moov, 0, len(moov), b"mvhd")
+    for kind, trak_start, trak_end in iter_boxes(moov, 0, len(moov)):
+        if kind != b"trak":
+            continue
+        mdia = find_box(moov, trak_start, trak_end, b"mdia")
+        if mdia is None:
+            continue
+        hdlr = find_box(moov, *mdia, b"hdlr")
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != HANDLER_VIDEO:
+            continue
+        mdhd = find_box(moov, *mdia, b"mdhd")
+        minf = find_box(moov, *mdia, b"minf")
+        stbl = find_box(moov, *minf, b"stbl") if minf else None
+        if mdhd is None or stbl is None:
+            raise Mp4IndexError("video track has no mdhd/stbl")
+        timescale = _timescale(moov, mdhd[0])
+        edit = None
+        if mvhd is not None:
+            edit = _edit_window(moov, find_box(moov, trak_start, trak_end, b"edts"),
+                                _timescale(moov, mvhd[0]), timescale)
+        tkhd = find_box(moov, trak_start, trak_end, b"tkhd")
+        boxes = {child_kind: payload_start
+                 for child_kind, payload_start, _ in iter_boxes(moov, *stbl)}
+        return VideoTrack(timescale=timescale, edit=edit, tkhd=tkhd[0] if tkhd else None, boxes=boxes)
+    raise Mp4IndexError("no video track")
+
+
+def frame_index_from_moov(moov: bytes) -> MovieFrameIndex:
+    """Build the frame index from a moov payload.
+
+    Samples outside the track's edit list are not presented (OpenCV never returns them),
+    so they are left out of the frame numbering.
+    """
+    track = video_track(moov)
+    boxes = track.boxes
+    data = moov
+    for required in (b"stts", b"stsz", b"stsc"):
+        if required not in boxes:
+            raise Mp4IndexError(f"video track has no {required.decode()}")
+
+    (sample_size, sample_count) = struct.unpack_from(">II", data, boxes[b"stsz"] + 4)
+    if sample_size:
+        sizes = np.full(sample_count, sample_size, dtype=np.int64)
+    else:
+        sizes = _full_box_table(data, boxes[b"stsz"], ">u4", count_offset=8)
+
+    stts = _full_box_table(data, boxes[b"stts"], ">u4", columns=2)
+    deltas = np.repeat(stts[:, 1], stts[:, 0])[:sample_count]
+    pts = np.cumsum(deltas) - deltas
+    if b"ctts" in boxes:
+        # QuickTime writes negative composition offsets in version 0 boxes too.
+        ctts = _full_box_table(data, boxes[b"ctts"], ">i4", columns=2)
+        pts = pts + np.repeat(ctts[:, 1], ctts[:, 0])[:sample_count]
+
+    if b"stco" in boxes:
+        chunk_offsets = _full_box_table(data, boxes[b"stco"], ">u4")
+    elif b"co64" in boxes:
+        chunk_offsets = _full_box_table(data, boxes[b"co64"], ">u8")
+    else:
+        raise Mp4IndexError("video track has no stco/co64")
+    stsc = _full_box_table(data, boxes[b"stsc"], ">u4", columns=3)
+    first_chunks = np.append(stsc[:, 0] - 1, len(chunk_offsets))
+    samples_per_chunk = np.repeat(stsc[:, 1], np.diff(first_chunks))
+    sample_chunk = np.repeat(np.arange(len(chunk_offsets)), samples_per_chunk)[:sample_count]
+    if len(sample_chunk) != sample_count or len(pts) != sample_count:
+        raise Mp4IndexError("sample tables disagree on the sample count")
+    chunk_first_sample = np.cumsum(samples_per_chunk) - samples_per_chunk
+    size_prefix = np.cumsum(sizes) - sizes
+    offsets = (chunk_offsets[sample_chunk]
+               + size_prefix - size_prefix[np.minimum(chunk_first_sample[sample_chunk], sample_count - 1)])
+
+    is_keyframe = np.ones(sample_count, dtype=bool)
+    if b"stss" in boxes:
+        sync_samples = _full_box_table(data, boxes[b"stss"], ">u4") - 1
+        is_keyframe[:] = False
+        is_keyframe[sync_samples[sync_samples < sample_count]] = True
+
+    # Frames are numbered in presentation order; samples are stored in decode order.
+    order = np.argsort(pts, kind="stable")
+    if track.edit is not None:
+        edit_start, edit_end = track.edit
+        presented = pts[order] >= edit_start
+        if edit_end is not None:
+            presented &= pts[order] < edit_end
+        order = order[presented]
+
+    return MovieFrameIndex(
+        timescale=track.timescale,
+        pts=pts[order].tolist(),
+        offsets=offsets[order].tolist(),
+        sizes=sizes[order].tolist(),
+        keyframes=np.flatnonzero(is_keyframe[order]).tolist(),
+    )
+
+
+def rotation_from_tkhd(moov: bytes, tkhd: int | None) -> int:
+    """Return the display rotation (0, 90, 180 or 270) from a tkhd transformation matrix."""
+    if tkhd is None:
+        return 0
+    matrix_start = tkhd + (52 if moov[tkhd] == 1 else 40)
+    a, b = struct.unpack_from(">ii", moov, matrix_start)
+    return round(math.degrees(math.atan2(b, a)) / 90) * 90 % 360
+
+
+def movie_metadata_from_moov(moov: bytes, frame_index: MovieFrameIndex | None = None) -> dict:
+    """Return the frame count, dimensions, fps, duration and rotation of the video track from the
+    moov payload alone. Width and height are of the displayed (rotated) frame, as OpenCV reports
+    them; rotation is clockwise degrees, as OpenCV's CAP_PROP_ORIENTATION_META.
+    Pass frame_index if the caller has already built it from this moov, so the sample tables
+    are not parsed twice."""
+    track = video_track(moov)
+    if frame_index is None:
+        frame_index = frame_index_from_moov(moov)
+    if b"stsd" not in track.boxes:
+        raise Mp4IndexError("video track has no stsd")
+    # stsd: version/flags, entry count, then the first VisualSampleEntry box (8-byte header).
+    width, height = struct.unpack_from(">HH", moov, track.boxes[b"stsd"] + 8 + 8 + 24)
+    if not (frame_index.frame_count and width and height and track.timescale):
+        raise Mp4IndexError("video track has no frames or no dimensions")
+    rotation = rotation_from_tkhd(moov, track.tkhd)
+    if rotation % 180:
+        width, height = height, width
+    # The nominal rate is the most common sample duration, as ffmpeg guesses r_frame_rate.
+    stts = _full_box_table(moov, track.boxes[b"stts"], ">u4", columns=2)
+    frame_duration = int(stts[np.argmax(stts[:, 0]), 1])
+    return {
+        'total_frames': frame_index.frame_count,
+        'width': width,
+        'height': height,
+        'fps': track.timescale / frame_duration if frame_duration else 0.0,
+        'duration': (frame_index.pts[-1] - frame_index.pts[0] + frame_duration) / track.timescale,
+        'rotation': rotation,
+    }
+
+
+def read_frame_index(f: BinaryIO) -> MovieFrameIndex:
+    """Build the frame index from a seekable binary file object."""
+    return frame_index_from_moov(read_moov(f))
+
+
+def frame_index_from_path(path: str) -> MovieFrameIndex:
+    """Build the frame index of a local movie file."""
+    with open(path, "rb") as f:
+        return read_frame_index(f)
@@ -5,7 +5,8 @@ Routines for ripping mpegs out of jepgs and making zip files
 
 import tempfile
 import os
-from contextlib import closing
+import struct
+from contextlib import closing, contextmanager
 from typing import Any, TypeAlias,Generator
 import io
 from PIL import Image, ImageDraw, ImageFont
@@ -14,11 +15,15 @@ import numpy as np
 # pylint: disable=no-member  # cv2 exposes C extension members pylint cannot see
 
 from .src.app.constants import C
+from .mp4_index import MovieFrameIndex, movie_metadata_from_moov, read_moov
 
 # Just a label for clarity
 Jpeg: TypeAlias = bytes
 ImgArray: TypeAlias = np.ndarray
 
+METADATA_SOURCE_HEADER = 'header'   # read from the MP4 sample tables
+METADATA_SOURCE_DECODE = 'decode'   # read by OpenCV, counting frames if the container has no count
+
 
 ################################################################
 ## jpeg generation
@@ -128,6 +133,24 @@ def resize_jpeg_to_fit( jpeg_bytes:Jpeg, max_width:int, max_height:int, quality=
 ##
 
 def extract_movie_metadata(*, movie_path:str, get_frame_count=True):
+    """Get movie metadata from a local file path without decoding it.
+    MP4/MOV metadata comes from the video track's sample tables (see mp4_index.movie_metadata_from_moov),
+    which give an exact frame count even when the container has no frame-count field.
+    Containers that cannot be parsed fall back to decode_movie_metadata.
+    'metadata_source' reports which path was used."""
+    try:
+        with open(movie_path, 'rb') as f:
+            metadata = movie_metadata_from_moov(read_moov(f))
+    except (ValueError, struct.error):
+        return decode_movie_metadata(movie_path=movie_path, get_frame_count=get_frame_count)
+    if not get_frame_count:
+        metadata['total_frames'] = None
+    metadata['total_bytes'] = os.path.getsize(movie_path)
+    metadata['metadata_source'] = METADATA_SOURCE_HEADER
+    return metadata
+
+
+def decode_movie_metadata(*, movie_path:str, get_frame_count=True):
     """Use OpenCV to get movie metadata from a local file path.
     Width, height, fps and usually frame count come from container/stream metadata.
     Only if frame count is missing do we fall back to counting frames."""
@@ -136,6 +159,7 @@ def extract_movie_metadata(*, movie_path:str, get_frame_count=True):
         width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
         fps    = cap.get(cv2.CAP_PROP_FPS)
+        rotation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META) or 0)
         frame_count = None
         if get_frame_count:
             frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
@@ -160,43 +184,88 @@ def extract_movie_metadata(*, movie_path:str, get_frame_count=True):
             'width': width,
             'height': height,
             'fps': fps,
+            'duration': frame_count / fps if frame_count and fps else None,
+            'rotation': rotation,
+            'metadata_source': METADATA_SOURCE_DECODE,
         }
     finally:
         cap.release()
 
 
-def extract_frame(*, movie_data, frame_number, fmt):
-    """Extract a single frame from movie data using CV2. This is not an efficient approach to read the entire movie.
-    Perhaps  make frame_number an array of frames to allow multiple frames to be extracted, with a callback?
+@contextmanager
+def open_movie_data(movie_data: bytes):
+    """Context manager yielding a cv2.VideoCapture that decodes movie_data from memory.
+    OpenCV >= 4.11 reads from a Python stream; older builds fall back to a temporary file
+    that is kept open until the capture is released.
+    """
+    # The capture does not keep the stream alive; hold it until release().
+    stream = io.BytesIO(movie_data)
+    try:
+        cap = cv2.VideoCapture(stream, cv2.CAP_FFMPEG, [])
+    except (cv2.error, TypeError):
+        cap = None
+    if cap is not None:
+        try:
+            if not cap.isOpened():
+                raise ValueError("cannot decode movie data")
+            yield cap
+        finally:
+            cap.release()
+        return
+    with tempfile.NamedTemporaryFile(suffix=".mov") as tf:
+        tf.write(movie_data)
+        tf.flush()
+        cap = cv2.VideoCapture(tf.name)
+        try:
+            if not cap.isOpened():
+                raise ValueError("cannot decode movie data")
+            yield cap
+        finally:
+            cap.release()
+
+
+def seek_to_frame(cap, frame_number: int, frame_index: MovieFrameIndex | None = None) -> None:
+    """Position cap so that the next read() returns frame_number.
+    With a frame index, seek to the keyframe at or before frame_number and grab forward from it,
+    so only the frames of one GOP are decoded and out-of-range frames fail before any decoding.
+    Without one, CV2 seeks by its own frame-number estimate.
+    """
+    seek_frame = frame_number
+    if frame_index is not None:
+        seek_frame = frame_index.keyframe_at_or_before(frame_number)
+    if seek_frame > 0 and not cap.set(cv2.CAP_PROP_POS_FRAMES, seek_frame):
+        raise ValueError(f"cannot seek to frame {seek_frame}")
+    for _ in range(frame_number - seek_frame):
+        if not cap.grab():
+            raise ValueError(f"invalid frame_number {frame_number}")
+
+
+def extract_frame(*, movie_data, frame_number, fmt, frame_index: MovieFrameIndex | None = None):
+    """Extract a single frame from movie data using CV2.
     :param: movie_data - binary object of data
     :param: frame_number - frame to extract
     :param: fmt - format wanted. CV2-return a CV2 image; 'jpeg' - return a jpeg image as a byte array.
+    :param: frame_index - if provided, seek to the preceding keyframe rather than decoding from frame 0.
     """
     assert fmt in ['CV2', 'jpeg']
     assert movie_data is not None
-    # CV2's VideoCapture method does not support reading from a memory buffer.
-    # So perhaps we will change this to use a named pipe
-    with tempfile.NamedTemporaryFile(mode='ab') as tf:
-        tf.write(movie_data)
-        tf.flush()
-        cap = cv2.VideoCapture(tf.name)
-
-    # skip to frame_number (first frame is #0)
-    for _ in range(frame_number + 1):
+    with open_movie_data(movie_data) as cap:
+        # skip to frame_number (first frame is #0)
+        seek_to_frame(cap, frame_number, frame_index)
         ret, frame = cap.read()
-        if not ret:
-            raise ValueError(f"invalid frame_number {frame_number}")
-        match fmt:
-            case 'CV2':
-                return frame
-            case 'jpeg':
-                return convert_frame_to_jpeg(frame)
-            case _:
-                raise ValueError("Invalid fmt: " + fmt)
-    raise ValueError(f"invalid frame_number {frame_number}")
+    if not ret:
+        raise ValueError(f"invalid frame_number {frame_number}")
+    match fmt:
+        case 'CV2':
+            return frame
+        case 'jpeg':
+            return convert_frame_to_jpeg(frame)
+        case _:
+            raise ValueError("Invalid fmt: " + fmt)
 
 
-def get_frames_from_url(url: str, rotation: int) -> Generator[Any, None, None]:
+def get_frames_from_url(url: str, rotation: int, frame_start: int = 0,
+                        frame_index: MovieFrameIndex | None = None) -> Generator[Any, None, None]:
     """
     Generator
     Fetches the first frame of a video from a URL, applies rotate,
@@ -204,12 +273,16 @@ def get_frames_from_url(url: str, rotation: int) -> Generator[Any, None, None]:
 
     :param url: The presigned S3 URL (or any accessible HTTP video URL).
     :param rotate: 0, 90, 180, or 270.
+    :param frame_start: first frame to yield. CV2 seeks to the preceding keyframe and decodes forward.
+    :param frame_index: the movie's frame index, if known; used to find that keyframe (see seek_to_frame).
     :yield: OpenCV image frames (ndarray)
     """
 
     # 1. Read the first frame from the URL
     cap = cv2.VideoCapture(url)
     try:
+        if frame_start > 0:
+            seek_to_frame(cap, frame_start, frame_index)
         while True:
             success, frame = cap.read()
             if not success or frame is None:
@@ -242,13 +315,15 @@ def get_frames_from_url(url: str, rotation: int) -> Generator[Any, None, None]:
 
 
 
-def get_first_frame_from_url(url: str, rotation: int) -> np.ndarray:
+def get_first_frame_from_url(url: str, rotation: int, frame_number: int = 0,
+                             frame_index: MovieFrameIndex | None = None) -> np.ndarray:
     """
-    Safely grabs the first frame using a context manager and a for loop.
+    Safely grabs the first frame (or frame_number) using a context manager and a for loop.
     Returns it as an np.ndarray which must be converted into something.
     """
     # closing() turns the generator into a context manager
-    with closing(get_frames_from_url(url, rotation)) as frame_gen:
+    with closing(get_frames_from_url(url, rotation, frame_start=frame_number,
+                                     frame_index=frame_index)) as frame_gen:
 
         # The for loop elegantly yields the first item
         for frame in frame_gen:
@@ -257,4 +332,4 @@ def get_first_frame_from_url(url: str, rotation: int) -> np.ndarray:
             return frame
 
     # If the loop never runs (video was empty/broken), it falls through to here
-    raise ValueError(f"First frame of {url} rotation {rotation} not available")
+    raise ValueError(f"Frame {frame_number} of {url} rotation {rotation} not available")
@@ -17,24 +17,32 @@ Uses imageio to write tracked movie, which does not have H.264 licensing issues
 """
 
 # pylint: disable=no-member
+from concurrent.futures import ThreadPoolExecutor
 from typing import List,Optional,NamedTuple
+import contextlib
 import hashlib
 import json
 import argparse
 import subprocess
 import logging
+import os
+import queue
 import re
+import threading
 import zipfile
+from decimal import Decimal, ROUND_HALF_UP
 from pathlib import Path
 
 import cv2
 import imageio
+import imageio_ffmpeg
 import numpy as np
 
 from .src.app.schema import Trackpoint
 from .src.app import paths
 from .src.app.constants import C
 from .mpeg_jpeg_zip import convert_frame_to_jpeg,add_jpeg_comment,get_frames_from_url
+from .mp4_index import MovieFrameIndex
 
 
 logging.basicConfig(format=C.LOGGING_CONFIG, level=C.LOGGING_LEVEL)
@@ -62,6 +70,11 @@ CSS_COLORS_BGR = {
     "magenta": MAGENTA,
 }
 MIN_MOVIE_BYTES = 10
+TRACED_MOVIE_GOP = 30      # keyframe interval of traced MP4s, so retraces can reuse their prefix
+TRACED_MOVIE_GOP_PARAMS = ['-g', str(TRACED_MOVIE_GOP), '-keyint_min', str(TRACED_MOVIE_GOP),
+                           '-sc_threshold', '0']
+PIPELINE_DEPTH = 16        # frames in flight per pipeline stage
+PIPELINE_WORKERS = max(1, (os.cpu_count() or 1) - 1)
 RULER_LABEL_RE = re.compile(r"^Ruler\s*\d+mm$")
 
 ## JPEG support
@@ -212,6 +225,176 @@ def cv2_trace_frame(*, gray_frame_prev:np.ndarray, gray_frame:np.ndarray, trackp
     return trackpoints_out
 
 
+def trackpoint_coordinate(value) -> Decimal:
+    """Round a coordinate the way Trackpoint's validator does, without re-validating the model."""
+    return Decimal(str(value)).quantize(Decimal("0.1"), rounding=ROUND_HALF_UP)
+
+
+class MarkerTracker:
+    """Lucas-Kanade tracking core that keeps every marker of a run in one array.
+
+    positions is a contiguous float32 (frames, markers, 2) array whose row 0 holds the
+    seed trackpoints and row i the positions at seed frame + i. Markers that cv2 loses,
+    or every marker when cv2 fails, are carried forward from the previous row. Trackpoint
+    objects are only built by trackpoints(), at the persistence/callback boundary.
+    """
+    WIN_SIZE = (15, 15)
+    MAX_LEVEL = 2
+    CRITERIA = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+
+    def __init__(self, *, trackpoints:List[Trackpoint], frame_number:int, frame_count:int | None = None):
+        """:param trackpoints: seed trackpoints at frame_number
+        :param frame_count: optional number of frames that will be tracked, to size the array once.
+        """
+        self.templates = list(trackpoints)
+        self.frame_number = frame_number
+        capacity = 1 + (frame_count if frame_count is not None else 64)
+        self.positions = np.empty((capacity, len(self.templates), 2), dtype=np.float32)
+        self.status = np.ones((capacity, len(self.templates)), dtype=bool)
+        self.positions[0] = [[float(tp.x), float(tp.y)] for tp in self.templates]
+        self.frames = 1
+
+    def _grow(self):
+        self.positions = np.concatenate((self.positions, np.empty_like(self.positions)))
+        self.status = np.concatenate((self.status, np.ones_like(self.status)))
+
+    def track(self, *, gray_frame_prev:np.ndarray, gray_frame:np.ndarray) -> np.ndarray:
+        """Track every marker from gray_frame_prev into gray_frame. Returns the new (markers, 2) row."""
+        if self.frames == len(self.positions):
+            self._grow()
+        previous = self.positions[self.frames - 1]
+        current = self.positions[self.frames]
+        current[:] = previous
+        try:
+            point_array_out, status_array, _err = cv2.calcOpticalFlowPyrLK(
+                gray_frame_prev, gray_frame, previous, None,
+                winSize=self.WIN_SIZE, maxLevel=self.MAX_LEVEL, criteria=self.CRITERIA
+            )
+            found = status_array.reshape(-1) == 1
+            current[found] = point_array_out.reshape(-1, 2)[found]
+            self.status[self.frames] = found
+        except cv2.error as e:  # pylint: disable=catching-non-exception
+            logger.error("Optical flow failed: %s",e)
+            self.status[self.frames] = False
+        self.frames += 1
+        self.frame_number += 1
+        return current
+
+    def trackpoints(self, row:int = -1) -> List[Trackpoint]:
+        """Return the Trackpoint objects for a tracked row (default: the latest frame)."""
+        row = range(self.frames)[row]
+        frame_number = self.frame_number - (self.frames - 1 - row)
+        return [template.model_copy(update={'x': trackpoint_coordinate(x),
+                                            'y': trackpoint_coordinate(y),
+                                            'frame_number': frame_number})
+                for (template, (x, y)) in zip(self.templates, self.positions[row])]
+
+
+class OrderedStage:
+    """Pipeline stage: run work() on a thread pool and pass results to sink() in submission order.
+
+    submit() blocks once depth results are pending, so a slow stage applies back-pressure to
+    the tracing loop instead of buffering the movie. Leaving the context waits for the sink;
+    an error raised by work() or sink() is re-raised from submit() or on exit.
+    """
+
+    def __init__(self, *, work, sink, workers:int = PIPELINE_WORKERS, depth:int = PIPELINE_DEPTH):
+        self.work = work
+        self.sink = sink
+        self.error = None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = queue.Queue(maxsize=depth)
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.pending.put(None)
+        self.thread.join()
+        self.executor.shutdown()
+        if exc_type is None and self.error is not None:
+            raise self.error
+
+    def _drain(self):
+        while (future := self.pending.get()) is not None:
+            if self.error is not None:
+                future.cancel()
+                continue
+            try:
+                self.sink(future.result())
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.error = e
+
+    def submit(self, *args):
+        if self.error is not None:
+            raise self.error
+        self.pending.put(self.executor.submit(self.work, *args))
+
+
+def prefetch_frames(frames, depth:int = PIPELINE_DEPTH):
+    """Generator: decode frames on a background thread, yielding them in order."""
+    frame_queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                frame_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode():
+        try:
+            for frame in frames:
+                if not put(frame):
+                    return
+            put(done)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            put(e)
+        finally:
+            if hasattr(frames, 'close'):
+                frames.close()
+
+    thread = threading.Thread(target=decode, daemon=True)
+    thread.start()
+    try:
+        while (item := frame_queue.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def splice_traced_movie(*, prefix_path:Path, prefix_frames:int, suffix_path:Path, output_path:Path, comment):
+    """Write output_path as the first prefix_frames frames of prefix_path followed by suffix_path.
+
+    Both inputs are stream-copied, so prefix_frames must fall on a keyframe of prefix_path
+    (a multiple of TRACED_MOVIE_GOP) and the suffix must use the same encoder settings.
+    """
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    prefix_cut_path = Path(suffix_path).with_suffix('.prefix.mp4')
+    concat_list_path = Path(suffix_path).with_suffix('.txt')
+    try:
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', str(prefix_path),
+                        '-frames:v', str(prefix_frames), '-an', '-c', 'copy', str(prefix_cut_path)],
+                       check=True)
+        concat_list_path.write_text(f"file '{prefix_cut_path.resolve()}'\nfile '{Path(suffix_path).resolve()}'\n")
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', str(concat_list_path), '-c', 'copy', '-metadata', f'comment={comment}',
+                        '-f', 'mp4', str(output_path)],
+                       check=True)
+    finally:
+        for path in (prefix_cut_path, concat_list_path, Path(suffix_path)):
+            path.unlink(missing_ok=True)
+
+
 def cv2_label_frame(*,
                     frame:np.ndarray,
                     trackpoints:List[Trackpoint],
@@ -261,7 +444,8 @@ def prototype_callback(obj:TracerCallbackArg):
     """Demo"""
     logging.debug("frame_number=%s len(frame_data)=%s frame_trackpoints=%s", obj.frame_number, len(obj.frame_data), obj.frame_trackpoints)
 
-def trace_movie_v2(*, movie_url,
+# Keyword-only; every argument past trackpoints is an optional output or speed-up.
+def trace_movie_v2(*, movie_url,  # pylint: disable=too-many-arguments
                    frame_start:int,
                    frame_end:int | None = None,
                    trackpoints:List[Trackpoint],
@@ -270,7 +454,9 @@ def trace_movie_v2(*, movie_url,
                    movie_traced_frame_range:TracedMovieFrameRange | None = None,
                    rotation=0,
                    callback = prototype_callback,
-                   comment="Processed by PlantTracer AWS Lambda"):
+                   comment="Processed by PlantTracer AWS Lambda",
+                   patch_traced_movie_path:Optional[Path] = None,
+                   frame_index:Optional[MovieFrameIndex] = None):
     """
     Trace from frame_start to frame_end, or to the end of movie when frame_end is not provided.
     If frame_start==0, the movie is untracked. frame_start is set to 1.
@@ -282,6 +468,12 @@ def trace_movie_v2(*, movie_url,
     :param movie_zipfile_path: If provided, where the movie_zipfile of scaled, rotated images goes.
     :param movie_traced_frame_range: inclusive frame range to include in the traced MP4.
     :param rotation: the rotation (in degrees) to apply to the movie before scaling
+    :param patch_traced_movie_path: an earlier traced MP4 of the same range start, written by this
+           function. Its frames before the last keyframe at or before frame_start-1 are stream-copied
+           into movie_traced_path instead of being decoded, labelled and re-encoded.
+    :param frame_index: the movie's MovieFrameIndex, if known, so a ranged decode seeks to its keyframe.
+
+    Decoding starts at the first frame an output needs, so callbacks may begin after frame 0.
     """
 
     # track from frame frame_start+1 to end using data from frame_start
@@ -313,76 +505,130 @@ def trace_movie_v2(*, movie_url,
     if not any((tp for tp in trackpoints if tp.frame_number == frame_start-1)):
         raise ValueError(f"len(trackpoints)={len(trackpoints)} but no tracked points for frame {frame_start-1}")
 
-    # Check to see if we are making a movie_zipfile
-    zf = None
+    # Decode only the frames some output needs: the zip needs every frame, the traced MP4 its
+    # range (or the part after the reused keyframe), and tracking the source frame frame_start-1.
+    decode_start = frame_start - 1
+    traced_movie_copied_frames = 0
+    if movie_traced_path is not None:
+        traced_movie_start = movie_traced_frame_start
+        if patch_traced_movie_path is not None and decode_start > movie_traced_frame_start:
+            traced_movie_copied_frames = ((decode_start - movie_traced_frame_start)
+                                          // TRACED_MOVIE_GOP) * TRACED_MOVIE_GOP
+            traced_movie_start += traced_movie_copied_frames
+        decode_start = min(decode_start, traced_movie_start)
     if movie_zipfile_path is not None:
-        # pylint: disable=consider-using-with
-        zf = zipfile.ZipFile(movie_zipfile_path, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+        decode_start = 0
 
-    # Check to see if we are making a movie_traced
-    movie_traced_writer = None
-    if movie_traced_path is not None:
-        movie_traced_writer = imageio.get_writer(movie_traced_path, format='FFMPEG', mode='I',
-                                                  fps=15, codec='libx264',
-                                                  macro_block_size=None,
-                                                  output_params=['-metadata', f'comment={comment}'])
-    trackpoints_prev = None
+    trackpoints_by_frame = {}
+    for tp in trackpoints:
+        trackpoints_by_frame.setdefault(tp.frame_number, []).append(tp)
+    trackpoints_prev = trackpoints_by_frame.get(decode_start - 1)
     gray_frame_prev = None
+    marker_tracker = None
     trackpoints_this = None
     trackpoint_segments:list[TrackpointSegment] = []
+    # Trails drawn on the traced MP4 include the frames that are not decoded.
+    for frame_number in range(movie_traced_frame_start + 1, decode_start):
+        update_trackpoint_segments(previous_trackpoints=trackpoints_by_frame.get(frame_number - 1),
+                                   current_trackpoints=trackpoints_by_frame.get(frame_number),
+                                   segments=trackpoint_segments)
     colors_by_label = trackpoint_colors(trackpoints)
-    for (frame_number, frame) in enumerate(get_frames_from_url(movie_url, rotation)):
-        # Trace only in the requested range; outside it use existing trackpoints for rendering/callbacks.
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        if frame_number >= frame_start and (frame_end is None or frame_number <= frame_end):
-            trackpoints_this = cv2_trace_frame(
-                gray_frame_prev = gray_frame_prev,
-                gray_frame = gray_frame,
-                trackpoints = trackpoints_prev,
-                frame_number=frame_number,
-            )
-            trackpoints_output.extend(trackpoints_this) # add to the output
-        else:
-            trackpoints_this = [tp for tp in trackpoints if tp.frame_number == frame_number]
 
-        frame_in_traced_movie = (
-            frame_number >= movie_traced_frame_start
-            and (movie_traced_frame_end is None or frame_number <= movie_traced_frame_end)
-        )
-        prior_frame_in_traced_movie = frame_number > movie_traced_frame_start
-        if frame_in_traced_movie and prior_frame_in_traced_movie:
-            update_trackpoint_segments(previous_trackpoints=trackpoints_prev,
-                                       current_trackpoints=trackpoints_this,
-                                       segments=trackpoint_segments)
-
-        # Create the movie_zipfile if asked
-        if zf is not None:
-            jpeg = convert_frame_to_jpeg(frame)
-            if comment is not None:
-                jpeg = add_jpeg_comment(jpeg, comment)
-            zf.writestr(f"frame_{frame_number:04d}.jpeg", jpeg)
-
-        # Label the frame and write to the mp4 output if we are doing that
-        if movie_traced_writer and frame_in_traced_movie:
-            frame_to_label = frame.copy()
-            cv2_label_frame(frame=frame_to_label,
-                            trackpoints=trackpoints_this,
-                            frame_label=frame_number,
-                            trackpoint_segments=trackpoint_segments,
-                            colors_by_label=colors_by_label)
-            # IMPORTANT: OpenCV uses BGR colors, but ImageIO expects RGB!
-            frame_rgb = cv2.cvtColor(frame_to_label, cv2.COLOR_BGR2RGB)
-            movie_traced_writer.append_data(frame_rgb)
-
-        if callback is not None:
-            callback(TracerCallbackArg(frame_number=frame_number, frame_data=frame, frame_trackpoints=trackpoints_this))
-
-        # Advance
-        trackpoints_prev = trackpoints_this
-        gray_frame_prev = gray_frame
+    def jpeg_for_zip(frame_number, frame):
+        jpeg = convert_frame_to_jpeg(frame)
+        if comment is not None:
+            jpeg = add_jpeg_comment(jpeg, comment)
+        return (f"frame_{frame_number:04d}.jpeg", jpeg)
+
+    def labeled_rgb_frame(frame_number, frame, frame_trackpoints, segments):
+        frame_to_label = frame.copy()
+        cv2_label_frame(frame=frame_to_label,
+                        trackpoints=frame_trackpoints,
+                        frame_label=frame_number,
+                        trackpoint_segments=segments,
+                        colors_by_label=colors_by_label)
+        # IMPORTANT: OpenCV uses BGR colors, but ImageIO expects RGB!
+        return cv2.cvtColor(frame_to_label, cv2.COLOR_BGR2RGB)
+
+    with contextlib.ExitStack() as stack:
+        # Check to see if we are making a movie_zipfile
+        zip_stage = None
+        if movie_zipfile_path is not None:
+            # pylint: disable=consider-using-with
+            zf = zipfile.ZipFile(movie_zipfile_path, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+            stack.callback(zf.close)
+            zip_stage = stack.enter_context(OrderedStage(work=jpeg_for_zip, sink=lambda entry: zf.writestr(*entry)))
+
+        # Check to see if we are making a movie_traced
+        label_stage = None
+        if movie_traced_path is not None:
+            movie_traced_suffix_path = movie_traced_path
+            if traced_movie_copied_frames:
+                movie_traced_suffix_path = Path(movie_traced_path).with_suffix('.suffix.mp4')
+
+                def splice_on_success(exc_type, _exc_value, _tb):
+                    if exc_type is None:
+                        splice_traced_movie(prefix_path=patch_traced_movie_path,
+                                            prefix_frames=traced_movie_copied_frames,
+                                            suffix_path=movie_traced_suffix_path,
+                                            output_path=movie_traced_path,
+                                            comment=comment)
+                    else:
+                        movie_traced_suffix_path.unlink(missing_ok=True)
+                stack.push(splice_on_success)
+            movie_traced_writer = imageio.get_writer(movie_traced_suffix_path, format='FFMPEG', mode='I',
+                                                      fps=15, codec='libx264',
+                                                      macro_block_size=None,
+                                                      output_params=['-metadata', f'comment={comment}',
+                                                                     *TRACED_MOVIE_GOP_PARAMS])
+            stack.callback(movie_traced_writer.close)
+            label_stage = stack.enter_context(OrderedStage(work=labeled_rgb_frame,
+                                                           sink=movie_traced_writer.append_data))
+
+        frames = stack.enter_context(contextlib.closing(prefetch_frames(
+            get_frames_from_url(movie_url, rotation, frame_start=decode_start, frame_index=frame_index))))
+        for (frame_number, frame) in enumerate(frames, start=decode_start):
+            # Trace only in the requested range; outside it use existing trackpoints for rendering/callbacks.
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if frame_number >= frame_start and (frame_end is None or frame_number <= frame_end):
+                if marker_tracker is None:
+                    marker_tracker = MarkerTracker(
+                        trackpoints = trackpoints_prev,
+                        frame_number = frame_number - 1,
+                        frame_count = None if frame_end is None else frame_end - frame_number + 1,
+                    )
+                marker_tracker.track(gray_frame_prev = gray_frame_prev, gray_frame = gray_frame)
+                trackpoints_this = marker_tracker.trackpoints()
+                trackpoints_output.extend(trackpoints_this) # add to the output
+            else:
+                trackpoints_this = [tp for tp in trackpoints if tp.frame_number == frame_number]
+
+            frame_in_traced_movie = (
+                frame_number >= movie_traced_frame_start
+                and (movie_traced_frame_end is None or frame_number <= movie_traced_frame_end)
+            )
+            prior_frame_in_traced_movie = frame_number > movie_traced_frame_start
+            if frame_in_traced_movie and prior_frame_in_traced_movie:
+                update_trackpoint_segments(previous_trackpoints=trackpoints_prev,
+                                           current_trackpoints=trackpoints_this,
+                                           segments=trackpoint_segments)
+
+            # Create the movie_zipfile if asked
+            if zip_stage is not None:
+                zip_stage.submit(frame_number, frame)
+
+            # Label the frame and write to the mp4 output if we are doing that
+            if (label_stage is not None and frame_in_traced_movie
+                    and frame_number >= movie_traced_frame_start + traced_movie_copied_frames):
+                label_stage.submit(frame_number, frame, trackpoints_this, tuple(trackpoint_segments))
+
+            if callback is not None:
+                callback(TracerCallbackArg(frame_number=frame_number, frame_data=frame, frame_trackpoints=trackpoints_this))
+
+            # Advance
+            trackpoints_prev = trackpoints_this
+            gray_frame_prev = gray_frame
     # Done
-    if movie_traced_writer:
-        movie_traced_writer.close()
     return trackpoints_output
 
 
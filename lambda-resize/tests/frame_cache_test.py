@@ -0,0 +1,45 @@
+import uuid
+
+from resize_app import frame_cache
+from resize_app.src.app import odb_movie_data, s3_presigned
+
+
+def test_lru_byte_cache_evicts_least_recently_used_entries_by_size():
+    cache = frame_cache.LRUByteCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+    assert cache.size == 8
+    cache.put("too-big", b"x" * 11)
+    assert cache.get("too-big") is None
+
+
+def test_get_or_render_serves_memory_then_s3_and_keys_on_rotation(local_ddb, local_s3):  # pylint: disable=unused-argument
+    movie_urn = s3_presigned.make_urn(object_name=f"movies/cache-test/c1/{uuid.uuid4()}.mov")
+    key = frame_cache.FrameCacheKey(movie_data_urn=movie_urn, version=1, rotation=0,
+                                    frame_number=0, max_dimension=640)
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f"jpeg {len(renders)}".encode()
+
+    try:
+        assert frame_cache.get_or_render(key, render) == b"jpeg 1"
+        assert frame_cache.get_or_render(key, render) == b"jpeg 1"
+        frame_cache.MEMORY_CACHE.clear()
+        assert frame_cache.get_or_render(key, render) == b"jpeg 1"
+        assert len(renders) == 1
+
+        assert frame_cache.get_or_render(key._replace(rotation=90), render) == b"jpeg 2"
+        assert frame_cache.get_or_render(key._replace(version=2), render) == b"jpeg 3"
+    finally:
+        for cached in (key, key._replace(rotation=90), key._replace(version=2)):
+            odb_movie_data.delete_object(
+                s3_presigned.frame_cache_urn(movie_data_urn=movie_urn, digest=cached.digest()))
+        frame_cache.MEMORY_CACHE.clear()
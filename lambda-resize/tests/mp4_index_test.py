@@ -0,0 +1,123 @@
+# pylint: disable=no-member
+
+from pathlib import Path
+import subprocess
+
+import cv2
+import imageio_ffmpeg
+import numpy as np
+import pytest
+
+from resize_app import mp4_index, mpeg_jpeg_zip
+
+TEST_DATA = Path(__file__).resolve().parents[2] / "tests/data"
+
+
+# Frame counts and keyframes as reported by ffmpeg's showinfo filter.
+@pytest.mark.parametrize(("name", "frame_count", "keyframes"), [
+    ("2019-07-12 circumnutation.mp4", 296, [0, 75, 150, 225]),
+    ("2019-07-31 plantmovie.mov", 54, [0, 30]),
+    ("2019-07-31 plantmovie-rotated.mov", 54, [0, 44]),
+    # Negative composition offsets and an edit list that hides the last sample.
+    ("2019-07-31 plantmovie short.mov", 6, [0]),
+])
+def test_frame_index_matches_decoded_frames(name, frame_count, keyframes):
+    frame_index = mp4_index.frame_index_from_path(str(TEST_DATA / name))
+
+    assert frame_index.frame_count == frame_count
+    assert frame_index.keyframes == keyframes
+    assert frame_index.pts == sorted(frame_index.pts)
+    assert all(size > 0 for size in frame_index.sizes)
+    assert mp4_index.MovieFrameIndex.model_validate_json(frame_index.model_dump_json()) == frame_index
+
+
+def test_keyframe_at_or_before():
+    frame_index = mp4_index.frame_index_from_path(str(TEST_DATA / "2019-07-12 circumnutation.mp4"))
+
+    assert frame_index.keyframe_at_or_before(0) == 0
+    assert frame_index.keyframe_at_or_before(74) == 0
+    assert frame_index.keyframe_at_or_before(75) == 75
+    assert frame_index.keyframe_at_or_before(295) == 225
+    with pytest.raises(ValueError, match="invalid frame_number 296"):
+        frame_index.keyframe_at_or_before(296)
+
+
+def test_frame_index_rejects_files_without_a_movie(tmp_path):
+    path = tmp_path / "not-a-movie.mp4"
+    path.write_bytes(b"\x00\x00\x00\x10ftypisom\x00\x00\x02\x00")
+
+    with pytest.raises(mp4_index.Mp4IndexError, match="no moov box"):
+        mp4_index.frame_index_from_path(str(path))
+
+
+def test_seek_with_frame_index_returns_the_decoded_frame():
+    path = str(TEST_DATA / "2019-07-12 circumnutation.mp4")
+    frame_index = mp4_index.frame_index_from_path(path)
+    cap = cv2.VideoCapture(path)
+    try:
+        linear_frames = [cap.read()[1] for _ in range(101)]
+    finally:
+        cap.release()
+    movie_data = Path(path).read_bytes()
+
+    for frame_number in (1, 74, 75, 100):
+        frame = mpeg_jpeg_zip.extract_frame(movie_data=movie_data, frame_number=frame_number,
+                                            fmt='CV2', frame_index=frame_index)
+        assert np.array_equal(frame, linear_frames[frame_number])
+    with pytest.raises(ValueError, match="invalid frame_number 296"):
+        mpeg_jpeg_zip.extract_frame(movie_data=movie_data, frame_number=296, fmt='CV2',
+                                    frame_index=frame_index)
+
+
+METADATA_KEYS = ('total_frames', 'total_bytes', 'width', 'height', 'fps', 'rotation')
+
+
+@pytest.mark.parametrize("name", [
+    "2019-07-12 circumnutation.mp4",
+    "2019-07-31 plantmovie.mov",
+    "2019-07-31 plantmovie-rotated.mov",
+    "big-test-movie.mp4",
+])
+def test_extract_movie_metadata_reads_headers_and_matches_opencv(name):
+    path = str(TEST_DATA / name)
+
+    metadata = mpeg_jpeg_zip.extract_movie_metadata(movie_path=path)
+    decoded = mpeg_jpeg_zip.decode_movie_metadata(movie_path=path)
+
+    assert metadata['metadata_source'] == mpeg_jpeg_zip.METADATA_SOURCE_HEADER
+    assert decoded['metadata_source'] == mpeg_jpeg_zip.METADATA_SOURCE_DECODE
+    assert {key: metadata[key] for key in METADATA_KEYS} == {key: decoded[key] for key in METADATA_KEYS}
+    assert metadata['duration'] == pytest.approx(decoded['duration'])
+
+
+def test_extract_movie_metadata_counts_only_presented_frames():
+    # The container claims 7 frames but its edit list presents (and OpenCV decodes) 6.
+    metadata = mpeg_jpeg_zip.extract_movie_metadata(movie_path=str(TEST_DATA / "2019-07-31 plantmovie short.mov"))
+
+    assert metadata['total_frames'] == 6
+    assert metadata['duration'] == pytest.approx(0.3)
+
+
+def test_extract_movie_metadata_reports_display_rotation(tmp_path):
+    path = tmp_path / "display-rotated.mov"
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error", "-display_rotation", "90",
+                    "-i", str(TEST_DATA / "2019-07-31 plantmovie.mov"), "-c", "copy", str(path)], check=True)
+
+    metadata = mpeg_jpeg_zip.extract_movie_metadata(movie_path=str(path))
+    decoded = mpeg_jpeg_zip.decode_movie_metadata(movie_path=str(path))
+
+    assert (metadata['width'], metadata['height'], metadata['rotation']) == (360, 480, 270)
+    assert {key: metadata[key] for key in METADATA_KEYS} == {key: decoded[key] for key in METADATA_KEYS}
+
+
+def test_extract_movie_metadata_decodes_other_containers(tmp_path):
+    path = str(tmp_path / "movie.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for value in range(5):
+        writer.write(np.full((48, 64, 3), value * 40, dtype=np.uint8))
+    writer.release()
+
+    metadata = mpeg_jpeg_zip.extract_movie_metadata(movie_path=path)
+
+    assert metadata['metadata_source'] == mpeg_jpeg_zip.METADATA_SOURCE_DECODE
+    assert (metadata['total_frames'], metadata['width'], metadata['height']) == (5, 64, 48)
@@ -81,7 +81,8 @@ def test_prepare_tracing_request_marks_movie_tracing_before_queueing(new_movie):
     assert result["movie_id"] == movie_id
     assert result["frame_start"] == 7
     assert result["frame_end"] == 20
-    assert result["cleared_frames"] == 0
+    assert result["trackpoint_generation"] == 1
+    assert movie[movie_glue.odb.TRACKPOINT_INVALIDATIONS] == [[1, 8, 20]]
     assert result["job_id"]
     lock = ddbo.get_active_movie_trace_lock(movie_id)
     assert lock and lock.job_id == result["job_id"]
@@ -136,7 +137,7 @@ def test_run_tracing_passes_frame_end_and_ignores_callback_frames_after_end(new_
         touch_activity=False,
     )
     for frame_number in range(3):
-        movie_glue.put_frame_trackpoints(
+        movie_glue.odb.put_frame_trackpoints(
             movie_id=movie_id,
             frame_number=frame_number,
             trackpoints=[
@@ -185,7 +186,8 @@ def test_run_tracing_passes_frame_end_and_ignores_callback_frames_after_end(new_
 
     movie = ddbo.get_movie(movie_id)
     try:
-        assert movie[movie_glue.LAST_FRAME_TRACKED] == 3
+        assert movie[movie_glue.odb.LAST_FRAME_TRACKED] == 3
+        assert movie[movie_glue.TRACED_AT] > 1
         assert movie[movie_glue.TOTAL_FRAMES] == 5
         assert movie[movie_glue.MOVIE_STATUS] == movie_glue.MOVIE_STATE_TRACING_COMPLETED
         assert movie[movie_glue.NEEDS_RETRACING] == 0
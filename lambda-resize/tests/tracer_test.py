@@ -1,6 +1,8 @@
 from pathlib import Path
+import zipfile
 
 import numpy as np
+import pytest
 
 from resize_app import tracer
 from resize_app.src.app.schema import Trackpoint
@@ -140,6 +142,38 @@ def test_cv2_trace_frame_preserves_all_markers_when_cv2_errors(monkeypatch):
     ]
 
 
+def test_marker_tracker_keeps_marker_order_and_carries_lost_markers(monkeypatch):
+    seed_trackpoints = [
+        Trackpoint(x=1, y=2, label="Apex", frame_number=4, color="orange"),
+        Trackpoint(x=10, y=20, label="Ruler 0mm", frame_number=4, color="red", undeletable=True),
+    ]
+    outputs = iter([
+        (np.array([[2.04, 3.06], [11, 21]], dtype=np.float32), np.array([[1], [0]], dtype=np.uint8)),
+        (np.array([[3, 4], [12, 22]], dtype=np.float32), np.array([[1], [1]], dtype=np.uint8)),
+    ])
+
+    def fake_optical_flow(_gray_frame_prev, _gray_frame, _input_points, _unused, **_kwargs):
+        points, status = next(outputs)
+        return points, status, None
+
+    monkeypatch.setattr(tracer.cv2, "calcOpticalFlowPyrLK", fake_optical_flow)
+    marker_tracker = tracer.MarkerTracker(trackpoints=seed_trackpoints, frame_number=4, frame_count=1)
+    gray_frame = np.zeros((8, 8), dtype=np.uint8)
+    marker_tracker.track(gray_frame_prev=gray_frame, gray_frame=gray_frame)
+    marker_tracker.track(gray_frame_prev=gray_frame, gray_frame=gray_frame)
+
+    assert marker_tracker.positions.dtype == np.float32
+    assert marker_tracker.status[1].tolist() == [True, False]
+    assert marker_tracker.trackpoints(1) == [
+        Trackpoint(x=2, y=3.1, label="Apex", frame_number=5, color="orange"),
+        Trackpoint(x=10, y=20, label="Ruler 0mm", frame_number=5, color="red", undeletable=True),
+    ]
+    assert marker_tracker.trackpoints() == [
+        Trackpoint(x=3, y=4, label="Apex", frame_number=6, color="orange"),
+        Trackpoint(x=12, y=22, label="Ruler 0mm", frame_number=6, color="red", undeletable=True),
+    ]
+
+
 def test_update_trackpoint_segments_adds_lines_for_matching_labels_only():
     segments = []
 
@@ -188,3 +222,106 @@ def test_trackpoint_colors_prefer_marker_color_property():
     assert colors["Base"] == tracer.BRIGHT_BLUE
     assert colors["Ruler 0mm"] == tracer.RED
     assert colors["Tip"] == tracer.MAGENTA
+
+
+def test_trace_movie_pipeline_writes_zip_and_traced_frames_in_order(monkeypatch, tmp_path):
+    frames = []
+    for frame_number in range(40):
+        frame = np.zeros((16, 16, 3), dtype=np.uint8)
+        frame[0, 0] = [frame_number, 0, 0]
+        frames.append(frame)
+    monkeypatch.setattr(tracer, "get_frames_from_url", lambda _movie_url, _rotation, frame_start=0, frame_index=None: iter(frames[frame_start:]))
+    appended_frames = []
+
+    class FakeWriter:
+        def append_data(self, frame):
+            appended_frames.append(frame)
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(tracer.imageio, "get_writer", lambda *_args, **_kwargs: FakeWriter())
+    callbacks = []
+
+    tracer.trace_movie_v2(
+        movie_url="https://example.com/movie.mp4",
+        frame_start=1,
+        trackpoints=[Trackpoint(x=8, y=8, label="apex", frame_number=0)],
+        movie_zipfile_path=tmp_path / "movie.zip",
+        movie_traced_path=tmp_path / "traced.mp4",
+        callback=callbacks.append,
+        comment="test",
+    )
+
+    with zipfile.ZipFile(tmp_path / "movie.zip") as zf:
+        assert zf.namelist() == [f"frame_{frame_number:04d}.jpeg" for frame_number in range(40)]
+        assert zf.read("frame_0007.jpeg") == tracer.add_jpeg_comment(
+            tracer.convert_frame_to_jpeg(frames[7]), "test")
+    assert [int(frame[0, 0, 2]) for frame in appended_frames] == list(range(40))
+    assert [obj.frame_number for obj in callbacks] == list(range(40))
+
+
+def test_ordered_stage_reraises_sink_errors():
+    def failing_sink(value):
+        raise ValueError(f"cannot write {value}")
+
+    with pytest.raises(ValueError, match="cannot write 2"):
+        with tracer.OrderedStage(work=lambda value: value * 2, sink=failing_sink, workers=2) as stage:
+            stage.submit(1)
+
+
+def write_test_movie(path, frame_count):
+    writer = tracer.imageio.get_writer(path, format='FFMPEG', mode='I', fps=15, codec='libx264',
+                                       macro_block_size=None)
+    for frame_number in range(frame_count):
+        frame = np.full((120, 160, 3), 40, dtype=np.uint8)
+        frame[40:60, 20 + frame_number:40 + frame_number] = 220
+        writer.append_data(frame)
+    writer.close()
+
+
+def read_movie_frames(path):
+    return list(tracer.get_frames_from_url(str(path), 0))
+
+
+def test_get_frames_from_url_seeks_to_frame_start(tmp_path):
+    movie_path = tmp_path / "movie.mp4"
+    write_test_movie(movie_path, 50)
+    frames = read_movie_frames(movie_path)
+
+    seeked_frames = list(tracer.get_frames_from_url(str(movie_path), 0, frame_start=37))
+
+    assert len(seeked_frames) == 13
+    assert np.array_equal(seeked_frames[0], frames[37])
+
+
+def test_trace_movie_retrace_patches_traced_movie_from_keyframe(tmp_path):
+    movie_path = tmp_path / "movie.mp4"
+    write_test_movie(movie_path, 70)
+    first_traced_path = tmp_path / "first_traced.mp4"
+    trackpoints = tracer.trace_movie_v2(
+        movie_url=movie_path,
+        frame_start=1,
+        trackpoints=[Trackpoint(x=30, y=50, label="Apex", frame_number=0)],
+        movie_traced_path=first_traced_path,
+        callback=None,
+    )
+    callbacks = []
+
+    retraced_path = tmp_path / "retraced.mp4"
+    tracer.trace_movie_v2(
+        movie_url=movie_path,
+        frame_start=45,
+        trackpoints=[tp for tp in trackpoints if tp.frame_number <= 44],
+        movie_traced_path=retraced_path,
+        patch_traced_movie_path=first_traced_path,
+        callback=callbacks.append,
+    )
+
+    first_frames = read_movie_frames(first_traced_path)
+    retraced_frames = read_movie_frames(retraced_path)
+    assert callbacks[0].frame_number == tracer.TRACED_MOVIE_GOP
+    assert len(retraced_frames) == len(first_frames) == 70
+    assert all(np.array_equal(retraced_frames[i], first_frames[i]) for i in range(tracer.TRACED_MOVIE_GOP))
+    assert max(np.abs(retraced.astype(int) - first.astype(int)).mean()
+               for (retraced, first) in zip(retraced_frames, first_frames)) < 2
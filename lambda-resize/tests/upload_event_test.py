@@ -107,6 +107,11 @@ def test_eventbridge_upload_moves_object_processes_metadata_and_logs(
     deployment_id = "event-test"
     monkeypatch.setenv(C.PLANTTRACER_STACK_NAME, deployment_id)
     monkeypatch.setenv("TRACING_QUEUE_MODE", "local")
+
+    def no_download(movie_urn):
+        raise AssertionError(f"{movie_urn} should be probed with ranged reads, not downloaded")
+
+    monkeypatch.setattr(movie_glue, "download_uploaded_movie_metadata", no_download)
     pending = create_pending_upload(new_course, deployment_id=deployment_id)
     event = object_created_event(
         bucket=pending.bucket,
@@ -129,6 +134,11 @@ def test_eventbridge_upload_moves_object_processes_metadata_and_logs(
         assert movie[odb.HEIGHT] > 0
         assert movie[odb.MOVIE_DATA_URN] == pending.durable_urn
         assert movie[odb.UPLOAD_EVENT_ID] == "event-1"
+        assert movie[odb.MOVIE_FRAME_INDEX_URN] == s3_presigned.frame_index_urn(
+            movie_data_urn=pending.durable_urn)
+        frame_index = movie_glue.load_frame_index(movie[odb.MOVIE_FRAME_INDEX_URN])
+        assert frame_index.frame_count == movie[odb.TOTAL_FRAMES]
+        assert frame_index.keyframes[0] == 0
         assert int(s3_presigned.s3_client().head_object(
             Bucket=pending.bucket,
             Key=pending.durable_key,
@@ -4,6 +4,7 @@ import base64
 import binascii
 import json
 import time
+from decimal import Decimal
 from enum import StrEnum
 from typing import Annotated
 
@@ -105,7 +106,7 @@ class RestartMarker(BaseModel):
     """Table-bound DynamoDB restart key."""
 
     key_name: str
-    key: dict[str, str]
+    key: dict[str, str | int]
 
 
 class AdminViewer(BaseModel):
@@ -308,13 +309,16 @@ def encode_restart_marker(marker, *, key_name: str):
     """Encode a DynamoDB LastEvaluatedKey as an opaque URL-safe marker."""
     if not marker:
         return None
+    marker = {name: int(value) if isinstance(value, Decimal) else value for name, value in marker.items()}
     marker_payload = RestartMarker(key_name=key_name, key=marker)
     marker_json = marker_payload.model_dump_json()
     return base64.urlsafe_b64encode(marker_json.encode("utf-8")).decode("ascii")
 
 
-def decode_restart_marker(marker, *, key_name: str):
-    """Decode an opaque restart marker from the client."""
+def decode_restart_marker(marker, *, key_name: str, key_names=None):
+    """Decode an opaque restart marker from the client.
+    :param key_names: the attributes the key must have, if not just key_name
+                      (e.g. an index key plus the table key)."""
     if not marker:
         return None
     try:
@@ -328,7 +332,7 @@ def decode_restart_marker(marker, *, key_name: str):
         ValidationError,
     ) as exc:
         raise InvalidRestartMarker("Invalid restart marker") from exc
-    if decoded.key_name != key_name or set(decoded.key) != {key_name}:
+    if decoded.key_name != key_name or set(decoded.key) != set(key_names or {key_name}):
         raise InvalidRestartMarker("Invalid restart marker")
     return decoded.key
 
@@ -547,12 +551,14 @@ def admin_movie_media(*, viewer_user, movie_id: str) -> AdminMovieMediaResponse:
         play_url=s3_presigned.make_signed_url(
             urn=movie_urn,
             expires=C.ADMIN_MEDIA_URL_EXPIRES_SECONDS,
+            version=odb.movie_object_version(movie, MOVIE_DATA_URN),
         ),
         traced_download_url=(
             s3_presigned.make_signed_url(
                 urn=traced_urn,
                 expires=C.ADMIN_MEDIA_URL_EXPIRES_SECONDS,
                 download_name=f"{movie_id}-traced.mp4",
+                version=odb.movie_object_version(movie, MOVIE_TRACED_URN),
             )
             if traced_urn else None
         ),
@@ -149,9 +149,26 @@ class C:
     MAX_FILE_UPLOAD = 1024*1024*256
     MAX_FRAMES = 10_000            # max possible frames in a movie
     NOTIFY_UPDATE_INTERVAL = 5.0
+    TRACE_FLUSH_FRAMES = 25         # traced frames buffered per BatchWriteItem (DynamoDB maximum)
+    TRACE_FLUSH_INTERVAL = 5.0      # seconds between trace flushes / lock heartbeats
+    TRACKPOINT_CHUNK_FRAMES = 256   # frames per movie_frames item for columnar trackpoint storage
     TRACK_DELAY = 'TRACK_DELAY'
     CHECK_MX = False                # True didn't work
     DEFAULT_GET_TIMEOUT = 10
+    S3_RANGE_READ_BLOCK = 64*1024   # minimum bytes fetched per ranged GET when probing movie headers
+    FRAME_CACHE_MAX_BYTES = 32*1024*1024  # in-process LRU of rendered frame JPEGs in lambda-resize
+    LIST_MOVIES_MAX_WORKERS = 8     # concurrent per-course queries when listing a user's movies
+    CLEAR_TRACKING_MAX_WORKERS = 16  # concurrent per-frame trackpoint removals when clearing tracking
+    LIST_MOVIES_PAGE_LIMIT = 100    # /api/list-movies page size when paging without a limit
+    LIST_MOVIES_MAX_PAGE_LIMIT = 500
+    API_KEY_CACHE_SECONDS = 30      # validated api_key -> user entries are reused this long
+    API_KEY_USAGE_FLUSH_SECONDS = 60  # api_key use counts are written back at most this often
+    SIGNED_URL_MIN_REMAINING_SECONDS = 10*60  # a memoized signed URL is re-signed when it has less left
+    SIGNED_URL_CACHE_MAX_ENTRIES = 4096
+    TRACKPOINT_EXPORT_CHUNK_BYTES = 64*1024      # streamed CSV export sends rows in chunks of about this size
+    TRACKPOINT_EXPORT_LOOKAHEAD_FRAMES = 64      # and reads at most this many frames ahead for its header
+    TRACKPOINT_EXPORT_KEEP_SECONDS = 10*60       # a superseded stored export is deleted once this much older
+    MOVIE_ETAG_SETTLE_SECONDS = 2   # no ETag until a movie's last write is this old (whole-second timestamps)
     YES = 'YES'
     NO = 'NO'
     # Single place for analysis/shrunk frame size (zip frames and get-frame?size=analysis).
@@ -171,6 +188,9 @@ class C:
     S3_ANALYSIS_ZIP_OBJECT_KEY_TEMPLATE = (
         "{source_movie_stem}_zipfile{source_movie_extension}"
     )
+    S3_FRAME_INDEX_OBJECT_KEY_TEMPLATE = "{source_movie_stem}_index.json"
+    S3_FRAME_CACHE_PREFIX_TEMPLATE = "{source_movie_stem}_frame_cache/"
+    S3_EXPORT_CACHE_PREFIX_TEMPLATE = "{source_movie_stem}_exports/"
     S3_FRAME_OBJECT_KEY_TEMPLATE = (
         "movies/{deployment_id}/{course_id}/{movie_id}/{frame_number:06d}.jpg"
     )
@@ -196,6 +216,7 @@ class C:
     API_KEY_METADATA = 'metadata'
     API_KEY_FRAMES = 'frames'
     API_KEY_MARKERS = 'markers'
+    API_KEY_NEXT_SINCE_FRAME = 'next_since_frame'
 
     # Movie metadata prop names for type coercion (schema.fix_movie_prop_value); single source of truth
     MOVIE_PROPS_INT = (
@@ -204,6 +225,8 @@ class C:
         'upload_bytes_expected', 'total_bytes', 'total_frames', 'width', 'height', 'rotation_steps',
         'trim_start_frame', 'trim_end_frame', 'needs_retracing',
         'resize_queued_at', 'resize_started_at', 'resized_at',
+        'traced_movie_gop', 'traced_movie_frame_start', 'traced_movie_frame_end',
+        'traced_movie_stale_from',
     )
     MOVIE_PROPS_STR = ('fps', 'fpm', 'trackpoint_origin')
 
@@ -6,22 +6,29 @@ TODO - all get_user_id() should be replaced with get_user_dict() and then the us
 
 """
 import json
+import math
 import os
 import sys
+import time
+import hashlib
 import smtplib
 import io
 import csv
+import itertools
+import tempfile
 import zipfile
+from array import array
 from decimal import Decimal
 from collections import defaultdict
 
 
 import xlsxwriter
-from flask import Blueprint, request, make_response, current_app, jsonify
+from flask import Blueprint, Response, request, make_response, current_app, jsonify, redirect, url_for
 from PIL import Image, UnidentifiedImageError
 from pydantic import ValidationError
 from validate_email_address import validate_email
 
+from . import admin_service
 from . import course_management
 from . import course_context
 from . import config_check
@@ -52,6 +59,7 @@ from .odb import (
     TRIM_END_FRAME,
     MOVIE_STATUS,
     MOVIE_STATE_TRACING_COMPLETED,
+    LAST_FRAME_TRACKED,
     DDBO,
     UnauthorizedUser,
     AtomicRenameConflict,
@@ -63,10 +71,14 @@ from .s3_presigned import (
     make_urn,
     make_signed_url,
     make_presigned_post,
+    export_cache_urn,
 )
 from .odb_movie_data import (
     delete_movie,
     read_object,
+    object_exists,
+    write_object_from_path,
+    purge_movie_export_cache,
 )
 from .schema import DefaultCourseRequest
 
@@ -101,6 +113,34 @@ def analysis_lock_response(movie):
     return None
 
 
+def movie_etag(movie):
+    """Return the ETag of this request's response about movie, or None if the movie has none yet.
+    It also covers the caller, the request parameters and the signed-URL window, so a client's
+    cached response never outlives the presigned URLs in it."""
+    token = odb.movie_version_token(movie)
+    if token is None:
+        return None
+    params = sorted((key, value) for key, value in request.values.items(multi=True) if key != 'api_key')
+    window = int(time.time() // C.SIGNED_URL_MIN_REMAINING_SECONDS)
+    state = [token, get_user_id(), params, window]
+    return hashlib.sha256(json.dumps(state).encode()).hexdigest()[:32]
+
+
+def with_etag(response, etag):
+    """Attach etag (if any) to response and ask clients to revalidate before reusing it."""
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(etag):
+    """Return a 304 response if the request's If-None-Match matches etag, else None."""
+    if etag is not None and etag in request.if_none_match:
+        return with_etag(make_response('', 304), etag)
+    return None
+
+
 @api_bp.patch('/default-course')
 @api_bp.patch('/current-course')
 def api_default_course():
@@ -204,121 +244,187 @@ def _positive_float(value):
     return parsed if parsed > 0 else None
 
 
-def _marker_summary_rows(labels, trackpoint_dicts):
-    rows = []
-    for label in labels:
-        marker_points = [tp for tp in trackpoint_dicts if tp['label'] == label]
-        first_point = marker_points[0] if marker_points else {}
-        color_values = sorted(set(tp.get('color') for tp in marker_points if tp.get('color')))
-        marker_ids = sorted(set(tp.get('marker_id') for tp in marker_points if tp.get('marker_id')))
-        undeletable_values = sorted(set(
-            str(tp.get('undeletable')).lower()
-            for tp in marker_points
-            if tp.get('undeletable') is not None
-        ))
-        status_values = sorted(set(
-            str(tp.get('status'))
-            for tp in marker_points
-            if tp.get('status') is not None
-        ))
-        err_values = sorted(set(
-            str(_spreadsheet_value(tp.get('err')))
-            for tp in marker_points
-            if tp.get('err') is not None
-        ))
-        frame_numbers = [tp['frame_number'] for tp in marker_points]
-        marker_kind = _marker_type(label)
-        rows.append({
-            'label': label,
-            'type': marker_kind,
-            'graphable': 'no' if marker_kind == 'ruler' else 'yes',
-            'color': first_point.get('color', '') or '',
-            'colors_seen': ", ".join(color_values),
-            'marker_id': first_point.get('marker_id', '') or '',
-            'marker_ids_seen': ", ".join(marker_ids),
-            'ruler_size_mm': odb.get_ruler_size(label) if marker_kind == 'ruler' else '',
-            'undeletable': first_point.get('undeletable', '') if first_point.get('undeletable') is not None else '',
-            'undeletable_values_seen': ", ".join(undeletable_values),
-            'first_frame': min(frame_numbers) if frame_numbers else '',
-            'last_frame': max(frame_numbers) if frame_numbers else '',
-            'trackpoint_count': len(marker_points),
-            'status_values_seen': ", ".join(status_values),
-            'error_values_seen': ", ".join(err_values),
-        })
-    return rows
-
-
-def _chart_export_data(frame_numbers, labels, trackpoint_dicts, fpm, position_scale, calibrated):
-    graphable_labels = [label for label in labels if odb.get_ruler_size(label) is None]
-    fpm_value = _positive_float(fpm)
-    if not graphable_labels:
-        return {
-            'fieldnames': [],
-            'rows': [],
-            'marker_labels': [],
-            'time_units': 'minutes' if fpm_value else 'frames',
-            'position_units': 'mm' if calibrated else 'px',
-        }
-    position_units = 'mm' if calibrated else 'px'
-    frame_points = defaultdict(dict)
+def _first_ruler_frame_points(trackpoint_dicts):
+    """Return the ruler trackpoints of the first frame that has any. trackpoint_dicts is in frame order."""
+    ruler_frame_points = []
     for tp in trackpoint_dicts:
-        frame_points[tp['frame_number']][tp['label']] = tp
-    baseline_points = {}
-    for label in graphable_labels:
-        for frame_number in frame_numbers:
-            point = frame_points[frame_number].get(label)
-            if point:
-                baseline_points[label] = point
-                break
+        if ruler_frame_points and tp['frame_number'] != ruler_frame_points[0]['frame_number']:
+            break
+        if odb.get_ruler_size(tp['label']) is not None:
+            ruler_frame_points.append(tp)
+    return ruler_frame_points
 
-    fieldnames = ['time (minutes)' if fpm_value else 'frame_number']
-    for label in graphable_labels:
-        fieldnames.append(f"{label} X Position ({position_units})")
-        fieldnames.append(f"{label} Y Position ({position_units})")
-
-    rows = []
-    for frame_number in frame_numbers:
-        row = {fieldnames[0]: round(frame_number / fpm_value, 4) if fpm_value else frame_number}
-        for label in graphable_labels:
-            point = frame_points[frame_number].get(label)
-            baseline = baseline_points.get(label)
-            if point and baseline:
-                row[f"{label} X Position ({position_units})"] = round(
-                    (float(point['x']) - float(baseline['x'])) * position_scale,
-                    4,
-                )
-                row[f"{label} Y Position ({position_units})"] = round(
-                    (float(point['y']) - float(baseline['y'])) * position_scale,
-                    4,
-                )
-            else:
-                row[f"{label} X Position ({position_units})"] = ''
-                row[f"{label} Y Position ({position_units})"] = ''
-        rows.append(row)
 
-    return {
-        'fieldnames': fieldnames,
-        'rows': rows,
-        'marker_labels': graphable_labels,
-        'time_units': 'minutes' if fpm_value else 'frames',
-        'position_units': position_units,
-    }
+def _trackpoint_column_unit(label, calibrated):
+    """'px' for ruler markers or an uncalibrated movie; 'mm' for other markers when calibrated."""
+    if odb.get_ruler_size(label) is not None or not calibrated:
+        return 'px'
+    return 'mm'
 
 
-def _trackpoint_export_data(movie):
-    """Build shared trackpoint-export rows, fieldnames, and metadata."""
+def _trackpoint_column_value(label, value, calibrated, scale):
+    if _trackpoint_column_unit(label, calibrated) == 'mm':
+        return round(float(value) * scale, 2)
+    return value
+
+
+def _trackpoint_fieldnames(labels, calibrated):
+    fieldnames = ['frame_number']
+    for label in labels:
+        unit = _trackpoint_column_unit(label, calibrated)
+        fieldnames.append(f"{label} x ({unit})")
+        fieldnames.append(f"{label} y ({unit})")
+    return fieldnames
+
+
+class _TrackpointTable:
+    """A movie's trackpoints pivoted in one pass into dense frame x marker columns.
+    x[i][j] and y[i][j] are marker labels[i] at frame_numbers[j] (NaN where the marker is absent).
+    The per-marker summary values are gathered in the same pass, so each export is linear in its size."""
+
+    def __init__(self, frames):
+        self.trackpoint_dicts = []
+        self.frame_numbers = []
+        self.ruler_frame_points = []
+        columns = {}
+        self._summaries = {}
+        for frame_index, (frame_number, trackpoints) in enumerate(frames):
+            self.frame_numbers.append(frame_number)
+            if not self.ruler_frame_points:
+                self.ruler_frame_points = _first_ruler_frame_points(trackpoints)
+            for xs, ys in columns.values():
+                xs.append(math.nan)
+                ys.append(math.nan)
+            for tp in trackpoints:
+                label = tp['label']
+                if label not in columns:
+                    columns[label] = (array('d', [math.nan]) * (frame_index + 1),
+                                      array('d', [math.nan]) * (frame_index + 1))
+                    self._summaries[label] = {'first_point': tp, 'first_frame': frame_number, 'count': 0,
+                                              'color': set(), 'marker_id': set(), 'undeletable': set(),
+                                              'status': set(), 'err': set()}
+                xs, ys = columns[label]
+                xs[frame_index] = tp['x']
+                ys[frame_index] = tp['y']
+                summary = self._summaries[label]
+                summary['last_frame'] = frame_number
+                summary['count'] += 1
+                for key in ('color', 'marker_id'):
+                    if tp.get(key):
+                        summary[key].add(tp[key])
+                if tp.get('undeletable') is not None:
+                    summary['undeletable'].add(str(tp['undeletable']).lower())
+                if tp.get('status') is not None:
+                    summary['status'].add(str(tp['status']))
+                if tp.get('err') is not None:
+                    summary['err'].add(str(_spreadsheet_value(tp['err'])))
+            self.trackpoint_dicts.extend(trackpoints)
+        self.labels = sorted(columns)
+        self.x = [columns[label][0] for label in self.labels]
+        self.y = [columns[label][1] for label in self.labels]
+
+    def rows(self, calibrated, scale):
+        """Return the export rows, keyed by _trackpoint_fieldnames(); absent markers are left out."""
+        columns = []
+        for label, xs, ys in zip(self.labels, self.x, self.y):
+            unit = _trackpoint_column_unit(label, calibrated)
+            columns.append((f"{label} x ({unit})", f"{label} y ({unit})", xs, ys,
+                            scale if unit == 'mm' else None))
+        rows = []
+        for frame_index, frame_number in enumerate(self.frame_numbers):
+            row = {'frame_number': frame_number}
+            for x_name, y_name, xs, ys, mm_scale in columns:
+                x, y = xs[frame_index], ys[frame_index]
+                if math.isnan(x):
+                    continue
+                if mm_scale is None:
+                    row[x_name], row[y_name] = (int(v) if v.is_integer() else v for v in (x, y))
+                else:
+                    row[x_name], row[y_name] = round(x * mm_scale, 2), round(y * mm_scale, 2)
+            rows.append(row)
+        return rows
+
+    def marker_summary_rows(self):
+        rows = []
+        for label in self.labels:
+            summary = self._summaries[label]
+            first_point = summary['first_point']
+            marker_kind = _marker_type(label)
+            rows.append({
+                'label': label,
+                'type': marker_kind,
+                'graphable': 'no' if marker_kind == 'ruler' else 'yes',
+                'color': first_point.get('color', '') or '',
+                'colors_seen': ", ".join(sorted(summary['color'])),
+                'marker_id': first_point.get('marker_id', '') or '',
+                'marker_ids_seen': ", ".join(sorted(summary['marker_id'])),
+                'ruler_size_mm': odb.get_ruler_size(label) if marker_kind == 'ruler' else '',
+                'undeletable': first_point['undeletable'] if first_point.get('undeletable') is not None else '',
+                'undeletable_values_seen': ", ".join(sorted(summary['undeletable'])),
+                'first_frame': summary['first_frame'],
+                'last_frame': summary['last_frame'],
+                'trackpoint_count': summary['count'],
+                'status_values_seen': ", ".join(sorted(summary['status'])),
+                'error_values_seen': ", ".join(sorted(summary['err'])),
+            })
+        return rows
+
+    def chart_data(self, fpm, position_scale, calibrated):
+        """Displacement of each graphable marker from its first exported position."""
+        fpm_value = _positive_float(fpm)
+        time_units = 'minutes' if fpm_value else 'frames'
+        position_units = 'mm' if calibrated else 'px'
+        columns = []
+        for label, xs, ys in zip(self.labels, self.x, self.y):
+            if odb.get_ruler_size(label) is not None:
+                continue
+            baseline = next(i for i, x in enumerate(xs) if not math.isnan(x))
+            columns.append((label, f"{label} X Position ({position_units})", f"{label} Y Position ({position_units})",
+                            xs, ys, xs[baseline], ys[baseline]))
+        if not columns:
+            return {'fieldnames': [], 'rows': [], 'marker_labels': [],
+                    'time_units': time_units, 'position_units': position_units}
+
+        fieldnames = ['time (minutes)' if fpm_value else 'frame_number']
+        for _label, x_name, y_name, *_ in columns:
+            fieldnames.extend((x_name, y_name))
+        rows = []
+        for frame_index, frame_number in enumerate(self.frame_numbers):
+            row = {fieldnames[0]: round(frame_number / fpm_value, 4) if fpm_value else frame_number}
+            for _label, x_name, y_name, xs, ys, x0, y0 in columns:
+                x, y = xs[frame_index], ys[frame_index]
+                if math.isnan(x):
+                    row[x_name] = row[y_name] = ''
+                else:
+                    row[x_name] = round((x - x0) * position_scale, 4)
+                    row[y_name] = round((y - y0) * position_scale, 4)
+            rows.append(row)
+        return {
+            'fieldnames': fieldnames,
+            'rows': rows,
+            'marker_labels': [column[0] for column in columns],
+            'time_units': time_units,
+            'position_units': position_units,
+        }
+
+
+def _trackpoint_table(movie):
+    """Return (movie_metadata, trim_start_frame, trim_end_frame, table) for the movie's trimmed trackpoints."""
     movie_metadata = odb.movie_metadata_with_trim_defaults(
         odb.get_movie_metadata(movie_id=movie[MOVIE_ID])
     )
     trim_start_frame, trim_end_frame = odb.movie_trim_bounds(movie_metadata)
-    trackpoint_dicts = odb.get_movie_trackpoints(
+    table = _TrackpointTable(odb.iter_movie_trackpoints_by_frame(
         movie_id=movie[MOVIE_ID],
         frame_start=trim_start_frame,
         frame_end=trim_end_frame,
-    )
-    frame_numbers = sorted(set((tp['frame_number'] for tp in trackpoint_dicts)))
-    labels = sorted(set((tp['label'] for tp in trackpoint_dicts)))
-    frame_dicts = defaultdict(dict)
+    ))
+    return movie_metadata, trim_start_frame, trim_end_frame, table
+
+
+def _trackpoint_export_data(movie):
+    """Build shared trackpoint-export rows, fieldnames, and metadata."""
+    movie_metadata, trim_start_frame, trim_end_frame, table = _trackpoint_table(movie)
 
     # Express non-ruler position values in mm when the analysis is ruler-calibrated (>= 2
     # Ruler XXmm markers moved off their default positions); otherwise pixels. Ruler columns are
@@ -327,52 +433,19 @@ def _trackpoint_export_data(movie):
     # movies whose analysis-frame height is not stored in metadata. Conservatively stays in pixels
     # only when the height cannot be determined at all.
     frame_height = infer_trackpoint_frame_height(movie[MOVIE_ID], movie_metadata, trim_start_frame)
-    ruler_frame_points = []
-    for frame_number in frame_numbers:
-        points = [tp for tp in trackpoint_dicts
-                  if tp['frame_number'] == frame_number and odb.get_ruler_size(tp['label']) is not None]
-        if points:
-            ruler_frame_points = points
-            break
-    calibrated = (frame_height is not None) and odb.rulers_calibrated(ruler_frame_points, frame_height)
-    scale, _scale_units = odb.movie_scale(ruler_frame_points)
-
-    def column_unit(label):
-        """'px' for ruler markers or an uncalibrated movie; 'mm' for other markers when calibrated."""
-        if odb.get_ruler_size(label) is not None or not calibrated:
-            return 'px'
-        return 'mm'
-
-    def column_value(label, value):
-        if column_unit(label) == 'mm':
-            return round(float(value) * scale, 2)
-        return value
-
-    for tp in trackpoint_dicts:
-        label = tp['label']
-        unit = column_unit(label)
-        frame_dicts[tp['frame_number']][f"{label} x ({unit})"] = column_value(label, tp['x'])
-        frame_dicts[tp['frame_number']][f"{label} y ({unit})"] = column_value(label, tp['y'])
+    calibrated = (frame_height is not None) and odb.rulers_calibrated(table.ruler_frame_points, frame_height)
+    scale, _scale_units = odb.movie_scale(table.ruler_frame_points)
 
-    fieldnames = ['frame_number']
-    for label in labels:
-        unit = column_unit(label)
-        fieldnames.append(f"{label} x ({unit})")
-        fieldnames.append(f"{label} y ({unit})")
+    fieldnames = _trackpoint_fieldnames(table.labels, calibrated)
     logger.debug("fieldnames=%s", fieldnames)
 
-    rows = []
-    for frame in frame_numbers:
-        frame_dicts[frame]['frame_number'] = frame
-        rows.append(frame_dicts[frame])
-
     metadata_rows = [
         ('movie_id', movie[MOVIE_ID]),
         ('title', movie.get('title', '')),
         ('trim_start_frame', trim_start_frame),
         ('trim_end_frame', trim_end_frame),
-        ('exported_frame_count', len(frame_numbers)),
-        ('marker_count', len(labels)),
+        ('exported_frame_count', len(table.frame_numbers)),
+        ('marker_count', len(table.labels)),
         ('trackpoint_origin', movie_metadata.get(odb.TRACKPOINT_ORIGIN, '')),
         ('frame_height_px', frame_height if frame_height is not None else ''),
         ('ruler_calibrated', 'yes' if calibrated else 'no'),
@@ -398,40 +471,100 @@ def _trackpoint_export_data(movie):
         'status_values_seen',
         'error_values_seen',
     ]
-    chart_data = _chart_export_data(
-        frame_numbers,
-        labels,
-        trackpoint_dicts,
-        movie_metadata.get(odb.FPM),
-        scale if calibrated else 1,
-        calibrated,
-    )
     return {
-        'trackpoint_dicts': trackpoint_dicts,
+        'trackpoint_dicts': table.trackpoint_dicts,
         'fieldnames': fieldnames,
-        'rows': rows,
+        'rows': table.rows(calibrated, scale),
         'metadata_rows': metadata_rows,
         'marker_summary_fieldnames': marker_summary_fieldnames,
-        'marker_summary_rows': _marker_summary_rows(labels, trackpoint_dicts),
-        'chart_data': chart_data,
+        'marker_summary_rows': table.marker_summary_rows(),
+        'chart_data': table.chart_data(movie_metadata.get(odb.FPM), scale if calibrated else 1, calibrated),
     }
 
 
-def _csv_trackpoint_response(export_data):
-    with io.StringIO() as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=export_data['fieldnames'],
-            restval='',
-            extrasaction='ignore',
-        )
-        writer.writeheader()
-        for row in export_data['rows']:
+TRACKPOINT_EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _csv_trackpoint_chunks(movie):
+    """Return an iterator over the CSV export of the movie's trimmed trackpoints.
+    The header has the labels with points in the trim range, as the XLSX does, and the calibration of
+    the first ruler frame. Frames are read ahead only until every label in the movie's marker map has
+    been seen, normally the first frame, and then written as rows; the rest follow lazily in chunks.
+    If that takes more than C.TRACKPOINT_EXPORT_LOOKAHEAD_FRAMES frames (a marker with no points in
+    the range, or no marker map), the rest of the range is scanned for labels without keeping it,
+    and the rows resume where the read-ahead stopped."""
+    movie_id = movie[MOVIE_ID]
+    movie_metadata = odb.movie_metadata_with_trim_defaults(odb.get_movie_metadata(movie_id=movie_id))
+    trim_start_frame, trim_end_frame = odb.movie_trim_bounds(movie_metadata)
+
+    def trim_frames(frame_start):
+        return odb.iter_movie_trackpoints_by_frame(movie_id=movie_id, frame_start=frame_start,
+                                                   frame_end=trim_end_frame)
+
+    map_labels = set(odb.get_movie_marker_map(movie_id=movie_id, create=False).get(odb.MARKER_LABELS, {}))
+    labels = set()
+    ruler_frame_points = []
+    lookahead = []
+
+    def scan(frames, *, keep):
+        """Collect labels and the first ruler frame. Returns False if the read-ahead filled up."""
+        nonlocal ruler_frame_points
+        for frame_number, trackpoints in frames:
+            if keep:
+                lookahead.append((frame_number, trackpoints))
+            labels.update(tp['label'] for tp in trackpoints)
+            if not ruler_frame_points:
+                ruler_frame_points = _first_ruler_frame_points(trackpoints)
+            if map_labels and map_labels <= labels:
+                return True
+            if keep and len(lookahead) >= C.TRACKPOINT_EXPORT_LOOKAHEAD_FRAMES:
+                return False
+        return True
+
+    frames = trim_frames(trim_start_frame)
+    if not scan(frames, keep=True):
+        scan(trim_frames(lookahead[-1][0] + 1), keep=False)
+    labels = sorted(labels)
+    frame_height = infer_trackpoint_frame_height(movie_id, movie_metadata, trim_start_frame)
+    calibrated = (frame_height is not None) and odb.rulers_calibrated(ruler_frame_points, frame_height)
+    scale, _scale_units = odb.movie_scale(ruler_frame_points)
+    frames = itertools.chain(lookahead, frames)
+
+    def generate():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(_trackpoint_fieldnames(labels, calibrated))
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+        for frame_number, trackpoints in frames:
+            points = {tp['label']: (tp['x'], tp['y']) for tp in trackpoints}
+            row = [frame_number]
+            for label in labels:
+                point = points.get(label)
+                if point is None:
+                    row.extend(('', ''))
+                else:
+                    row.extend(_trackpoint_column_value(label, value, calibrated, scale) for value in point)
             writer.writerow(row)
-        response = make_response(f.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = 'attachment; filename="trackpoints.csv"'
-        return response
+            if out.tell() >= C.TRACKPOINT_EXPORT_CHUNK_BYTES:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+
+    return generate()
+
+
+def _csv_trackpoint_response(movie):
+    """Stream the CSV export of the movie's trimmed trackpoints."""
+    response = Response(_csv_trackpoint_chunks(movie))
+    response.headers['Content-Type'] = TRACKPOINT_EXPORT_CONTENT_TYPES['csv']
+    response.headers['Content-Disposition'] = 'attachment; filename="trackpoints.csv"'
+    return response
 
 
 def _write_worksheet_table(worksheet, fieldnames, rows, header_format):
@@ -493,7 +626,7 @@ def _add_position_chart(workbook, charts, chart_data, marker_colors, *, axis):
     return chart
 
 
-def _xlsx_trackpoint_response(export_data):
+def _xlsx_trackpoint_bytes(export_data):
     output = io.BytesIO()
     workbook = xlsxwriter.Workbook(output, {'in_memory': True})
     header_format = workbook.add_format({'bold': True, 'bg_color': '#D9EAF7', 'border': 1})
@@ -542,11 +675,43 @@ def _xlsx_trackpoint_response(export_data):
         charts.write(0, 0, 'No graphable marker data is available for charts.', metadata_key_format)
 
     workbook.close()
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return output.getvalue()
+
+
+def _xlsx_trackpoint_response(export_data):
+    response = make_response(_xlsx_trackpoint_bytes(export_data))
+    response.headers['Content-Type'] = TRACKPOINT_EXPORT_CONTENT_TYPES['xlsx']
     response.headers['Content-Disposition'] = 'attachment; filename="trackpoints.xlsx"'
     return response
 
+
+def _write_trackpoint_export(movie, fmt, path):
+    if fmt == 'xlsx':
+        with open(path, 'wb') as f:
+            f.write(_xlsx_trackpoint_bytes(_trackpoint_export_data(movie)))
+        return
+    with open(path, 'w', newline='') as f:
+        for chunk in _csv_trackpoint_chunks(movie):
+            f.write(chunk)
+
+
+def _cached_export_redirect(movie, fmt):
+    """Redirect to the stored CSV/XLSX export of this movie content version, rendering and storing it
+    on the first request. Returns None when the movie has no settled version or is not stored in S3,
+    in which case the caller renders the export directly."""
+    version = odb.movie_content_version(movie)
+    movie_data_urn = movie.get(MOVIE_DATA_URN)
+    if version is None or not movie_data_urn or not movie_data_urn.startswith(C.SCHEME_S3 + '://'):
+        return None
+    urn = export_cache_urn(movie_data_urn=movie_data_urn, version=version, extension=fmt)
+    if not object_exists(urn):
+        with tempfile.NamedTemporaryFile(suffix='.' + fmt) as tmp:
+            _write_trackpoint_export(movie, fmt, tmp.name)
+            write_object_from_path(urn, tmp.name, content_type=TRACKPOINT_EXPORT_CONTENT_TYPES[fmt])
+        purge_movie_export_cache(movie_id=movie[MOVIE_ID], keep_urn=urn,
+                                 keep_seconds=C.TRACKPOINT_EXPORT_KEEP_SECONDS)
+    return redirect(make_signed_url(urn=urn, download_name=f'trackpoints.{fmt}'), 302)
+
 ################################################################
 ### Handle invalid apikey exceptions
 @api_bp.errorhandler(InvalidAPI_Key)
@@ -606,6 +771,17 @@ def get_course_id():
     """Note that course_id's are no longer integers. They can even have spaces in them!"""
     return get(COURSE_ID)
 
+# Values of the get-movie-url 'kind' parameter and the movie attribute each one signs.
+MOVIE_URL_KINDS = {'data': MOVIE_DATA_URN, 'zipfile': MOVIE_ZIPFILE_URN, 'traced': MOVIE_TRACED_URN}
+
+def movie_url(movie, urn_name, *, lazy=False):
+    """Return the URL a client uses to download movie[urn_name]: a presigned S3 URL or, if lazy,
+    the get-movie-url redirect that signs it only when followed."""
+    if lazy:
+        kind = next(kind for kind, name in MOVIE_URL_KINDS.items() if name == urn_name)
+        return url_for('api.api_get_movie_url', movie_id=movie[MOVIE_ID], kind=kind, _external=True)
+    return make_signed_url(urn=movie[urn_name], version=odb.movie_object_version(movie, urn_name))
+
 def get_json(key):
     try:
         return json.loads(request.values.get(key))
@@ -987,16 +1163,56 @@ def api_delete_movie():
 
 @api_bp.route('/list-movies', methods=POST)
 def api_list_movies():
+    """
+    Lists the movies of the course context (or of all of the user's courses).
+    :param api_key:   authentication
+    :param course_id: if provided, the course to list
+    :param view:      if 'list', return only the attributes the movie list page shows
+    :param fields:    if provided, comma-separated movie attributes to return (plus movie_id)
+    :param limit:     if provided, page size; the response has a restart_marker for the next page
+    :param restart_marker: the restart_marker of the previous page
+    :param sort:      if 'last_activity_at', page through the movies newest first
+    :param urls:      if 'lazy', movie URLs point at get-movie-url instead of being presigned
+    """
     user = get_user_dict()
     context = course_context.resolve_course_context(
         user=user,
         requested_course_id=request.values.get(COURSE_ID),
         mode=course_context.CourseContextMode.READ,
     )
-    movies = odb.list_movies(
-        user_id=user[USER_ID],
-        course_id=context.effective_course_id,
-    )
+    fields = odb.MOVIE_LIST_FIELDS if request.values.get('view') == 'list' else None
+    sort = request.values.get('sort') or None
+    try:
+        if request.values.get('fields'):
+            fields = odb.movie_list_projection([field.strip() for field in request.values['fields'].split(',')
+                                                if field.strip()])
+        if sort is not None and sort not in odb.MOVIE_SORT_INDEXES:
+            raise ValueError(f"cannot sort movies by {sort!r}")
+    except ValueError as e:
+        return make_response({C.API_KEY_ERROR: True, C.API_KEY_MESSAGE: str(e)}, 400)
+
+    restart_marker = request.values.get('restart_marker') or None
+    paged = get_int('limit') is not None or restart_marker is not None or sort is not None
+    next_marker = None
+    if paged:
+        index_name = odb.MOVIE_SORT_INDEXES[sort] if sort else odb.COURSE_ID_IDX
+        key_names = {COURSE_ID, MOVIE_ID} | ({sort} if sort else set())
+        limit = max(1, min(get_int('limit', C.LIST_MOVIES_PAGE_LIMIT), C.LIST_MOVIES_MAX_PAGE_LIMIT))
+        try:
+            exclusive_start_key = admin_service.decode_restart_marker(
+                restart_marker, key_name=index_name, key_names=key_names)
+        except admin_service.InvalidRestartMarker as e:
+            return make_response({C.API_KEY_ERROR: True, C.API_KEY_MESSAGE: str(e)}, 400)
+        movies, last_evaluated_key = odb.list_movies_page(
+            user_id=user[USER_ID], course_id=context.effective_course_id, limit=limit,
+            exclusive_start_key=exclusive_start_key, fields=fields, sort=sort)
+        next_marker = admin_service.encode_restart_marker(last_evaluated_key, key_name=index_name)
+    else:
+        movies = odb.list_movies(
+            user_id=user[USER_ID],
+            course_id=context.effective_course_id,
+            fields=fields,
+        )
     for movie in movies:
         trace_lock = odb.movie_trace_lock_from_record(movie)
         if trace_lock:
@@ -1008,12 +1224,15 @@ def api_list_movies():
             }
         traced_urn = movie.get(MOVIE_TRACED_URN)
         if (traced_urn or "").startswith("s3:"):
-            movie[MOVIE_TRACED_URL] = make_signed_url(urn=traced_urn)
-    return jsonify({
+            movie[MOVIE_TRACED_URL] = movie_url(movie, MOVIE_TRACED_URN, lazy=get('urls') == 'lazy')
+    response = {
         'error': False,
         'movies': movies,
         'course_context': context.model_dump(),
-    })
+    }
+    if paged:
+        response['restart_marker'] = next_marker
+    return jsonify(response)
 
 @api_bp.route('/get-movie-metadata', methods=GET_POST)
 def api_get_movie_metadata():
@@ -1024,32 +1243,52 @@ def api_get_movie_metadata():
     :param frame_start: if provided, first frame to provide metadata about
     :param frame_count: if provided, number of frames to get info on. 0 is no frames
     :param get_all_if_tracking_completed: if status is TRACKING_COMPLETED_FLAG, return all of the metadata
+    :param since_frame: if provided, return only the frames after since_frame up to the last frame tracked
+                        (overrides frame_start, frame_count and get_all_if_tracking_completed).
+                        Pollers pass -1 first and then the returned next_since_frame.
+    :param urls: if 'lazy', movie_*_url values point at get-movie-url instead of being presigned
 
     Returns JSON dictionary:
     ['metadata'] - movie metadata (same as get-metadata)
     ['frames']   - dictionary individual frames
     ['frames'][10]      (where 10 is a frame number) - per-frame dictionary
     ['frames'][10]['markers'] - array of the trackpoints for that frame
+    ['next_since_frame'] - (only with since_frame) the last frame covered by this response.
+                           Less than since_frame if a retrace cleared frames the client already has.
     """
     user_id = get_user_id()
     movie_id = get_movie_id()
     frame_start = get_int('frame_start')
     frame_count = get_int('frame_count')
     get_all_if_tracking_completed = get_bool('get_all_if_tracking_completed')
+    since_frame = get_int('since_frame')
+    if since_frame is not None and since_frame < -1:
+        return make_response(E.INVALID_FRAME_NUMBER, 400)
 
     movie = odb.can_access_movie(user_id=user_id, movie_id=movie_id)
+    etag = movie_etag(movie)
+    if response := not_modified_response(etag):
+        return response
     movie_metadata = odb.get_movie_metadata(movie_id=movie[MOVIE_ID], get_last_frame_tracked=True)
     # If status TRACKING_COMPLETED_FLAG and the user has requested to get all trackpoints,
     # then get all the trackpoints.
     tracking_completed = movie_metadata.get(MOVIE_STATUS, '') == MOVIE_STATE_TRACING_COMPLETED
-    if tracking_completed and get_all_if_tracking_completed:
+    next_since_frame = None
+    if since_frame is not None:
+        # The tracer writes frames before it advances LAST_FRAME_TRACKED, so every frame up to it is stored.
+        last_frame_tracked = movie_metadata.get(LAST_FRAME_TRACKED)
+        next_since_frame = -1 if last_frame_tracked is None else int(last_frame_tracked)
+        frame_start = since_frame + 1
+        frame_count = max(next_since_frame - since_frame, 0)
+    elif tracking_completed and get_all_if_tracking_completed:
         frame_start = 0
         frame_count = C.MAX_FRAMES
-    if frame_start is not None:
+    if frame_start is not None and since_frame is None:
         if frame_count is None:
             return make_response(E.FRAME_START_NO_FRAME_COUNT, 400)
         if frame_count<1:
             return make_response(E.FRAME_COUNT_GT_0, 400)
+    if frame_start is not None and frame_count > 0:
         try:
             frame_height = infer_trackpoint_frame_height(movie_id, movie_metadata, frame_start)
             odb.ensure_bottom_left_trackpoints(movie_id=movie_id, frame_height=frame_height)
@@ -1076,21 +1315,29 @@ def api_get_movie_metadata():
         )
 
     # For any of these URNs, create URLs
-    for urn_name in [MOVIE_DATA_URN, MOVIE_ZIPFILE_URN, MOVIE_TRACED_URN]:
+    for urn_name in MOVIE_URL_KINDS.values():
         if (movie_metadata.get(urn_name,"") or "").startswith("s3:"):
             url_name = urn_name.replace("urn","url")
-            movie_metadata[url_name] = make_signed_url(urn=movie_metadata[urn_name])
+            movie_metadata[url_name] = movie_url(movie_metadata, urn_name, lazy=get('urls') == 'lazy')
 
     ret = {C.API_KEY_ERROR: False,
            C.API_KEY_METADATA: movie_metadata}
+    if next_since_frame is not None:
+        ret[C.API_KEY_NEXT_SINCE_FRAME] = next_since_frame
 
     if frame_start is not None:
         #
         # Get the trackpoints and then group by frame_number for the response
         ret[C.API_KEY_FRAMES] = defaultdict(dict)
-        tpts = odb.get_movie_trackpoints(movie_id=movie_id,
-                                         frame_start=frame_start,
-                                         frame_count=frame_count)
+        if since_frame is not None:
+            # frame_end is inclusive; stop at LAST_FRAME_TRACKED so unflushed frames are sent next poll.
+            tpts = odb.get_movie_trackpoints(movie_id=movie_id,
+                                             frame_start=frame_start,
+                                             frame_end=next_since_frame) if frame_count else []
+        else:
+            tpts = odb.get_movie_trackpoints(movie_id=movie_id,
+                                             frame_start=frame_start,
+                                             frame_count=frame_count)
         for tpt in tpts:
             frame_key = str(tpt['frame_number'])
             frame = ret[C.API_KEY_FRAMES][frame_key]
@@ -1100,7 +1347,26 @@ def api_get_movie_metadata():
 
     logger.debug("get_movie_metadata returns keys %s and %d frames total length %d bytes",
                  list(ret.keys()),len(ret.get('frames',[])),len(ret))
-    return jsonify(ret)
+    return with_etag(jsonify(ret), etag)
+
+
+@api_bp.route('/get-movie-url', methods=GET_POST)
+def api_get_movie_url():
+    """
+    Redirects to a presigned URL for one of a movie's S3 objects, signing it only when it is needed.
+    :param api_key:   authentication
+    :param movie_id:  movie
+    :param kind:      'data' (the movie), 'zipfile' (the frame zip) or 'traced' (the traced movie)
+    """
+    movie_id = get_movie_id()
+    urn_name = MOVIE_URL_KINDS.get(get('kind'))
+    if urn_name is None:
+        return make_response({C.API_KEY_ERROR: True, C.API_KEY_MESSAGE: 'kind must be data, zipfile or traced'}, 400)
+    movie = odb.can_access_movie(user_id=get_user_id(), movie_id=movie_id)
+    urn = movie.get(urn_name) or ""
+    if not urn.startswith("s3:"):
+        return make_response(E.NO_MOVIE_DATA, 404)
+    return redirect(make_signed_url(urn=urn, version=odb.movie_object_version(movie, urn_name)), code=302)
 
 
 @api_bp.route('/acquire-movie-analysis-lease', methods=POST)
@@ -1169,19 +1435,26 @@ def api_get_movie_trackpoints():
     :param api_key:   authentication
     :param movie_id:   movie
     :param: format - 'xlsx' or 'json'
-    Note: this builds the entire response in memory. That is not a problem, as the maximum movie is 10,000 frames.
-    Even with 100 trackpoints per frame, this will easily fit in RAM.
+    Note: XLSX and JSON build the entire response in memory. That is not a problem, as the maximum movie
+    is 10,000 frames. Even with 100 trackpoints per frame, this will easily fit in RAM. CSV is streamed.
+    CSV and XLSX for a settled movie are rendered once per content version, stored next to the movie,
+    and answered with a redirect to a signed URL.
     """
     movie_id = get_movie_id()
     movie = odb.can_access_movie(user_id=get_user_id(), movie_id=movie_id)
-
-    export_data = _trackpoint_export_data(movie)
+    etag = movie_etag(movie)
+    if response := not_modified_response(etag):
+        return response
 
     if get('format')=='json':
-        return jsonify({'error':'False', 'trackpoint_dicts':export_data['trackpoint_dicts']})
-    if get('format')=='xlsx':
-        return _xlsx_trackpoint_response(export_data)
-    return _csv_trackpoint_response(export_data)
+        table = _trackpoint_table(movie)[3]
+        return with_etag(jsonify({'error':'False', 'trackpoint_dicts':table.trackpoint_dicts}), etag)
+    fmt = 'xlsx' if get('format')=='xlsx' else 'csv'
+    if response := _cached_export_redirect(movie, fmt):
+        return response
+    if fmt=='xlsx':
+        return with_etag(_xlsx_trackpoint_response(_trackpoint_export_data(movie)), etag)
+    return with_etag(_csv_trackpoint_response(movie), etag)
 
 
 @api_bp.route('/set-movie-trim', methods=POST)
@@ -9,7 +9,7 @@ import os
 import time
 import logging
 
-from flask import Flask, request, render_template, jsonify, make_response, Response, redirect
+from flask import Flask, request, render_template, jsonify, make_response, Response, redirect, g
 from werkzeug.exceptions import NotFound
 from werkzeug.exceptions import HTTPException
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -188,6 +188,22 @@ def _inject_movie_states():
         'tracing_completed': MOVIE_STATE_TRACING_COMPLETED,
     }}
 
+@app.before_request
+def _begin_read_cache():
+    """Memoize DynamoDB reads by primary key for the rest of this request."""
+    g.ddbo_read_cache_token = odb.begin_read_cache()
+
+
+@app.teardown_request
+def _end_read_cache(_exc):
+    token = g.pop('ddbo_read_cache_token', None)
+    if token is not None:
+        odb.end_read_cache(token)
+    try:
+        odb.flush_api_key_usage(force=False)
+    except Exception:   # pylint: disable=broad-exception-caught
+        logger.exception("cannot flush api_key usage")
+
 @app.before_request
 def _before_request_config_check():
     """If DynamoDB, S3 CORS, or S3 bucket region is broken, redirect to the configuration error page."""
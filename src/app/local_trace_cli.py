@@ -149,9 +149,7 @@ def cleanup_cli_scaffold(ids: dict[str, str]) -> None:
 def write_outputs(*, movie_id: str, output_dir: Path, output_prefix: str, write_zip: bool) -> dict[str, Path]:
     output_dir.mkdir(parents=True, exist_ok=True)
     metadata = odb.get_movie_metadata(movie_id=movie_id, get_last_frame_tracked=True)
-    frames = DDBO().get_frames(movie_id)
-    frames_with_trackpoints = [frame for frame in frames if "trackpoints" in frame]
-    frames_with_trackpoints.sort(key=lambda frame: int(frame[FRAME_NUMBER]))
+    frames_with_trackpoints = list(odb.iter_trackpoint_frames(movie_id=movie_id))
 
     json_path = output_dir / f"{output_prefix}-trackpoints.json"
     json_path.write_text(json.dumps([serialize_frame_record(frame) for frame in frames_with_trackpoints], indent=2))
@@ -15,7 +15,12 @@ import functools
 import hashlib
 import uuid
 import time
+import contextvars
+import threading
+from contextlib import contextmanager
 from functools import wraps
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 import boto3
@@ -91,6 +96,43 @@ def movie_trace_lock_from_record(movie):
     return None
 
 
+def movie_content_version(movie):
+    """Return a version of the movie's stored content (metadata, trackpoints and marker map), or None
+    while the last write is within C.MOVIE_ETAG_SETTLE_SECONDS.
+    The movie item carries last_activity_at, last_frame_tracked and marker_map_version, which
+    trackpoint and marker-map writes advance; the whole item is hashed because status and
+    dimension writes do not touch last_activity_at. Trace and analysis leases are not content.
+    last_activity_at has whole-second resolution, so a second write in the same second would
+    not change it; hence no version until the movie has settled."""
+    last_activity_at = movie.get(LAST_ACTIVITY_AT)
+    if last_activity_at is None or int(last_activity_at) > time.time() - C.MOVIE_ETAG_SETTLE_SECONDS:
+        return None
+    content = {key: value for key, value in movie.items() if key not in MOVIE_LEASE_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def movie_object_version(movie, urn_name):
+    """Return a value that changes whenever the object at movie[urn_name] is rewritten in place:
+    VERSION for the movie data, TRACED_AT for the traced MP4 and the frame zip.
+    Signed URLs are memoized per version, so a rewritten object gets a new URL in every process."""
+    return movie.get(VERSION if urn_name == MOVIE_DATA_URN else TRACED_AT)
+
+
+def movie_version_token(movie):
+    """Return a token that changes whenever the movie's metadata or trackpoints do, for use as an ETag:
+    the content version plus the active trace and analysis leases (heartbeats do not change it).
+    None while movie_content_version() is None."""
+    content_version = movie_content_version(movie)
+    if content_version is None:
+        return None
+    trace_lock = movie_trace_lock_from_record(movie)
+    analysis_lock = movie_analysis_lock_from_record(movie)
+    state = [content_version,
+             trace_lock and [trace_lock.job_id, trace_lock.state, trace_lock.acquired_at],
+             analysis_lock and [analysis_lock.lease_id, analysis_lock.acquired_at]]
+    return hashlib.sha256(json.dumps(state, default=str).encode()).hexdigest()[:32]
+
+
 def movie_analysis_lock_from_record(movie):
     """Return an active analysis lease represented by an already-fetched movie record."""
     if movie and int(movie.get(ANALYSIS_LOCK_EXPIRES_AT, 0)) > int(time.time()):
@@ -121,6 +163,8 @@ EMAIL     = 'email'
 USER_NAME = 'user_name'
 ENABLED   = 'enabled'
 USE_COUNT = 'use_count'
+FIRST_LOGIN_AT = 'first_login_at'
+LAST_LOGIN_AT = 'last_login_at'
 ADMIN_FOR_COURSES = 'admin_for_courses' # user.admin_for_courses[]
 SUPER_ROLE = 'super_role'
 SUPER_ROLE_NONE = 'none'
@@ -145,7 +189,13 @@ MOVIE_DATA_URN = 'movie_data_urn'             # original, uploaded
 MOVIE_ROTATION = 'rotation'                   # should be None, or 0, 90, 270 or 180 (integer)
 MOVIE_TRACED_URN = 'movie_traced_urn'         # with tracing
 MOVIE_ZIPFILE_URN = 'movie_zipfile_urn'       # rotated and scaled
+MOVIE_FRAME_INDEX_URN = 'movie_frame_index_urn'  # JSON keyframe/sample-offset index of the original
 NEEDS_RETRACING = 'needs_retracing'           # traced MP4 may be stale after marker edits
+TRACED_MOVIE_GOP = 'traced_movie_gop'         # keyframe interval of the traced MP4, if patchable
+TRACED_MOVIE_FRAME_START = 'traced_movie_frame_start'  # first movie frame in the traced MP4
+TRACED_MOVIE_FRAME_END = 'traced_movie_frame_end'      # last movie frame in the traced MP4
+TRACED_MOVIE_STALE_FROM = 'traced_movie_stale_from'    # earliest frame edited since the last trace
+TRACED_AT = 'traced_at'                       # when the traced MP4 and frame zip were last written
 MARKER_ID = 'marker_id'
 MARKERS = 'markers'
 MARKER_LABELS = 'marker_labels'
@@ -159,6 +209,7 @@ TRIM_START_FRAME = 'trim_start_frame'
 TRIM_END_FRAME = 'trim_end_frame'
 UPLOADED_AT = 'uploaded_at'
 LAST_ACTIVITY_AT = 'last_activity_at'
+MARKER_MAP_VERSION = 'marker_map_version'  # bumped whenever the movie's marker map changes
 UPLOAD_BYTES_EXPECTED = 'upload_bytes_expected'
 UPLOAD_STAGING_URN = 'upload_staging_urn'
 UPLOAD_EVENT_ID = 'upload_event_id'
@@ -182,6 +233,14 @@ TRACKPOINT_ORIGIN_BOTTOM_LEFT = 'bottom-left'
 TRACKPOINT_MIGRATION_ORIGIN = 'trackpoint_migration_origin'
 TRACKPOINT_MIGRATION_STATE = 'trackpoint_migration_state'
 TRACKPOINT_MIGRATION_IN_PROGRESS = 'in-progress'
+TRACKPOINT_STORAGE = 'trackpoint_storage'
+TRACKPOINT_STORAGE_FRAMES = 'frames'        # a trackpoints list on each movie_frames row (default)
+TRACKPOINT_STORAGE_COLUMNAR = 'columnar'    # C.TRACKPOINT_CHUNK_FRAMES frames per chunk item
+# On a movie, bumped by each retrace; on a frame or chunk item, the movie's generation when it was written.
+TRACKPOINT_GENERATION = 'trackpoint_generation'
+# [generation, first frame, last frame or None] for each retrace whose superseded trackpoints remain stored.
+TRACKPOINT_INVALIDATIONS = 'trackpoint_invalidations'
+TRACKPOINT_STATE_FIELDS = [MOVIE_ID, TRACKPOINT_STORAGE, TRACKPOINT_GENERATION, TRACKPOINT_INVALIDATIONS]
 RESEARCH_USE = 'research_use'
 CREDIT_BY_NAME = 'credit_by_name'
 ATTRIBUTION_NAME = 'attribution_name'
@@ -198,8 +257,18 @@ MOVIE_METADATA_BULK_PROPS = (FPS, WIDTH, HEIGHT, TOTAL_FRAMES, TOTAL_BYTES)
 # movie_frames table
 FRAME_NUMBER = 'frame_number'
 MOVIE_MARKER_MAP_FRAME_NUMBER = -100
+# Columnar trackpoint chunk k is stored at frame_number TRACKPOINT_CHUNK_FRAME_NUMBER + k
+TRACKPOINT_CHUNK_FRAME_NUMBER = -1_000_000
+CHUNK_OFFSETS = 'offsets'       # frame offsets within the chunk (chunk item) or a column
+CHUNK_COLUMNS = 'columns'
+CHUNK_CONSTANTS = 'constants'   # column attributes that are the same on every trackpoint
+CHUNK_VALUES = 'values'         # column attributes that vary, one entry per trackpoint
+CHUNK_REVISION = 'revision'
 FRAME_URN = 'frame_urn'
-LAST_FRAME_TRACKED = 'last_frame_tracked' # computed, not stored
+LAST_FRAME_TRACKED = 'last_frame_tracked' # maintained by every trackpoint write; see check_last_frame_tracked()
+# Copy of frame_number on frame items that have trackpoints; the sparse key of MOVIE_TRACKED_FRAMES_IDX.
+TRACKED_FRAME_NUMBER = 'tracked_frame_number'
+MOVIE_TRACKED_FRAMES_IDX = 'movie_tracked_frames_idx'
 
 # Values for the movie status field (single source of truth)
 # When status (tracking progress) was last updated; used to detect stale "tracking" lock (e.g. >1h ago)
@@ -222,6 +291,30 @@ DEFAULT_COURSE_NAME = 'default_course_name'
 LEGACY_PRIMARY_COURSE_ID = 'primary_course_id'
 LEGACY_PRIMARY_COURSE_NAME = 'primary_course_name'
 
+# Movie attributes the movie list page uses (list-movies view=list), including those needed for
+# the trace-lock badge and the traced-movie link.
+MOVIE_LIST_FIELDS = (
+    MOVIE_ID, TITLE, DESCRIPTION, USER_ID, USER_NAME, COURSE_ID, ORIG_MOVIE, PUBLISHED, DELETED,
+    MOVIE_STATUS, TOTAL_FRAMES, TOTAL_BYTES, WIDTH, HEIGHT, FPS, UPLOADED_AT, DATE_UPLOADED,
+    LAST_ACTIVITY_AT, RESEARCH_USE, CREDIT_BY_NAME, NEEDS_RETRACING, MOVIE_TRACED_URN, TRACED_AT,
+    TRACE_JOB_ID, TRACE_LOCK_STATE, TRACE_LOCK_ACQUIRED_AT, TRACE_LOCK_HEARTBEAT_AT,
+    TRACE_LOCK_EXPIRES_AT, TRACE_LOCK_STARTED_BY_USER_ID, TRACE_LOCK_STARTED_BY_USER_NAME,
+)
+# Attributes the list API always projects: the key and what movie_trace_lock_from_record reads.
+MOVIE_LEASE_FIELDS = (
+    TRACE_JOB_ID, TRACE_LOCK_STATE, TRACE_LOCK_ACQUIRED_AT, TRACE_LOCK_HEARTBEAT_AT, TRACE_LOCK_EXPIRES_AT,
+    TRACE_LOCK_STARTED_BY_USER_ID, TRACE_LOCK_STARTED_BY_USER_NAME,
+    ANALYSIS_LEASE_ID, ANALYSIS_LOCK_ACQUIRED_AT, ANALYSIS_LOCK_HEARTBEAT_AT, ANALYSIS_LOCK_EXPIRES_AT,
+    ANALYSIS_LOCK_STARTED_BY_USER_ID, ANALYSIS_LOCK_STARTED_BY_USER_NAME,
+)
+MOVIE_LIST_REQUIRED_FIELDS = (
+    MOVIE_ID, TRACE_JOB_ID, TRACE_LOCK_STATE, TRACE_LOCK_ACQUIRED_AT, TRACE_LOCK_HEARTBEAT_AT,
+    TRACE_LOCK_EXPIRES_AT, TRACE_LOCK_STARTED_BY_USER_ID, TRACE_LOCK_STARTED_BY_USER_NAME,
+)
+# Sort orders for listing a course's movies, and the movies GSI (HASH course_id) that provides each.
+COURSE_ID_IDX = 'course_id_idx'
+MOVIE_SORT_INDEXES = {LAST_ACTIVITY_AT: 'course_activity_idx'}
+
 
 def normalize_user_default_course(user):
     """Expose migrated default-course names for a legacy DynamoDB user row."""
@@ -405,6 +498,56 @@ def dynamodb_error_debugger(func):
     return wrapper
 
 
+class DDBOReadCache:
+    """Identity map of items read by primary key during one request or Lambda invocation."""
+
+    def __init__(self):
+        self.items = {}
+        self.hits = 0
+        self.misses = 0
+
+
+_READ_CACHE: contextvars.ContextVar = contextvars.ContextVar('ddbo_read_cache', default=None)
+
+
+def begin_read_cache():
+    """Start a read cache for the current context. Returns the token for end_read_cache()."""
+    return _READ_CACHE.set(DDBOReadCache())
+
+
+def end_read_cache(token):
+    """Drop the read cache started by begin_read_cache() and log its hit/miss counts."""
+    cache = _READ_CACHE.get()
+    try:
+        _READ_CACHE.reset(token)
+    except ValueError:          # ended from a different context (e.g. a streamed response)
+        _READ_CACHE.set(None)
+    if cache is not None and (cache.hits or cache.misses):
+        logger.debug("ddbo read cache hits=%s misses=%s", cache.hits, cache.misses)
+    return cache
+
+
+def current_read_cache():
+    """Return the active read cache, or None outside a request scope."""
+    return _READ_CACHE.get()
+
+
+@contextmanager
+def read_cache():
+    """Memoize DDBO.get_movie/get_user/get_course/get_api_key_dict for the duration of the block.
+    Writes made through DDBO invalidate the items they touch; writes by other processes are not
+    seen until the block ends, so scopes should be no longer than one request."""
+    token = begin_read_cache()
+    try:
+        yield _READ_CACHE.get()
+    finally:
+        end_read_cache(token)
+
+
+BATCH_GET_MAX_KEYS = 100       # DynamoDB BatchGetItem limit
+BATCH_GET_BACKOFF = 0.05        # seconds before the first retry of unprocessed keys
+
+
 # pylint: disable=too-many-public-methods, too-many-instance-attributes
 class DDBO:
     """Singleton for accessing dynamodb database"""
@@ -469,6 +612,65 @@ class DDBO:
                     for item in key_schema
                     if item['KeyType'] == 'HASH')
 
+    @staticmethod
+    def _cached_item(table, key_value, fetch):
+        """Return fetch() (the item or None), memoized in the active read cache.
+        Callers get a copy, so mutating it never changes the cached item."""
+        cache = _READ_CACHE.get()
+        if cache is None:
+            return fetch()
+        key = (table.name, key_value)
+        if key in cache.items:
+            cache.hits += 1
+        else:
+            cache.misses += 1
+            cache.items[key] = fetch()
+        return copy.deepcopy(cache.items[key])
+
+    def forget_cached_item(self, table, key_value):
+        """Invalidate one item in the active read cache and any validated api_key that depends
+        on it. Call before writing it."""
+        cache = _READ_CACHE.get()
+        if cache is not None:
+            cache.items.pop((table.name, key_value), None)
+        if table is self.api_keys:
+            forget_validated_api_keys(api_key=key_value)
+        elif table is self.users:
+            forget_validated_api_keys(user_id=key_value)
+
+    def batch_get_items(self, table, key_values):
+        """Return {key_value: item} for the items of table that exist, using BatchGetItem
+        (100 keys per request, consistent reads) and retrying unprocessed keys with backoff.
+        Items already in the active read cache are not fetched again."""
+        pk = self._get_partition_key_name(table.key_schema)
+        cache = _READ_CACHE.get()
+        found = {}
+        wanted = []
+        for key_value in dict.fromkeys(key_values):
+            if cache is not None and (table.name, key_value) in cache.items:
+                cache.hits += 1
+                if cache.items[(table.name, key_value)] is not None:
+                    found[key_value] = copy.deepcopy(cache.items[(table.name, key_value)])
+            else:
+                wanted.append(key_value)
+        for start in range(0, len(wanted), BATCH_GET_MAX_KEYS):
+            batch = wanted[start:start + BATCH_GET_MAX_KEYS]
+            request = {table.name: {'Keys': [{pk: key_value} for key_value in batch], 'ConsistentRead': True}}
+            attempt = 0
+            while request:
+                if attempt:
+                    time.sleep(min(BATCH_GET_BACKOFF * 2 ** attempt, 1.0))
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(table.name, []):
+                    found[item[pk]] = item
+                request = response.get('UnprocessedKeys') or None
+                attempt += 1
+            if cache is not None:
+                for key_value in batch:
+                    cache.misses += 1
+                    cache.items[(table.name, key_value)] = copy.deepcopy(found.get(key_value))
+        return found
+
     # pylint: disable=too-many-locals
     def update_table(self, table, key_value, updates: dict, *, condition_expression=None):
         """
@@ -523,6 +725,7 @@ class DDBO:
             params["ConditionExpression"] = condition_expression
 
         # 5) run the update
+        self.forget_cached_item(table, key_value)
         return table.update_item(**params)
 
     def update_movie(self, movie_id, updates: dict, *, touch_activity=True, expected_status=None):
@@ -633,6 +836,7 @@ class DDBO:
             started_by_user_name=started_by_user_name,
         )
         try:
+            self.forget_cached_item(self.movies, movie[MOVIE_ID])
             self.movies.update_item(
                 Key={MOVIE_ID: movie[MOVIE_ID]},
                 UpdateExpression=("SET #lease_id=:lease_id, #acquired=:now, #heartbeat=:now, "
@@ -664,6 +868,7 @@ class DDBO:
         """Renew the caller's analysis lease, returning False after loss or expiry."""
         now = int(time.time())
         try:
+            self.forget_cached_item(self.movies, movie_id)
             self.movies.update_item(
                 Key={MOVIE_ID: movie_id},
                 UpdateExpression="SET #heartbeat=:now, #expires=:expires",
@@ -690,6 +895,7 @@ class DDBO:
                        ANALYSIS_LOCK_HEARTBEAT_AT, ANALYSIS_LOCK_EXPIRES_AT,
                        ANALYSIS_LOCK_STARTED_BY_USER_ID, ANALYSIS_LOCK_STARTED_BY_USER_NAME)
         try:
+            self.forget_cached_item(self.movies, movie_id)
             self.movies.update_item(
                 Key={MOVIE_ID: movie_id},
                 UpdateExpression="REMOVE " + ", ".join(f"#lock_{index}" for index in range(len(lock_fields))),
@@ -718,6 +924,7 @@ class DDBO:
             started_by_user_name=started_by_user_name,
         )
         try:
+            self.forget_cached_item(self.movies, movie[MOVIE_ID])
             self.movies.update_item(
                 Key={MOVIE_ID: movie[MOVIE_ID]},
                 UpdateExpression=("SET #job_id=:job_id, #state=:state, #acquired=:now, #heartbeat=:now, "
@@ -758,6 +965,7 @@ class DDBO:
         """Claim one queued lease; duplicate SQS deliveries are harmless no-ops."""
         now = int(time.time())
         try:
+            self.forget_cached_item(self.movies, movie_id)
             self.movies.update_item(
                 Key={MOVIE_ID: movie_id},
                 UpdateExpression="SET #state=:running, #heartbeat=:now, #expires=:expires",
@@ -775,6 +983,7 @@ class DDBO:
 
     def heartbeat_movie_trace_lock(self, *, movie_id, job_id):
         now = int(time.time())
+        self.forget_cached_item(self.movies, movie_id)
         self.movies.update_item(
             Key={MOVIE_ID: movie_id},
             UpdateExpression="SET #heartbeat=:now, #expires=:expires",
@@ -784,6 +993,25 @@ class DDBO:
             ExpressionAttributeValues={":job_id": job_id, ":now": now, ":expires": now + 15 * 60},
         )
 
+    def advance_last_frame_tracked(self, movie_id, frame_number):
+        """Raise the movie's LAST_FRAME_TRACKED to frame_number unless it is already at or past it.
+        A single conditional update, so concurrent writers never move the frontier backwards."""
+        assert is_movie_id(movie_id)
+        names = {'#movie_id': MOVIE_ID, '#last_frame_tracked': LAST_FRAME_TRACKED}
+        values = {':frame_number': int(frame_number), ':null': 'NULL'}
+        self.forget_cached_item(self.movies, movie_id)
+        try:
+            self.movies.update_item(
+                Key={MOVIE_ID: movie_id}, UpdateExpression='SET #last_frame_tracked = :frame_number',
+                ConditionExpression=('attribute_exists(#movie_id) AND (attribute_not_exists(#last_frame_tracked) '
+                                     'OR attribute_type(#last_frame_tracked, :null) '
+                                     'OR #last_frame_tracked < :frame_number)'),
+                ExpressionAttributeNames=names, ExpressionAttributeValues=values,
+            )
+        except ClientError as exc:
+            if exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+
     def finish_movie_trace(self, *, movie_id, job_id, updates):
         """Publish a terminal state only while this worker owns the lease."""
         now = int(time.time())
@@ -799,6 +1027,7 @@ class DDBO:
         expression = ("SET " + ", ".join(f"#{key}=:{key}" for key in updates)
                       + ", #last_activity_at=:last_activity_at REMOVE "
                       + ", ".join(f"#lock_{index}" for index in range(len(lock_fields))))
+        self.forget_cached_item(self.movies, movie_id)
         self.movies.update_item(
             Key={MOVIE_ID: movie_id}, UpdateExpression=expression,
             ConditionExpression="#job_id=:job_id",
@@ -810,11 +1039,13 @@ class DDBO:
     def put_api_key_dict(self,api_key_dict):
         # no ConditionExpression - it's okay if the key already exists
         logger.debug("put_api_key_dict(user_id=%s enabled=%s)", api_key_dict.get(USER_ID), api_key_dict.get(ENABLED))
+        self.forget_cached_item(self.api_keys, api_key_dict[API_KEY])
         return self.api_keys.put_item(Item = api_key_dict)
 
     def get_api_key_dict(self,api_key):
         try:
-            ret =  self.api_keys.get_item(Key = { API_KEY :api_key}).get('Item',None)
+            ret = self._cached_item(self.api_keys, api_key,
+                                    lambda: self.api_keys.get_item(Key = { API_KEY :api_key}).get('Item',None))
             logger.debug("get_api_key_dict(found=%s)", ret is not None)
             return ret
         except Exception as e:
@@ -834,7 +1065,8 @@ class DDBO:
 
     def get_user_login_times(self, user_id):
         """Return (first_used_at, last_used_at) for a user by aggregating across all their api_keys.
-        Returns (None, None) if the user has no api_keys or none have been used yet."""
+        Returns (None, None) if the user has no api_keys or none have been used yet.
+        The users table keeps these as first_login_at/last_login_at; this is for backfilling them."""
         last_evaluated_key = None
         first_used = None
         last_used = None
@@ -860,6 +1092,7 @@ class DDBO:
         return first_used, last_used
 
     def del_api_key(self, api_key):
+        self.forget_cached_item(self.api_keys, api_key)
         self.api_keys.delete_item(Key = { API_KEY :api_key},
                                   ConditionExpression = 'attribute_exists(api_key)' )
 
@@ -869,11 +1102,18 @@ class DDBO:
         """gets the user dictionary given the user_id. Raise InvalidUser_id if it does not exist.
         This is critical, so we always do a consistent read.
         """
-        item = self.users.get_item(Key = { USER_ID :user_id},ConsistentRead=True).get('Item',None)
+        item = self._cached_item(
+            self.users, user_id,
+            lambda: self.users.get_item(Key = { USER_ID :user_id},ConsistentRead=True).get('Item',None))
         if item:
             return normalize_user_default_course(item)
         raise InvalidUser_Id(user_id)
 
+    def get_users_batch(self, user_ids):
+        """Return {user_id: user} for the user_ids that exist, in a few BatchGetItem requests."""
+        return {user_id: normalize_user_default_course(item)
+                for user_id, item in self.batch_get_items(self.users, user_ids).items()}
+
     def get_user_email(self, email):
         """gets the user dictionary given an email address. If email is provided, look up user by email."""
         email = normalize_email(email)
@@ -911,6 +1151,7 @@ class DDBO:
                     f"Course {default_course_id} does not exist; cannot create user for {email}"
                 ) from None
 
+        self.forget_cached_item(self.users, user_id)
         try:
             self.dynamodb.meta.client.transact_write_items(
                 TransactItems=[
@@ -944,6 +1185,7 @@ class DDBO:
         if userdict[ EMAIL ] == new_email:
             return
 
+        self.forget_cached_item(self.users, user_id)
         try:
             client = self.dynamodb.meta.client
             client.transact_write_items(
@@ -1019,6 +1261,7 @@ class DDBO:
         # Now batch delete the API keys
         with self.api_keys.batch_writer() as batch:
             for api_key in api_keys:
+                self.forget_cached_item(self.api_keys, api_key)
                 batch.delete_item(Key={ API_KEY : api_key})
 
         # Remove them from every course in which they are an admin
@@ -1042,6 +1285,7 @@ class DDBO:
             raise RuntimeError(f"{EMAIL} not in {user}")
 
         # Finally delete the user and the unique email
+        self.forget_cached_item(self.users, user_id)
         client = self.dynamodb.meta.client
         logger.warning("Does not require the email exists in unique_emails. When we did that, it did not work.")
         client.transact_write_items(
@@ -1067,12 +1311,17 @@ class DDBO:
     ### course management
 
     def get_course(self,course_id):
-        course = self.courses.get_item(ConsistentRead=True,
-                                       Key = { COURSE_ID :course_id}).get('Item',None)
+        course = self._cached_item(
+            self.courses, course_id,
+            lambda: self.courses.get_item(ConsistentRead=True, Key = { COURSE_ID :course_id}).get('Item',None))
         if not course:
             raise InvalidCourse_Id(course_id)
         return course
 
+    def get_courses_batch(self, course_ids):
+        """Return {course_id: course} for the course_ids that exist, in a few BatchGetItem requests."""
+        return self.batch_get_items(self.courses, course_ids)
+
 
     def put_course(self, coursedict, *, ok_if_exists=False):
         """Puts the course into the database. Raises an error if the course already exists"""
@@ -1096,6 +1345,7 @@ class DDBO:
             raise ExistingCourse_Id(f"Course key {coursedict[COURSE_KEY]} already exists")
         ################
 
+        self.forget_cached_item(self.courses, coursedict[COURSE_ID])
         try:
 
             if ok_if_exists:
@@ -1121,6 +1371,7 @@ class DDBO:
             raise RuntimeError(f"course {course_id} has {len(items)} movies.")
 
         # delete the course
+        self.forget_cached_item(self.courses, course_id)
         self.courses.delete_item(Key = { COURSE_ID :course_id})
 
         last_evaluated_key = None
@@ -1190,13 +1441,19 @@ class DDBO:
             'ConsistentRead': True
         }
 
-        if fields:
+        cache = _READ_CACHE.get()
+        if fields and cache is not None and (self.movies.name, movie_id) in cache.items:
+            cached = self._cached_item(self.movies, movie_id, lambda: None)
+            movie_dict = None if cached is None else {f: cached[f] for f in fields if f in cached}
+        elif fields:
             # Map fields to #alias to avoid DynamoDB reserved word conflicts
             attr_names = {f"#f{i}": field for i, field in enumerate(fields)}
             params['ProjectionExpression'] = ", ".join(attr_names.keys())
             params['ExpressionAttributeNames'] = attr_names
-
-        movie_dict = self.movies.get_item(**params).get('Item')
+            movie_dict = self.movies.get_item(**params).get('Item')
+        else:
+            movie_dict = self._cached_item(self.movies, movie_id,
+                                           lambda: self.movies.get_item(**params).get('Item'))
         if isinstance(movie_dict,dict):
             return movie_dict
         raise InvalidMovie_Id(movie_id)
@@ -1211,6 +1468,7 @@ class DDBO:
         except ValidationError:
             logger.error("moviedict=%s",moviedict)
             raise
+        self.forget_cached_item(self.movies, moviedict[MOVIE_ID])
         self.movies.put_item(Item=moviedict)
 
     def batch_delete_movie_ids(self, ids):
@@ -1218,6 +1476,7 @@ class DDBO:
         with self.movies.batch_writer() as batch:
             for the_id in ids:
                 assert is_movie_id(the_id)
+                self.forget_cached_item(self.movies, the_id)
                 batch.delete_item(Key={ MOVIE_ID: the_id})
 
     def get_movies_for_user_id(self, user_id):
@@ -1239,26 +1498,63 @@ class DDBO:
                 break
         return movies
 
-    def get_movies_for_course_id(self, course_id):
-        """Query movies.course_id_idx and return all movie_ids for the given user_id (with pagination)."""
+    # pylint: disable=too-many-arguments
+    def query_movies_for_course_id(self, course_id, *, fields=None, limit=None, exclusive_start_key=None,
+                                   sort=None):
+        """Return one page of movies.course_id_idx for course_id as (movies, last_evaluated_key).
+        :param fields: if provided, only these attributes are returned (ProjectionExpression).
+        :param limit: maximum number of movies to read.
+        :param exclusive_start_key: the last_evaluated_key of the previous page.
+        :param sort: a key of MOVIE_SORT_INDEXES; the page is read from that index, newest first.
+                     Movies without the sort attribute are not in the index.
+        Uses the resource's client, which (unlike the Table resource) may be shared between threads;
+        the resource has already installed its attribute-value (de)serialization on it.
+        """
+        params = {
+            'TableName': self.movies.name,
+            'IndexName': COURSE_ID_IDX,
+            'KeyConditionExpression': '#course_id = :course_id',
+            'ExpressionAttributeNames': {'#course_id': COURSE_ID},
+            'ExpressionAttributeValues': {':course_id': course_id},
+        }
+        if sort is not None:
+            params['IndexName'] = MOVIE_SORT_INDEXES[sort]
+            params['ScanIndexForward'] = False
+        if fields:
+            attr_names = {f"#f{i}": field for i, field in enumerate(fields)}
+            params['ProjectionExpression'] = ", ".join(attr_names)
+            params['ExpressionAttributeNames'].update(attr_names)
+        if limit is not None:
+            params['Limit'] = limit
+        if exclusive_start_key:
+            params['ExclusiveStartKey'] = exclusive_start_key
+        response = self.dynamodb.meta.client.query(**params)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    def get_movies_for_course_id(self, course_id, *, fields=None):
+        """Query movies.course_id_idx and return all movies for the given course_id (with pagination)."""
         movies = []
         last_evaluated_key = None
-
         while True:
-            query_kwargs = { 'IndexName': 'course_id_idx',
-                             'KeyConditionExpression': Key(  COURSE_ID  ).eq( course_id )}
-
-            if last_evaluated_key:
-                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
-            response = self.movies.query(**query_kwargs)
-            movies.extend( response['Items'] )
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
+            page, last_evaluated_key = self.query_movies_for_course_id(
+                course_id, fields=fields, exclusive_start_key=last_evaluated_key)
+            movies.extend(page)
             if not last_evaluated_key:
                 break
-        logger.debug("get_movies_for_course_id(%s)=%s",course_id,movies)
+        logger.debug("get_movies_for_course_id(%s) returned %s movies", course_id, len(movies))
         return movies
 
+    def get_movies_for_course_ids(self, course_ids, *, fields=None):
+        """Return the movies of every course in course_ids, in that order, querying the courses
+        concurrently on at most C.LIST_MOVIES_MAX_WORKERS threads."""
+        course_ids = list(dict.fromkeys(course_ids))
+        if len(course_ids) <= 1:
+            return [movie for course_id in course_ids
+                    for movie in self.get_movies_for_course_id(course_id, fields=fields)]
+        with ThreadPoolExecutor(max_workers=min(C.LIST_MOVIES_MAX_WORKERS, len(course_ids))) as pool:
+            pages = pool.map(functools.partial(self.get_movies_for_course_id, fields=fields), course_ids)
+            return [movie for page in pages for movie in page]
+
     ### movie_frame management
 
     def get_movie_frame(self,movie_id, frame_number):
@@ -1267,7 +1563,7 @@ class DDBO:
 
     def put_movie_frame(self,framedict):
         assert int(framedict[FRAME_NUMBER]) >= 0
-        self.movie_frames.put_item(Item=framedict)
+        self.movie_frames.put_item(Item=tracked_frame_item(framedict))
 
     def get_frames(self, movie_id):
         """Gets all the movie frames"""
@@ -1289,6 +1585,57 @@ class DDBO:
                 break
         return frames
 
+    def tracked_frame_keys(self, movie_id, frame_start, frame_end=None):
+        """Return the keys of frames frame_start..frame_end (inclusive; None for the end of the movie)
+        that have trackpoints, with the generation they were written at. Only those attributes are read."""
+        assert is_movie_id(movie_id)
+        frame_end = Decimal(1e10) if frame_end is None else Decimal(int(frame_end))
+        query_kwargs = {
+            'KeyConditionExpression': (Key(MOVIE_ID).eq(movie_id)
+                                       & Key(FRAME_NUMBER).between(Decimal(int(frame_start)), frame_end)),
+            'FilterExpression': Attr('trackpoints').exists(),
+            'ProjectionExpression': '#movie_id, #frame_number, #generation',
+            'ExpressionAttributeNames': {'#movie_id': MOVIE_ID, '#frame_number': FRAME_NUMBER,
+                                         '#generation': TRACKPOINT_GENERATION},
+        }
+        keys = []
+        while True:
+            response = self.movie_frames.query(**query_kwargs)
+            keys.extend(response['Items'])
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                return keys
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    def remove_frame_trackpoints(self, keys, *, below_generation):
+        """Remove the trackpoints of the frames with the given keys that were written before below_generation,
+        on at most C.CLEAR_TRACKING_MAX_WORKERS threads. Returns the number of frames cleared.
+        The workers share the resource's client, which unlike the Table resource is thread-safe."""
+        if not keys:
+            return 0
+        client = self.dynamodb.meta.client
+        table_name = self.movie_frames.name
+
+        def remove(key):
+            try:
+                client.update_item(
+                    TableName=table_name,
+                    Key={MOVIE_ID: key[MOVIE_ID], FRAME_NUMBER: key[FRAME_NUMBER]},
+                    UpdateExpression='REMOVE trackpoints, #generation, #tracked',
+                    ConditionExpression='attribute_not_exists(#generation) OR #generation < :generation',
+                    ExpressionAttributeNames={'#generation': TRACKPOINT_GENERATION,
+                                              '#tracked': TRACKED_FRAME_NUMBER},
+                    ExpressionAttributeValues={':generation': below_generation},
+                )
+                return 1
+            except ClientError as exc:
+                if exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                return 0    # rewritten since it was read
+
+        with ThreadPoolExecutor(max_workers=min(C.CLEAR_TRACKING_MAX_WORKERS, len(keys))) as pool:
+            return sum(pool.map(remove, keys))
+
     def delete_movie_frames(self, movie_frames):
         """Delete movie items from the table using batch_writer."""
         with self.movie_frames.batch_writer() as batch:
@@ -1424,6 +1771,13 @@ def get_logs( *, user_id , start_time = 0, end_time = None, course_id=None,
 ## User management
 
 
+def _add_login_times(user):
+    """Expose the user's denormalized login times as the 'first'/'last' fields the users page shows."""
+    user['first'] = user.get(FIRST_LOGIN_AT)
+    user['last'] = user.get(LAST_LOGIN_AT)
+    return user
+
+
 def list_users_courses(*, user_id, course_id=None):
     """Returns a dictionary with keys:
     'users' - all the users to which the user has access, and all of the people in them.
@@ -1444,52 +1798,56 @@ def list_users_courses(*, user_id, course_id=None):
             or normalize_super_role(user) in SUPER_READ_ROLES
         )
         visible_user_ids = course_enrollments(course_id) if may_list_enrollment else [user_id]
+        visible_users = ddbo.get_users_batch(visible_user_ids)
         users_list = []
         for visible_user_id in visible_user_ids:
-            try:
-                visible_user = ddbo.get_user(visible_user_id)
-            except InvalidUser_Id:
+            visible_user = visible_users.get(visible_user_id)
+            if visible_user is None:
                 logger.warning("course_enrollments returned unknown user_id %s for course %s — skipping",
                                visible_user_id, course_id)
                 continue
             visible_user[COURSE_ID] = course_id
-            visible_user['first'], visible_user['last'] = ddbo.get_user_login_times(visible_user_id)
+            _add_login_times(visible_user)
             users_list.append(visible_user)
         users_list.sort(key=lambda item: (item.get(USER_NAME, "").casefold(), item.get(USER_ID, "")))
         return {USERS: users_list, COURSES: [course]}
 
     if not admin_for_courses:
-        first, last = ddbo.get_user_login_times(user_id)
-        user['first'] = first
-        user['last'] = last
+        _add_login_times(user)
+        courses = ddbo.get_courses_batch(user.get(COURSES, []))
+        missing = [course_id for course_id in user.get(COURSES, []) if course_id not in courses]
+        if missing:
+            raise InvalidCourse_Id(missing[0])
         return {USERS: [user],
-                COURSES: [ddbo.get_course(course_id) for course_id in user.get(COURSES, [])]}
+                COURSES: [courses[course_id] for course_id in user.get(COURSES, [])]}
 
     # Collect all users enrolled in any course this user admins (deduplicated)
-    seen_user_ids = set()
-    users_list = []
+    enrolled_course = {}
     for admin_course_id in admin_for_courses:
         for enrolled_user_id in course_enrollments(admin_course_id):
-            if enrolled_user_id not in seen_user_ids:
-                seen_user_ids.add(enrolled_user_id)
-                try:
-                    enrolled_user = ddbo.get_user(enrolled_user_id)
-                except InvalidUser_Id:
-                    logger.warning("course_enrollments returned unknown user_id %s for course %s — skipping",
-                                   enrolled_user_id, admin_course_id)
-                    continue
-                first, last = ddbo.get_user_login_times(enrolled_user_id)
-                enrolled_user['first'] = first
-                enrolled_user['last'] = last
-                users_list.append(enrolled_user)
+            enrolled_course.setdefault(enrolled_user_id, admin_course_id)
+    enrolled_users = ddbo.get_users_batch(enrolled_course)
+    users_list = []
+    for enrolled_user_id, admin_course_id in enrolled_course.items():
+        enrolled_user = enrolled_users.get(enrolled_user_id)
+        if enrolled_user is None:
+            logger.warning("course_enrollments returned unknown user_id %s for course %s — skipping",
+                           enrolled_user_id, admin_course_id)
+            continue
+        _add_login_times(enrolled_user)
+        users_list.append(enrolled_user)
 
     # Include all admin courses plus any default courses referenced by the returned users.
-    course_ids = set(admin_for_courses)
+    course_ids = list(admin_for_courses)
     for u in users_list:
         u = normalize_user_default_course(u)
         if u.get(DEFAULT_COURSE_ID):
-            course_ids.add(u[DEFAULT_COURSE_ID])
-    courses_list = [c for c in (ddbo.get_course(cid) for cid in course_ids) if c]
+            course_ids.append(u[DEFAULT_COURSE_ID])
+    courses = ddbo.get_courses_batch(course_ids)
+    missing = [course_id for course_id in course_ids if course_id not in courses]
+    if missing:
+        raise InvalidCourse_Id(missing[0])
+    courses_list = list(courses.values())
 
     # Sort by default_course_id so the JS grouping logic produces one section per course
     users_list.sort(key=lambda u: normalize_user_default_course(u).get(DEFAULT_COURSE_ID, ''))
@@ -1621,6 +1979,97 @@ def delete_user(*, user_id, purge_movies=False):
 ################################################################
 ## API KEY
 ################################################################
+# Validated api_key -> (expires_at, user), shared by all requests served by this process.
+# Entries are dropped whenever this process writes the api_key or its user (see
+# DDBO.forget_cached_item); changes made elsewhere are seen after C.API_KEY_CACHE_SECONDS.
+_validated_api_keys = {}
+_validated_api_keys_generation = 0
+# Pending api_key uses: api_key -> [user_id, count, first_used_at, last_used_at],
+# written by flush_api_key_usage().
+_api_key_usage = {}
+_api_key_usage_since = None
+_api_key_lock = threading.Lock()
+
+
+def forget_validated_api_keys(*, api_key=None, user_id=None):
+    """Drop cached validations for api_key, for every key of user_id, or (no arguments) all."""
+    global _validated_api_keys_generation    # pylint: disable=global-statement
+    with _api_key_lock:
+        _validated_api_keys_generation += 1
+        if api_key is None and user_id is None:
+            _validated_api_keys.clear()
+            return
+        for key, (_, user) in list(_validated_api_keys.items()):
+            if key == api_key or user[USER_ID] == user_id:
+                del _validated_api_keys[key]
+
+
+def record_api_key_use(api_key, user_id, now=None):
+    """Count one use of api_key by user_id; the count is written by the next flush_api_key_usage()."""
+    global _api_key_usage_since    # pylint: disable=global-statement
+    now = int(time.time()) if now is None else now
+    with _api_key_lock:
+        usage = _api_key_usage.setdefault(api_key, [user_id, 0, now, now])
+        usage[1] += 1
+        usage[3] = now
+        if _api_key_usage_since is None:
+            _api_key_usage_since = now
+
+
+def flush_api_key_usage(*, force=True):
+    """Write pending api_key uses with ADD updates, so concurrent flushes from other processes
+    are not lost, and carry the login times to the user (first_login_at/last_login_at).
+    Unless force is set, only flush once the oldest pending use is
+    C.API_KEY_USAGE_FLUSH_SECONDS old. Returns the number of api_keys updated."""
+    global _api_key_usage, _api_key_usage_since    # pylint: disable=global-statement
+    with _api_key_lock:
+        if not _api_key_usage:
+            return 0
+        if not force and time.time() - _api_key_usage_since < C.API_KEY_USAGE_FLUSH_SECONDS:
+            return 0
+        pending, _api_key_usage, _api_key_usage_since = _api_key_usage, {}, None
+    ddbo = DDBO()
+    flushed = 0
+    for api_key, (user_id, count, first_used_at, last_used_at) in pending.items():
+        try:
+            ddbo.api_keys.update_item(
+                Key={API_KEY: api_key},
+                UpdateExpression=('ADD #use_count :count SET #last_used_at = :last_used_at, '
+                                  '#first_used_at = if_not_exists(#first_used_at, :first_used_at)'),
+                ConditionExpression='attribute_exists(#api_key)',
+                ExpressionAttributeNames={'#api_key': API_KEY, '#use_count': USE_COUNT,
+                                          '#last_used_at': 'last_used_at',
+                                          '#first_used_at': 'first_used_at'},
+                ExpressionAttributeValues={':count': count, ':last_used_at': last_used_at,
+                                           ':first_used_at': first_used_at},
+            )
+            flushed += 1
+        except ClientError as exc:
+            if exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise       # the api_key was deleted; drop its uses
+        _record_user_login(ddbo, user_id, first_used_at, last_used_at)
+        cache = _READ_CACHE.get()
+        if cache is not None:
+            cache.items.pop((ddbo.api_keys.name, api_key), None)
+            cache.items.pop((ddbo.users.name, user_id), None)
+    return flushed
+
+
+def _record_user_login(ddbo, user_id, first_login_at, last_login_at):
+    """Set the user's first_login_at (if unset) and last_login_at (if later than the stored one)."""
+    try:
+        ddbo.users.update_item(
+            Key={USER_ID: user_id},
+            UpdateExpression='SET #first = if_not_exists(#first, :first), #last = :last',
+            ConditionExpression='attribute_exists(#user_id) AND (attribute_not_exists(#last) OR #last < :last)',
+            ExpressionAttributeNames={'#user_id': USER_ID, '#first': FIRST_LOGIN_AT, '#last': LAST_LOGIN_AT},
+            ExpressionAttributeValues={':first': first_login_at, ':last': last_login_at},
+        )
+    except ClientError as exc:
+        if exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise       # deleted user, or a newer login is already recorded
+
+
 def validate_api_key(api_key):
     """
     Validate API key.
@@ -1628,23 +2077,32 @@ def validate_api_key(api_key):
     :return: User dictionary if api_key and user are both enabled, return the
              entry in the users table for key = user_id (from the api_key table),
              otherwise return None
+    Validations are cached for C.API_KEY_CACHE_SECONDS. Inside a request scope the use is counted
+    in memory and written by flush_api_key_usage(); outside one it is written immediately.
     """
-    ddbo = DDBO()
     if not is_api_key(api_key):
         raise InvalidAPI_Key()
-    api_key_dict = ddbo.get_api_key_dict(api_key)
-    if api_key_dict is None:
-        raise InvalidAPI_Key()
-    if api_key_dict[ ENABLED ]:
+    now = int(time.time())
+    with _api_key_lock:
+        cached = _validated_api_keys.get(api_key)
+        generation = _validated_api_keys_generation
+    if cached is not None and cached[0] > now:
+        user = copy.deepcopy(cached[1])
+    else:
+        ddbo = DDBO()
+        api_key_dict = ddbo.get_api_key_dict(api_key)
+        if api_key_dict is None or not api_key_dict[ ENABLED ]:
+            raise InvalidAPI_Key()
         user = ddbo.get_user(api_key_dict[ USER_ID ])
-        if user[ ENABLED ]:
-            first_used_at = api_key_dict.get('first_used_at',int(time.time()))
-            ddbo.update_table(ddbo.api_keys,api_key,
-                              { USE_COUNT :api_key_dict[ USE_COUNT ]+1,
-                               'last_used_at':int(time.time()),
-                               'first_used_at':first_used_at})
-            return user
-    raise InvalidAPI_Key()
+        if not user[ ENABLED ]:
+            raise InvalidAPI_Key()
+        with _api_key_lock:
+            if generation == _validated_api_keys_generation:
+                _validated_api_keys[api_key] = (now + C.API_KEY_CACHE_SECONDS, copy.deepcopy(user))
+    record_api_key_use(api_key, user[USER_ID], now)
+    if current_read_cache() is None:
+        flush_api_key_usage()
+    return user
 
 def make_new_api_key_for_user_id(*, user_id, demo_user=False):
     """Create a new api_key for a registered, enabled user_id."""
@@ -1897,6 +2355,8 @@ def _course_admin_transaction(*, admin_id, course_id, assigned,
                     },
                 },
             })
+        ddbo.forget_cached_item(ddbo.users, admin_id)
+        ddbo.forget_cached_item(ddbo.courses, course_id)
         try:
             ddbo.dynamodb.meta.client.transact_write_items(
                 TransactItems=transaction,
@@ -2163,14 +2623,12 @@ def movie_is_available(movie: dict) -> bool:
 def _copy_frame_trackpoints_if_missing(*, movie_id: str, from_frame: int, to_frame: int):
     """Copy markers from one frame to another only when the target has no markers."""
     assert is_movie_id(movie_id)
-    ddbo = DDBO()
-    target = ddbo.get_movie_frame(movie_id, to_frame)
-    if target and target.get('trackpoints'):
+    if get_frame_trackpoints(movie_id=movie_id, frame_number=to_frame):
         return False
-    source = ddbo.get_movie_frame(movie_id, from_frame)
-    if not source or not source.get('trackpoints'):
+    source = get_frame_trackpoints(movie_id=movie_id, frame_number=from_frame)
+    if not source:
         return False
-    trackpoints = [Trackpoint(**trackpoint) for trackpoint in source['trackpoints']]
+    trackpoints = [Trackpoint(**trackpoint) for trackpoint in source]
     put_frame_trackpoints(movie_id=movie_id, frame_number=to_frame, trackpoints=trackpoints)
     return True
 
@@ -2334,11 +2792,44 @@ def set_movie_data_urn(*,movie_id, movie_data_urn):
     ddbo.update_movie(movie_id, {MOVIE_DATA_URN:movie_data_urn})
 
 
-def list_movies(*,user_id, movie_id=None, orig_movie=None, course_id=None):
+def _check_may_list_course(user, course_id):
+    if course_id not in user.get(COURSES, []) and normalize_super_role(user) not in SUPER_READ_ROLES:
+        raise UnauthorizedUser(
+            f"user {user[USER_ID]} attempted to list movies for course {course_id}"
+        )
+
+
+def movie_list_projection(fields):
+    """Validate requested movie attribute names and return the projection to read:
+    the requested fields plus MOVIE_LIST_REQUIRED_FIELDS. Raises ValueError for unknown names."""
+    known = set(Movie.model_fields) | set(MOVIE_LIST_FIELDS)
+    unknown = [field for field in fields if field not in known]
+    if unknown:
+        raise ValueError(f"unknown movie field {unknown[0]!r}")
+    return tuple(dict.fromkeys((*MOVIE_LIST_REQUIRED_FIELDS, *fields)))
+
+
+# pylint: disable=too-many-arguments
+def list_movies_page(*, user_id, course_id, limit, exclusive_start_key=None, fields=None, sort=None):
+    """Return one page of a course's movies as (movies, last_evaluated_key).
+    :param sort: None (index order) or a key of MOVIE_SORT_INDEXES (newest first).
+    Pass the returned last_evaluated_key back as exclusive_start_key for the next page;
+    it is None after the last page."""
+    if sort is not None and sort not in MOVIE_SORT_INDEXES:
+        raise ValueError(f"cannot sort movies by {sort!r}")
+    ddbo = DDBO()
+    _check_may_list_course(ddbo.get_user(user_id), course_id)
+    movies, last_evaluated_key = ddbo.query_movies_for_course_id(
+        course_id, fields=fields, limit=limit, exclusive_start_key=exclusive_start_key, sort=sort)
+    return fix_movies(movies), last_evaluated_key
+
+
+def list_movies(*,user_id, movie_id=None, orig_movie=None, course_id=None, fields=None):
     """
     :param user_id:  only list movies visible to user_id (0 for all movies)
     :param movie_id:  if provided, only use this movie
     :param orig_movie:  if provided, only list movies for which the original movie is orig_movie_id
+    :param fields:  if provided, only return these attributes (e.g. MOVIE_LIST_FIELDS)
     :return:A list of movies that the user is allowed to access. Each movie is a moviedict with full metadata.
     """
     logger.debug("list_movies(user_id=%s, movie_id=%s, orig_movie=%s)",user_id,movie_id,orig_movie)
@@ -2352,23 +2843,14 @@ def list_movies(*,user_id, movie_id=None, orig_movie=None, course_id=None):
     user = ddbo.get_user(user_id)
     if orig_movie is not None:
         raise NotImplementedError("orig_movie not implemented")
-    movies = []
     if movie_id is not None:
-        return fix_movies([ddbo.get_movie(movie_id)])
+        return fix_movies([ddbo.get_movie(movie_id, fields=list(fields) if fields else None)])
     if course_id is not None:
-        if (
-                course_id not in user.get(COURSES, [])
-                and normalize_super_role(user) not in SUPER_READ_ROLES):
-            raise UnauthorizedUser(
-                f"user {user_id} attempted to list movies for course {course_id}"
-            )
-        return fix_movies(ddbo.get_movies_for_course_id(course_id))
+        _check_may_list_course(user, course_id)
+        return fix_movies(ddbo.get_movies_for_course_id(course_id, fields=fields))
 
-    # build a query for all movies for which the user is in the course
-    for member_course_id in user[COURSES]:
-        logger.debug("extending for course_id=%s", member_course_id)
-        movies.extend(ddbo.get_movies_for_course_id(member_course_id))
-    return fix_movies(movies)
+    # query the movies of every course the user is in
+    return fix_movies(ddbo.get_movies_for_course_ids(user[COURSES], fields=fields))
 
 
 ################################################################
@@ -2489,12 +2971,14 @@ def ensure_bottom_left_trackpoints(*, movie_id: str, frame_height: int | None =
             # since a concurrent runner's snapshot may not see another runner's write.
             ddbo.movie_frames.update_item(
                 Key={MOVIE_ID: movie_id, FRAME_NUMBER: frame[FRAME_NUMBER]},
-                UpdateExpression='SET trackpoints=:trackpoints, #origin=:origin',
+                UpdateExpression='SET trackpoints=:trackpoints, #origin=:origin, #tracked=:frame_number',
                 ConditionExpression='attribute_not_exists(#origin)',
-                ExpressionAttributeNames={'#origin': TRACKPOINT_MIGRATION_ORIGIN},
+                ExpressionAttributeNames={'#origin': TRACKPOINT_MIGRATION_ORIGIN,
+                                          '#tracked': TRACKED_FRAME_NUMBER},
                 ExpressionAttributeValues={
                     ':trackpoints': converted_trackpoints,
                     ':origin': TRACKPOINT_ORIGIN_BOTTOM_LEFT,
+                    ':frame_number': frame[FRAME_NUMBER],
                 },
             )
         except ClientError as exc:
@@ -2537,12 +3021,301 @@ def iter_movie_frames_in_range(table, movie_id, f1, f2):
         if not last_evaluated_key:
             break
 
+################################################################
+## Columnar trackpoint storage
+################################################################
+
+TRACKPOINT_CHUNK_WRITE_ATTEMPTS = 5
+# Highest chunk index; chunk keys stay below the marker-map item.
+TRACKPOINT_CHUNK_MAX = MOVIE_MARKER_MAP_FRAME_NUMBER - 1 - TRACKPOINT_CHUNK_FRAME_NUMBER
+_CHUNK_ROW_KEYS = ('x', 'y')
+
+
+def trackpoint_storage(movie: dict) -> str:
+    """Return the movie's trackpoint storage layout."""
+    return movie.get(TRACKPOINT_STORAGE) or TRACKPOINT_STORAGE_FRAMES
+
+
+def movie_trackpoint_storage(ddbo, movie_id) -> str:
+    """Read just the movie's trackpoint storage layout."""
+    return trackpoint_storage(ddbo.get_movie(movie_id, fields=[MOVIE_ID, TRACKPOINT_STORAGE]))
+
+
+def trackpoint_generation(item: dict) -> int:
+    """Return the trackpoint generation of a movie, or the generation a frame or chunk item was written at."""
+    return int(item.get(TRACKPOINT_GENERATION) or 0)
+
+
+def tracked_frame_item(item: dict) -> dict:
+    """Return a copy of a movie_frames item with TRACKED_FRAME_NUMBER set if it stores trackpoints, removed if not."""
+    item = {key: value for key, value in item.items() if key != TRACKED_FRAME_NUMBER}
+    if item.get('trackpoints') is not None and int(item[FRAME_NUMBER]) >= 0:
+        item[TRACKED_FRAME_NUMBER] = item[FRAME_NUMBER]
+    return item
+
+
+def trackpoints_superseded(movie: dict, *, generation: int, frame_number: int) -> bool:
+    """Return True if trackpoints written at generation for frame_number were invalidated by a later retrace."""
+    return any(int(invalidated) > generation and int(first) <= frame_number and (last is None or frame_number <= int(last))
+               for invalidated, first, last in movie.get(TRACKPOINT_INVALIDATIONS) or ())
+
+
+def trackpoint_chunk_key(movie_id: str, chunk: int) -> dict:
+    """Return the movie_frames-table key for a movie's columnar trackpoint chunk."""
+    assert is_movie_id(movie_id)
+    assert 0 <= chunk <= TRACKPOINT_CHUNK_MAX
+    return {MOVIE_ID: movie_id, FRAME_NUMBER: TRACKPOINT_CHUNK_FRAME_NUMBER + chunk}
+
+
+def encode_trackpoint_chunk(frames: dict[int, list[dict]]) -> dict:
+    """Encode {frame offset: trackpoints} as one column per marker.
+
+    A column holds x and y arrays. Other attributes are stored once in CHUNK_CONSTANTS when every
+    trackpoint in the column has the same value, otherwise as arrays in CHUNK_VALUES. A column
+    has its own CHUNK_OFFSETS only when the marker is missing from some of the chunk's frames.
+    """
+    offsets = sorted(frames)
+    columns = []                # (marker_id, [(offset, trackpoint), ...])
+    for offset in offsets:
+        used = set()
+        for trackpoint in frames[offset]:
+            marker_id = trackpoint.get(MARKER_ID)
+            index = next((i for i, (column_marker_id, _) in enumerate(columns)
+                          if i not in used and column_marker_id == marker_id), None)
+            if index is None:
+                index = len(columns)
+                columns.append((marker_id, []))
+            used.add(index)
+            columns[index][1].append((offset, trackpoint))
+
+    encoded = []
+    for marker_id, rows in columns:
+        column = {key: [trackpoint[key] for _, trackpoint in rows] for key in _CHUNK_ROW_KEYS}
+        if marker_id is not None:
+            column[MARKER_ID] = marker_id
+        column_offsets = [offset for offset, _ in rows]
+        if column_offsets != offsets:
+            column[CHUNK_OFFSETS] = column_offsets
+        attributes = {key for _, trackpoint in rows for key in trackpoint}
+        attributes -= {*_CHUNK_ROW_KEYS, MARKER_ID, FRAME_NUMBER}
+        constants, values = {}, {}
+        for key in sorted(attributes):
+            column_values = [trackpoint.get(key) for _, trackpoint in rows]
+            if all(value == column_values[0] for value in column_values):
+                constants[key] = column_values[0]
+            else:
+                values[key] = column_values
+        if constants:
+            column[CHUNK_CONSTANTS] = constants
+        if values:
+            column[CHUNK_VALUES] = values
+        encoded.append(column)
+    return {CHUNK_OFFSETS: offsets, CHUNK_COLUMNS: encoded}
+
+
+def decode_trackpoint_chunk(item: dict) -> dict[int, list[dict]]:
+    """Inverse of encode_trackpoint_chunk(): return {frame offset: trackpoints}."""
+    offsets = [int(offset) for offset in item.get(CHUNK_OFFSETS, [])]
+    frames = {offset: [] for offset in offsets}
+    for column in item.get(CHUNK_COLUMNS, []):
+        constants = {key: value for key, value in column.get(CHUNK_CONSTANTS, {}).items()
+                     if value is not None}
+        values = column.get(CHUNK_VALUES, {})
+        for row, offset in enumerate(int(offset) for offset in column.get(CHUNK_OFFSETS, offsets)):
+            trackpoint = {key: column[key][row] for key in _CHUNK_ROW_KEYS}
+            if column.get(MARKER_ID) is not None:
+                trackpoint[MARKER_ID] = column[MARKER_ID]
+            trackpoint.update(constants)
+            trackpoint.update({key: value[row] for key, value in values.items() if value[row] is not None})
+            frames[offset].append(trackpoint)
+    return frames
+
+
+def iter_trackpoint_chunks(table, movie_id, first_chunk, last_chunk, *, descending=False, limit=None):
+    """Yield (chunk, item) for the movie's columnar trackpoint chunks first_chunk..last_chunk."""
+    last_chunk = min(int(last_chunk), TRACKPOINT_CHUNK_MAX)
+    if first_chunk > last_chunk:
+        return
+    query_kwargs = {
+        'KeyConditionExpression': Key(MOVIE_ID).eq(movie_id) & Key(FRAME_NUMBER).between(
+            TRACKPOINT_CHUNK_FRAME_NUMBER + first_chunk, TRACKPOINT_CHUNK_FRAME_NUMBER + last_chunk),
+        'ScanIndexForward': not descending,
+    }
+    if limit:
+        query_kwargs['Limit'] = limit
+    while True:
+        response = table.query(**query_kwargs)
+        for item in response['Items']:
+            yield int(item[FRAME_NUMBER]) - TRACKPOINT_CHUNK_FRAME_NUMBER, item
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if limit or not last_evaluated_key:
+            break
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def iter_trackpoint_frames(*, movie_id, frame_start=0, frame_end=None, movie=None):
+    """Yield {movie_id, frame_number, trackpoints, ...} for each frame with current trackpoints,
+    in frame order, whichever layout the movie uses. Trackpoints superseded by a retrace are skipped.
+    :param frame_end: inclusive; None for the end of the movie.
+    :param movie: the movie (or its TRACKPOINT_STATE_FIELDS), if the caller has already read it.
+    """
+    ddbo = DDBO()
+    if movie is None:
+        movie = ddbo.get_movie(movie_id, fields=TRACKPOINT_STATE_FIELDS)
+    if trackpoint_storage(movie) != TRACKPOINT_STORAGE_COLUMNAR:
+        for frame in iter_movie_frames_in_range(ddbo.movie_frames, movie_id, frame_start,
+                                                1e10 if frame_end is None else frame_end):
+            if 'trackpoints' in frame and not trackpoints_superseded(
+                    movie, generation=trackpoint_generation(frame), frame_number=int(frame[FRAME_NUMBER])):
+                yield frame
+        return
+
+    chunk_frames = C.TRACKPOINT_CHUNK_FRAMES
+    last_chunk = TRACKPOINT_CHUNK_MAX if frame_end is None else int(frame_end) // chunk_frames
+    for chunk, item in iter_trackpoint_chunks(ddbo.movie_frames, movie_id,
+                                              int(frame_start) // chunk_frames, last_chunk):
+        generation = trackpoint_generation(item)
+        for offset, trackpoints in sorted(decode_trackpoint_chunk(item).items()):
+            frame_number = chunk * chunk_frames + offset
+            if frame_number < frame_start or (frame_end is not None and frame_number > frame_end):
+                continue
+            if trackpoints_superseded(movie, generation=generation, frame_number=frame_number):
+                continue
+            yield {MOVIE_ID: movie_id, FRAME_NUMBER: frame_number, 'trackpoints': trackpoints}
+
+
+def get_frame_trackpoints(*, movie_id, frame_number) -> list[dict] | None:
+    """Return the stored trackpoints of one frame, or None if the frame has none."""
+    for frame in iter_trackpoint_frames(movie_id=movie_id, frame_start=frame_number, frame_end=frame_number):
+        return frame['trackpoints']
+    return None
+
+
+def _chunk_revision_condition(revision) -> dict:
+    if revision is None:
+        return {'ConditionExpression': 'attribute_not_exists(#movie_id)',
+                'ExpressionAttributeNames': {'#movie_id': MOVIE_ID}}
+    return {'ConditionExpression': '#revision = :revision',
+            'ExpressionAttributeNames': {'#revision': CHUNK_REVISION},
+            'ExpressionAttributeValues': {':revision': revision}}
+
+
+def put_columnar_trackpoints(*, ddbo, movie_id, frames: dict, movie=None, rewrite_chunks=()) -> int:
+    """Replace the trackpoints of frames of a columnar movie; a value of None removes them.
+    Each chunk is read, merged and written back, retrying if another writer changed it first.
+    Frames of the chunk superseded by a retrace are dropped, and the chunk is stamped with the
+    movie's current trackpoint generation.
+    :param frames: {frame_number: stored trackpoint dicts or None}
+    :param movie: the movie (or its TRACKPOINT_STATE_FIELDS), if the caller has already read it.
+    :param rewrite_chunks: chunks to rewrite without superseded frames even if no frame in them changes.
+    :return: the number of frames whose trackpoints were removed
+    """
+    if movie is None:
+        movie = ddbo.get_movie(movie_id, fields=TRACKPOINT_STATE_FIELDS)
+    generation = trackpoint_generation(movie)
+    chunk_frames = C.TRACKPOINT_CHUNK_FRAMES
+    updates_by_chunk = defaultdict(dict)
+    for frame_number, trackpoints in frames.items():
+        updates_by_chunk[int(frame_number) // chunk_frames][int(frame_number) % chunk_frames] = trackpoints
+    for chunk in rewrite_chunks:
+        updates_by_chunk.setdefault(chunk, {})
+
+    removed = 0
+    for chunk, updates in sorted(updates_by_chunk.items()):
+        key = trackpoint_chunk_key(movie_id, chunk)
+        for attempt in range(TRACKPOINT_CHUNK_WRITE_ATTEMPTS):
+            item = ddbo.movie_frames.get_item(Key=key, ConsistentRead=True).get('Item')
+            revision = item.get(CHUNK_REVISION) if item else None
+            stored = decode_trackpoint_chunk(item) if item else {}
+            merged = {offset: trackpoints for offset, trackpoints in stored.items()
+                      if not trackpoints_superseded(movie, generation=trackpoint_generation(item),
+                                                    frame_number=chunk * chunk_frames + offset)}
+            chunk_removed = len(stored) - len(merged)
+            if not updates and not chunk_removed:
+                break
+            for offset, trackpoints in updates.items():
+                if trackpoints is not None:
+                    merged[offset] = trackpoints
+                elif merged.pop(offset, None) is not None:
+                    chunk_removed += 1
+            try:
+                if merged:
+                    ddbo.movie_frames.put_item(
+                        Item={**key, **encode_trackpoint_chunk(merged), CHUNK_REVISION: (revision or 0) + 1,
+                              TRACKPOINT_GENERATION: generation},
+                        **_chunk_revision_condition(revision))
+                elif item:
+                    ddbo.movie_frames.delete_item(Key=key, **_chunk_revision_condition(revision))
+            except ClientError as exc:
+                if (exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException'
+                        or attempt == TRACKPOINT_CHUNK_WRITE_ATTEMPTS - 1):
+                    raise
+                continue
+            removed += chunk_removed
+            break
+    return removed
+
+
+def delete_trackpoint_chunks(*, movie_id) -> int:
+    """Delete all of a movie's columnar trackpoint chunks. Returns the number deleted."""
+    ddbo = DDBO()
+    chunks = [item for _, item in iter_trackpoint_chunks(ddbo.movie_frames, movie_id, 0, TRACKPOINT_CHUNK_MAX)]
+    ddbo.delete_movie_frames(chunks)
+    return len(chunks)
+
+
+def set_movie_trackpoint_storage(*, movie_id, storage) -> int:
+    """Move a movie's trackpoints to the given storage layout. Returns the number of frames moved.
+
+    The new layout is written before the movie is switched to it, and the old one is removed
+    afterwards, so readers see every trackpoint throughout.
+    """
+    if storage not in (TRACKPOINT_STORAGE_FRAMES, TRACKPOINT_STORAGE_COLUMNAR):
+        raise ValueError(f"invalid trackpoint storage {storage}")
+    movie = ensure_bottom_left_trackpoints(movie_id=movie_id)
+    if movie_trace_lock_from_record(movie):
+        raise MovieTracingLocked(movie_id)
+    current = trackpoint_storage(movie)
+    if storage == current:
+        return 0
+    ddbo = DDBO()
+    # Superseded trackpoints left in the old layout would be orphaned, so sweep them first.
+    purge_superseded_trackpoints(movie_id=movie_id)
+    movie = ddbo.get_movie(movie_id)
+    frames = list(iter_trackpoint_frames(movie_id=movie_id, movie=movie))
+    if storage == TRACKPOINT_STORAGE_COLUMNAR:
+        trackpoints = ensure_trackpoint_marker_ids(
+            movie_id=movie_id, trackpoints=[tp for frame in frames for tp in frame['trackpoints']])
+        stored = {}
+        for frame in frames:
+            count = len(frame['trackpoints'])
+            stored[int(frame[FRAME_NUMBER])], trackpoints = trackpoints[:count], trackpoints[count:]
+        put_columnar_trackpoints(ddbo=ddbo, movie_id=movie_id, frames=stored, movie=movie)
+        ddbo.update_movie(movie_id, {TRACKPOINT_STORAGE: storage}, touch_activity=False)
+        for frame in frames:
+            ddbo.movie_frames.update_item(
+                Key={MOVIE_ID: movie_id, FRAME_NUMBER: frame[FRAME_NUMBER]},
+                UpdateExpression='REMOVE trackpoints, #tracked',
+                ExpressionAttributeNames={'#tracked': TRACKED_FRAME_NUMBER},
+            )
+    else:
+        existing = {int(frame[FRAME_NUMBER]): frame for frame in ddbo.get_frames(movie_id)}
+        with ddbo.movie_frames.batch_writer() as batch:
+            for frame in frames:
+                item = existing.get(frame[FRAME_NUMBER], {MOVIE_ID: movie_id, FRAME_NUMBER: frame[FRAME_NUMBER]})
+                batch.put_item(Item=tracked_frame_item({**item, 'trackpoints': frame['trackpoints'],
+                                                        TRACKPOINT_GENERATION: trackpoint_generation(movie)}))
+        ddbo.update_movie(movie_id, {TRACKPOINT_STORAGE: storage}, touch_activity=False)
+        delete_trackpoint_chunks(movie_id=movie_id)
+    return len(frames)
+
+
 def get_movie_trackpoints(*, movie_id, frame_start=None, frame_count=None, frame_end=None):
     """Returns a list of trackpoint dictionaries where each dictonary represents a trackpoint.
     :param: frame_start, frame_count, frame_end - optional. frame_end is inclusive.
     """
 
-    ensure_bottom_left_trackpoints(movie_id=movie_id)
+    movie = ensure_bottom_left_trackpoints(movie_id=movie_id)
 
     if frame_start is None:
         frame_start = 0
@@ -2551,19 +3324,38 @@ def get_movie_trackpoints(*, movie_id, frame_start=None, frame_count=None, frame
             frame_count = 1e10
         frame_end = frame_start + frame_count
 
+    return [trackpoint
+            for _, trackpoints in iter_movie_trackpoints_by_frame(movie_id=movie_id, frame_start=frame_start,
+                                                                  frame_end=frame_end, movie=movie)
+            for trackpoint in trackpoints]
+
+def iter_movie_trackpoints_by_frame(*, movie_id, frame_start=0, frame_end=None, movie=None):
+    """Return an iterator of (frame_number, trackpoints) for each frame with trackpoints, in frame order,
+    that reads the frames lazily. Trackpoints are in the get_movie_trackpoints() form.
+    The movie is migrated to bottom-left trackpoints before this returns.
+    :param frame_end: inclusive; None for the end of the movie.
+    :param movie: the migrated movie, if the caller already has it.
+    """
+    if movie is None:
+        movie = ensure_bottom_left_trackpoints(movie_id=movie_id)
     marker_map = get_movie_marker_map(movie_id=movie_id, create=False)
-    ret = []
-    for frame in iter_movie_frames_in_range( DDBO().movie_frames, movie_id,
-                                             frame_start, frame_end ):
-        for tp in frame.get('trackpoints',[]):
-            trackpoint = {key: value for key, value in tp.items()
-                          if value is not None and key != MARKER_ID}
-            trackpoint[FRAME_NUMBER] = int(frame[FRAME_NUMBER])
-            trackpoint['x'] = int(tp['x'])
-            trackpoint['y'] = int(tp['y'])
-            trackpoint['label'] = marker_label_for_trackpoint(marker_map, tp)
-            ret.append(trackpoint)
-    return ret
+
+    def frames():
+        for frame in iter_trackpoint_frames(movie_id=movie_id, frame_start=frame_start, frame_end=frame_end,
+                                            movie=movie):
+            frame_number = int(frame[FRAME_NUMBER])
+            trackpoints = []
+            for tp in frame['trackpoints']:
+                trackpoint = {key: value for key, value in tp.items()
+                              if value is not None and key != MARKER_ID}
+                trackpoint[FRAME_NUMBER] = frame_number
+                trackpoint['x'] = int(tp['x'])
+                trackpoint['y'] = int(tp['y'])
+                trackpoint['label'] = marker_label_for_trackpoint(marker_map, tp)
+                trackpoints.append(trackpoint)
+            if trackpoints:
+                yield frame_number, trackpoints
+    return frames()
 
 def get_movie_frame_metadata(*, movie_id, frame_start, frame_count):
     """Returns a set of dictionaries for each frame in the movie. Each dictionary contains movie_id, frame_number, frame_urn
@@ -2636,7 +3428,9 @@ def get_movie_marker_map(*, movie_id: str, frames: list[dict] | None = None,
             MARKER_ALIASES: {},
         }
 
-    item = _marker_map_from_frames(movie_id=movie_id, frames=frames if frames is not None else ddbo.get_frames(movie_id))
+    if frames is None:
+        frames = list(iter_trackpoint_frames(movie_id=movie_id))
+    item = _marker_map_from_frames(movie_id=movie_id, frames=frames)
     try:
         ddbo.movie_frames.put_item(
             Item=item,
@@ -2731,35 +3525,117 @@ def ensure_trackpoint_marker_ids(*, movie_id: str, trackpoints: list[dict]) -> l
             if exc.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
                 raise AtomicRenameConflict(f"marker map for movie {movie_id} changed while updating") from exc
             raise
+        ddbo.forget_cached_item(ddbo.movies, movie_id)
+        ddbo.movies.update_item(
+            Key={MOVIE_ID: movie_id},
+            UpdateExpression='ADD #marker_map_version :one',
+            ExpressionAttributeNames={'#marker_map_version': MARKER_MAP_VERSION},
+            ExpressionAttributeValues={':one': 1},
+        )
     return stored_trackpoints
 
 
 def last_tracked_movie_frame(*, movie_id):
-    """Return the last tracked frame_number of the movie"""
+    """Return the last tracked frame_number of the movie.
+    Only needed when LAST_FRAME_TRACKED is not stored; frames are found through the sparse
+    MOVIE_TRACKED_FRAMES_IDX, so frames without trackpoints are usually never read."""
 
     assert is_movie_id(movie_id)
-    movie_frames=DDBO().movie_frames
-    last_evaluated_key=None
-    while True:
-        query_kwargs = {
-            'KeyConditionExpression': Key(MOVIE_ID).eq(movie_id) & Key(FRAME_NUMBER).gte(0),
-            'FilterExpression': Attr('trackpoints').exists(),
-            'ScanIndexForward': False,
-            'Limit': 1
-        }
+    ddbo = DDBO()
+    movie = ddbo.get_movie(movie_id, fields=TRACKPOINT_STATE_FIELDS)
+    if trackpoint_storage(movie) == TRACKPOINT_STORAGE_COLUMNAR:
+        # Empty chunks are deleted, so the last chunk with current frames holds the last tracked frame.
+        for chunk, item in iter_trackpoint_chunks(ddbo.movie_frames, movie_id, 0, TRACKPOINT_CHUNK_MAX,
+                                                  descending=True):
+            frame_numbers = [chunk * C.TRACKPOINT_CHUNK_FRAMES + int(offset) for offset in item[CHUNK_OFFSETS]]
+            current = [frame_number for frame_number in frame_numbers if not trackpoints_superseded(
+                movie, generation=trackpoint_generation(item), frame_number=frame_number)]
+            if current:
+                return max(current)
+        return None
+    # Frames written before TRACKED_FRAME_NUMBER existed are not in the index until they are
+    # rewritten or repaired, so the base table is searched when the index has no tracked frame.
+    last = _last_current_frame(ddbo.movie_frames, movie, {
+        'IndexName': MOVIE_TRACKED_FRAMES_IDX,
+        'KeyConditionExpression': Key(MOVIE_ID).eq(movie_id),
+        'ScanIndexForward': False,
+    })
+    if last is not None:
+        return last
+    return _last_current_frame(ddbo.movie_frames, movie, {
+        'KeyConditionExpression': Key(MOVIE_ID).eq(movie_id) & Key(FRAME_NUMBER).gte(0),
+        'FilterExpression': Attr('trackpoints').exists(),
+        'ScanIndexForward': False,
+    })
 
-        if last_evaluated_key:
-            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
 
+def _last_current_frame(movie_frames, movie, query_kwargs):
+    """Return the frame_number of the first item of a descending query whose trackpoints are not superseded."""
+    while True:
         response = movie_frames.query(**query_kwargs)
-        items = response.get('Items', [])
-        if items:
-            return items[0][FRAME_NUMBER]
-
+        for item in response.get('Items', []):
+            # Only a retrace's superseded range can hide tracked frames, so this rarely reads past the first.
+            if not trackpoints_superseded(movie, generation=trackpoint_generation(item),
+                                          frame_number=int(item[FRAME_NUMBER])):
+                return item[FRAME_NUMBER]
         last_evaluated_key = response.get('LastEvaluatedKey')
         if not last_evaluated_key:
-            break
-    return None
+            return None
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def refresh_last_frame_tracked(*, movie_id):
+    """Advance LAST_FRAME_TRACKED to the movie's last tracked frame, e.g. after a retrace that
+    stopped before frames that were already tracked. Returns the last tracked frame."""
+    last = last_tracked_movie_frame(movie_id=movie_id)
+    if last is not None:
+        DDBO().advance_last_frame_tracked(movie_id, last)
+    return last
+
+
+def check_last_frame_tracked(*, movie_id, repair=False) -> dict:
+    """Compare a movie's LAST_FRAME_TRACKED and its frames' TRACKED_FRAME_NUMBER with the stored trackpoints.
+    With repair=True, correct both. Movies being traced are reported but not repaired, since the
+    tracer owns their frontier. Returns a dict with the stored and actual values, the number of
+    frames whose TRACKED_FRAME_NUMBER was wrong, and whether the movie was being traced.
+    """
+    assert is_movie_id(movie_id)
+    ddbo = DDBO()
+    ddbo.forget_cached_item(ddbo.movies, movie_id)
+    movie = ddbo.get_movie(movie_id)
+    frames = ddbo.get_frames(movie_id)
+    if trackpoint_storage(movie) == TRACKPOINT_STORAGE_COLUMNAR:
+        actual = last_tracked_movie_frame(movie_id=movie_id)
+    else:
+        actual = max((int(frame[FRAME_NUMBER]) for frame in frames if frame.get('trackpoints') is not None
+                      and not trackpoints_superseded(movie, generation=trackpoint_generation(frame),
+                                                     frame_number=int(frame[FRAME_NUMBER]))),
+                     default=None)
+    mistagged = [frame for frame in frames
+                 if tracked_frame_item(frame).get(TRACKED_FRAME_NUMBER) != frame.get(TRACKED_FRAME_NUMBER)]
+    stored = movie.get(LAST_FRAME_TRACKED)
+    tracing = bool(movie_trace_lock_from_record(movie))
+    if repair:
+        for frame in mistagged:
+            tagged = TRACKED_FRAME_NUMBER in tracked_frame_item(frame)
+            try:
+                ddbo.movie_frames.update_item(
+                    Key={MOVIE_ID: movie_id, FRAME_NUMBER: frame[FRAME_NUMBER]},
+                    UpdateExpression='SET #tracked = :frame_number' if tagged else 'REMOVE #tracked',
+                    ConditionExpression=('attribute_exists(trackpoints)' if tagged
+                                         else 'attribute_not_exists(trackpoints)'),
+                    ExpressionAttributeNames={'#tracked': TRACKED_FRAME_NUMBER},
+                    **({'ExpressionAttributeValues': {':frame_number': frame[FRAME_NUMBER]}} if tagged else {}),
+                )
+            except ClientError as exc:
+                if exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                # Rewritten since it was read, and that write set the tag.
+        if not tracing and stored != actual:
+            ddbo.update_movie(movie_id, {LAST_FRAME_TRACKED: actual}, touch_activity=False)
+    return {MOVIE_ID: movie_id, 'stored': stored, 'actual': actual,
+            'mistagged_frames': len(mistagged), 'tracing': tracing}
+
 
 def rename_movie_marker(*, movie_id: str, old_label: str, new_label: str,
                         needs_retracing: bool = False) -> dict:
@@ -2771,9 +3647,9 @@ def rename_movie_marker(*, movie_id: str, old_label: str, new_label: str,
     if old_label == new_label:
         return {'frames_updated': 0, 'trackpoints_updated': 0}
 
-    ensure_bottom_left_trackpoints(movie_id=movie_id)
+    movie = ensure_bottom_left_trackpoints(movie_id=movie_id)
     ddbo = DDBO()
-    frames = ddbo.get_frames(movie_id)
+    frames = list(iter_trackpoint_frames(movie_id=movie_id, movie=movie))
     marker_map = get_movie_marker_map(movie_id=movie_id, frames=frames, create=True)
     marker_labels = copy.deepcopy(marker_map.get(MARKER_LABELS, {}))
     marker_aliases = copy.deepcopy(marker_map.get(MARKER_ALIASES, marker_labels))
@@ -2843,12 +3719,18 @@ def rename_movie_marker(*, movie_id: str, old_label: str, new_label: str,
     movie_expression_names = {
         '#movie_id': MOVIE_ID,
         '#last_activity_at': LAST_ACTIVITY_AT,
+        '#marker_map_version': MARKER_MAP_VERSION,
     }
-    movie_expression_values = {':last_activity_at': int(time.time())}
+    movie_expression_values = {':last_activity_at': int(time.time()), ':one': 1}
     if needs_retracing:
-        movie_update_expression += ', #needs_retracing = :needs_retracing'
+        # Labels are drawn on every traced frame, so the whole traced MP4 is stale.
+        movie_update_expression += (', #needs_retracing = :needs_retracing'
+                                    ', #traced_movie_stale_from = :traced_movie_stale_from')
         movie_expression_names['#needs_retracing'] = NEEDS_RETRACING
+        movie_expression_names['#traced_movie_stale_from'] = TRACED_MOVIE_STALE_FROM
         movie_expression_values[':needs_retracing'] = 1
+        movie_expression_values[':traced_movie_stale_from'] = 0
+    movie_update_expression += ' ADD #marker_map_version :one'
     transact_items.append({
         'Update': {
             'TableName': ddbo.movies.name,
@@ -2860,6 +3742,7 @@ def rename_movie_marker(*, movie_id: str, old_label: str, new_label: str,
         },
     })
 
+    ddbo.forget_cached_item(ddbo.movies, movie_id)
     try:
         ddbo.dynamodb.meta.client.transact_write_items(
             TransactItems=transact_items,
@@ -2880,89 +3763,248 @@ def put_frame_trackpoints(*, movie_id, frame_number:int, trackpoints:list[Trackp
     :param: trackpoints - array of Tractpoints.
     """
     assert int(frame_number) >= 0
-    ensure_bottom_left_trackpoints(movie_id=movie_id)
+    movie = ensure_bottom_left_trackpoints(movie_id=movie_id)
     # Remove numpy from trackpoints
     trackpoints = [ tp.model_dump(exclude_none=True, exclude_defaults=True) for tp in trackpoints ]
     trackpoints = ensure_trackpoint_marker_ids(movie_id=movie_id, trackpoints=trackpoints)
     logger.debug("put trackpoints frame=%s trackpoints=%s",frame_number,trackpoints)
 
     ddbo = DDBO()
-    ddbo.movie_frames.update_item( Key={MOVIE_ID:movie_id,
-                                        FRAME_NUMBER:frame_number},
-                                   UpdateExpression='SET trackpoints=:val',
-                                   ExpressionAttributeValues={':val':trackpoints})
-
-    # update the last frame tracked. This is way, way more expensive than it should be.
-    movie = ddbo.get_movie(movie_id, fields=[LAST_FRAME_TRACKED])
-    current = movie.get(LAST_FRAME_TRACKED, None)
-    if current is None:
-        assert frame_number==0,f"frame_number {frame_number} should be 0 if this is the first frame to be tracked"
-        lft = frame_number
+    if trackpoint_storage(movie) == TRACKPOINT_STORAGE_COLUMNAR:
+        put_columnar_trackpoints(ddbo=ddbo, movie_id=movie_id, frames={frame_number: trackpoints}, movie=movie)
     else:
-        lft = max(current, frame_number)
-    movie_metadata = {LAST_FRAME_TRACKED:lft}
+        ddbo.movie_frames.update_item( Key={MOVIE_ID:movie_id,
+                                            FRAME_NUMBER:frame_number},
+                                       UpdateExpression='SET trackpoints=:val, #generation=:generation, '
+                                                        '#tracked=:frame_number',
+                                       ExpressionAttributeNames={'#generation': TRACKPOINT_GENERATION,
+                                                                 '#tracked': TRACKED_FRAME_NUMBER},
+                                       ExpressionAttributeValues={':val':trackpoints,
+                                                                  ':generation':trackpoint_generation(movie),
+                                                                  ':frame_number':frame_number})
+
+    ddbo.advance_last_frame_tracked(movie_id, frame_number)
+    movie_metadata = {}
     if needs_retracing:
-        movie_metadata[NEEDS_RETRACING] = 1
+        stale_from = ddbo.get_movie(movie_id, fields=[TRACED_MOVIE_STALE_FROM]).get(TRACED_MOVIE_STALE_FROM)
+        movie_metadata = {
+            NEEDS_RETRACING: 1,
+            TRACED_MOVIE_STALE_FROM: frame_number if stale_from is None else min(int(stale_from), frame_number),
+        }
+    # Always record the edit as activity: an edit at or below LAST_FRAME_TRACKED leaves the
+    # frontier alone, and the ETag and the stored exports only see changes to the movie item.
     set_movie_metadata(movie_id=movie_id, movie_metadata=movie_metadata)
 
 
+class FrameTrackpointWriter:
+    """Buffer traced frame trackpoints and persist them with BatchWriteItem.
+
+    Used by the tracer instead of put_frame_trackpoints() for every frame. The movie
+    must already be in bottom-left trackpoint coordinates. Marker ids are resolved once
+    per label, and LAST_FRAME_TRACKED and the trace-lock heartbeat advance once per flush.
+    Flushes leave LAST_ACTIVITY_AT alone; finish_movie_trace() records the trace as activity.
+    """
+
+    def __init__(self, *, movie_id, job_id=None,
+                 max_frames=C.TRACE_FLUSH_FRAMES, max_seconds=C.TRACE_FLUSH_INTERVAL):
+        assert is_movie_id(movie_id)
+        self.ddbo = DDBO()
+        self.movie_id = movie_id
+        self.job_id = job_id
+        self.max_frames = max_frames
+        self.max_seconds = max_seconds
+        self.frames = {}
+        self.marker_ids = {}
+        self.flushed_at = time.time()
+        self.movie = self.ddbo.get_movie(movie_id, fields=TRACKPOINT_STATE_FIELDS)
+        self.columnar = trackpoint_storage(self.movie) == TRACKPOINT_STORAGE_COLUMNAR
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.flush()
+
+    def _with_marker_ids(self, trackpoints: list[dict]) -> list[dict]:
+        if all(tp.get(MARKER_ID) or tp['label'] in self.marker_ids for tp in trackpoints):
+            return [{**tp, MARKER_ID: tp.get(MARKER_ID) or self.marker_ids[tp['label']]}
+                    for tp in trackpoints]
+        trackpoints = ensure_trackpoint_marker_ids(movie_id=self.movie_id, trackpoints=trackpoints)
+        self.marker_ids.update({tp['label']: tp[MARKER_ID] for tp in trackpoints})
+        return trackpoints
+
+    def put(self, *, frame_number: int, trackpoints: list[Trackpoint]):
+        """Buffer a frame's trackpoints, flushing when the size or time threshold is reached."""
+        assert int(frame_number) >= 0
+        trackpoints = [tp.model_dump(exclude_none=True, exclude_defaults=True) for tp in trackpoints]
+        self.frames[int(frame_number)] = self._with_marker_ids(trackpoints)
+        if len(self.frames) >= self.max_frames:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Flush (and heartbeat the trace lock) if max_seconds have passed since the last flush."""
+        if time.time() - self.flushed_at >= self.max_seconds:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered frames, advance LAST_FRAME_TRACKED and heartbeat. Returns frames written."""
+        count = len(self.frames)
+        if self.frames:
+            first, last = min(self.frames), max(self.frames)
+            if self.columnar:
+                put_columnar_trackpoints(ddbo=self.ddbo, movie_id=self.movie_id, frames=self.frames,
+                                         movie=self.movie)
+            else:
+                # PutRequest replaces the whole item, so carry over frame_urn and other attributes.
+                existing = {int(frame[FRAME_NUMBER]): frame for frame in
+                            iter_movie_frames_in_range(self.ddbo.movie_frames, self.movie_id, first, last)}
+                with self.ddbo.movie_frames.batch_writer() as batch:
+                    for frame_number, trackpoints in sorted(self.frames.items()):
+                        item = existing.get(frame_number, {MOVIE_ID: self.movie_id, FRAME_NUMBER: frame_number})
+                        batch.put_item(Item=tracked_frame_item({**item, 'trackpoints': trackpoints,
+                                                                TRACKPOINT_GENERATION: trackpoint_generation(self.movie)}))
+            self.ddbo.advance_last_frame_tracked(self.movie_id, last)
+            self.frames = {}
+        if self.job_id:
+            self.ddbo.heartbeat_movie_trace_lock(movie_id=self.movie_id, job_id=self.job_id)
+        self.flushed_at = time.time()
+        return count
+
+
+def invalidate_movie_trackpoints(*, movie_id, frame_start: int, frame_end: int | None = None,
+                                 last_frame_tracked: int | None = None, remove_fields=()) -> int:
+    """Supersede the trackpoints of frames frame_start..frame_end (inclusive; None for the end of the movie)
+    with one conditional update of the movie, whatever its length. The movie's trackpoint generation is
+    bumped and the range recorded, so readers skip trackpoints written at an older generation in that
+    range; purge_superseded_trackpoints() removes them later.
+    LAST_FRAME_TRACKED is set to last_frame_tracked, or removed when it is None, as are remove_fields.
+    Returns the new generation.
+    """
+    ddbo = DDBO()
+    for attempt in range(TRACKPOINT_CHUNK_WRITE_ATTEMPTS):
+        ddbo.forget_cached_item(ddbo.movies, movie_id)
+        generation = trackpoint_generation(ddbo.get_movie(movie_id, fields=TRACKPOINT_STATE_FIELDS))
+        names = {
+            '#movie_id': MOVIE_ID,
+            '#generation': TRACKPOINT_GENERATION,
+            '#invalidations': TRACKPOINT_INVALIDATIONS,
+            '#last_activity_at': LAST_ACTIVITY_AT,
+            '#last_frame_tracked': LAST_FRAME_TRACKED,
+        }
+        values = {
+            ':generation': generation + 1,
+            ':invalidation': [[generation + 1, int(frame_start), None if frame_end is None else int(frame_end)]],
+            ':empty': [],
+            ':last_activity_at': int(time.time()),
+        }
+        update = ('SET #generation = :generation, '
+                  '#invalidations = list_append(if_not_exists(#invalidations, :empty), :invalidation), '
+                  '#last_activity_at = :last_activity_at')
+        removed = [f'#remove{i}' for i in range(len(remove_fields))]
+        names.update(zip(removed, remove_fields))
+        if last_frame_tracked is None:
+            removed.append('#last_frame_tracked')
+        else:
+            update += ', #last_frame_tracked = :last_frame_tracked'
+            values[':last_frame_tracked'] = int(last_frame_tracked)
+        if removed:
+            update += ' REMOVE ' + ', '.join(removed)
+        if generation:
+            condition = 'attribute_exists(#movie_id) AND #generation = :current'
+            values[':current'] = generation
+        else:
+            condition = 'attribute_exists(#movie_id) AND attribute_not_exists(#generation)'
+        try:
+            ddbo.movies.update_item(Key={MOVIE_ID: movie_id}, UpdateExpression=update,
+                                    ConditionExpression=condition,
+                                    ExpressionAttributeNames=names, ExpressionAttributeValues=values)
+            return generation + 1
+        except ClientError as exc:
+            if (exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException'
+                    or attempt == TRACKPOINT_CHUNK_WRITE_ATTEMPTS - 1):
+                raise
+    raise AssertionError("unreachable")
+
+
+def purge_superseded_trackpoints(*, movie_id) -> int:
+    """Remove the stored trackpoints that retraces superseded, then forget the retraced ranges.
+    Runs in the trace worker rather than on a user's request. Returns the number of frames purged."""
+    assert is_movie_id(movie_id)
+    ddbo = DDBO()
+    ddbo.forget_cached_item(ddbo.movies, movie_id)
+    movie = ddbo.get_movie(movie_id, fields=TRACKPOINT_STATE_FIELDS)
+    invalidations = movie.get(TRACKPOINT_INVALIDATIONS)
+    if not invalidations:
+        return 0
+    generation = trackpoint_generation(movie)
+    frame_start = min(int(first) for _, first, _ in invalidations)
+    lasts = [last for _, _, last in invalidations]
+    frame_end = None if None in lasts else max(int(last) for last in lasts)
+
+    def superseded(item, frame_number):
+        return trackpoints_superseded(movie, generation=trackpoint_generation(item), frame_number=frame_number)
+
+    if trackpoint_storage(movie) == TRACKPOINT_STORAGE_COLUMNAR:
+        chunk_frames = C.TRACKPOINT_CHUNK_FRAMES
+        last_chunk = TRACKPOINT_CHUNK_MAX if frame_end is None else frame_end // chunk_frames
+        chunks = [chunk for chunk, item in iter_trackpoint_chunks(ddbo.movie_frames, movie_id,
+                                                                  frame_start // chunk_frames, last_chunk)
+                  if any(superseded(item, chunk * chunk_frames + int(offset)) for offset in item[CHUNK_OFFSETS])]
+        purged = put_columnar_trackpoints(ddbo=ddbo, movie_id=movie_id, frames={}, movie=movie,
+                                          rewrite_chunks=chunks)
+    else:
+        keys = [key for key in ddbo.tracked_frame_keys(movie_id, frame_start, frame_end)
+                if superseded(key, int(key[FRAME_NUMBER]))]
+        purged = ddbo.remove_frame_trackpoints(keys, below_generation=generation)
+
+    ddbo.forget_cached_item(ddbo.movies, movie_id)
+    try:
+        ddbo.movies.update_item(
+            Key={MOVIE_ID: movie_id},
+            UpdateExpression='REMOVE #invalidations',
+            ConditionExpression='#generation = :generation',
+            ExpressionAttributeNames={'#invalidations': TRACKPOINT_INVALIDATIONS,
+                                      '#generation': TRACKPOINT_GENERATION},
+            ExpressionAttributeValues={':generation': generation},
+        )
+    except ClientError as exc:
+        if exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        # Another retrace started meanwhile; the next purge forgets its range and these.
+    logger.info("purge_superseded_trackpoints movie_id=%s generation=%s purged=%s", movie_id, generation, purged)
+    return purged
+
+
 def clear_movie_tracking_after_frame(*, movie_id, frame_number:int, frame_end:int|None=None):
-    """Remove trackpoints for frames strictly after ``frame_number``.
+    """Invalidate trackpoints for frames strictly after ``frame_number``.
 
     This is used when the user edits frame ``N`` and requests a retrace: frame ``N``
     remains the source of truth, while frames ``N+1`` through ``frame_end`` (or the
     end of the movie when no end is provided)
     are invalidated and must be recomputed.
 
-    Returns the count of frame records whose ``trackpoints`` attribute was removed.
+    Returns the new trackpoint generation; see invalidate_movie_trackpoints().
     """
     assert is_movie_id(movie_id)
     assert frame_number >= 0
     if frame_end is not None:
         assert frame_end >= frame_number
-    ddbo = DDBO()
-    deleted = 0
-    for frame in ddbo.get_frames(movie_id):
-        fn = frame.get(FRAME_NUMBER)
-        if fn is None or int(fn) <= frame_number or 'trackpoints' not in frame:
-            continue
-        if frame_end is not None and int(fn) > frame_end:
-            continue
-        ddbo.movie_frames.update_item(
-            Key={MOVIE_ID: movie_id, FRAME_NUMBER: fn},
-            UpdateExpression='REMOVE trackpoints',
-        )
-        deleted += 1
-
     # Preserve the edited frame as the new frontier for any subsequent retrace.
-    set_movie_metadata(movie_id=movie_id, movie_metadata={LAST_FRAME_TRACKED: frame_number})
-    return deleted
+    return invalidate_movie_trackpoints(movie_id=movie_id, frame_start=frame_number + 1, frame_end=frame_end,
+                                        last_frame_tracked=frame_number)
 
 
 def clear_movie_tracking(movie_id):
-    """Remove all trackpoints and last_frame_tracked for a movie (e.g. after rotation).
-    Frames keep frame_number/urn; only trackpoints attribute is removed per frame.
+    """Invalidate all trackpoints and remove last_frame_tracked for a movie (e.g. after rotation).
+    Returns the new trackpoint generation; see invalidate_movie_trackpoints().
     """
     assert is_movie_id(movie_id)
-    ddbo = DDBO()
-    for frame in ddbo.get_frames(movie_id):
-        fn = frame.get(FRAME_NUMBER)
-        if fn is None:
-            continue
-        ddbo.movie_frames.update_item(
-            Key={MOVIE_ID: movie_id, FRAME_NUMBER: fn},
-            UpdateExpression='REMOVE trackpoints',
-        )
     # Clear stored last_frame_tracked on the movie so next get_movie_metadata computes correctly.
-    ddbo.movies.update_item(
-        Key={MOVIE_ID: movie_id},
-        UpdateExpression='SET #last_activity_at = :last_activity_at REMOVE #last_frame_tracked',
-        ExpressionAttributeNames={
-            '#last_activity_at': LAST_ACTIVITY_AT,
-            '#last_frame_tracked': LAST_FRAME_TRACKED,
-        },
-        ExpressionAttributeValues={':last_activity_at': int(time.time())},
-    )
+    # The traced MP4 no longer matches the frames, so it must not be patched by a later retrace.
+    return invalidate_movie_trackpoints(movie_id=movie_id, frame_start=0, remove_fields=(TRACED_MOVIE_GOP,))
 
 
 ################################################################
@@ -5,6 +5,7 @@ Moved to a separate python file so that it doesn't need to be loaded for python
 """
 
 #pylint: disable=too-many-lines
+import io
 import time
 import urllib
 import urllib.parse
@@ -12,7 +13,8 @@ import urllib.parse
 import requests
 from botocore.exceptions import ClientError,ParamValidationError
 
-from .s3_presigned import frame_object_key, make_urn, movie_object_key, s3_client
+from .s3_presigned import (export_cache_prefix, forget_signed_urls, frame_cache_prefix, frame_object_key,
+                           make_urn, movie_object_key, parse_s3_urn, s3_client)
 from .constants import C, logger, storage_deployment_id
 from .odb import (
     DDBO,
@@ -21,11 +23,13 @@ from .odb import (
     course_id_for_movie_id,
     MOVIE_DATA_URN,
     MOVIE_ZIPFILE_URN,
+    MOVIE_FRAME_INDEX_URN,
     UPLOADED_AT,
     TOTAL_BYTES,
     TOTAL_FRAMES,
     FRAME_URN,
     DELETED,
+    delete_trackpoint_chunks,
 )
 
 def read_object(urn):
@@ -71,6 +75,7 @@ def write_object(urn, object_data):
     if o.scheme== C.SCHEME_S3:
         try:
             s3_client().put_object(Bucket=o.netloc, Key=o.path[1:], Body=object_data)
+            forget_signed_urls(urn)
             return
         except ParamValidationError as e:
             logger.error("ParamValidationError. urn=%s o=%s  e=%s",urn,o,e)
@@ -86,29 +91,94 @@ def write_object(urn, object_data):
     raise ValueError(f"Cannot write object urn={urn} len={len(object_data)}")
 
 
-def write_object_from_path(urn, path: str) -> None:
+def write_object_from_path(urn, path: str, *, content_type=None) -> None:
     """Upload object from a file path (streaming). Avoids loading entire file into RAM."""
     assert "s3://s3://" not in urn
     o = urllib.parse.urlparse(urn)
     if o.scheme == C.SCHEME_S3:
+        extra = {'ContentType': content_type} if content_type else {}
         try:
             with open(path, "rb") as f:
-                s3_client().put_object(Bucket=o.netloc, Key=o.path[1:], Body=f)
+                s3_client().put_object(Bucket=o.netloc, Key=o.path[1:], Body=f, **extra)
+            forget_signed_urls(urn)
             return
         except (ParamValidationError, ClientError) as e:
             logger.error("write_object_from_path failed: urn=%s path=%s e=%s", urn, path, e)
             raise
     raise ValueError(f"Cannot write object urn={urn} path={path}")
 
+def object_exists(urn):
+    """Return True if the S3 object exists."""
+    o = urllib.parse.urlparse(urn)
+    if o.scheme != C.SCHEME_S3:
+        raise ValueError(f"Cannot check object urn={urn}")
+    try:
+        s3_client().head_object(Bucket=o.netloc, Key=o.path[1:])
+        return True
+    except ClientError as ex:
+        if ex.response.get('Error',{}).get('Code','') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
 def delete_object(urn):
     logger.debug("delete_object(%s)",urn)
     o = urllib.parse.urlparse(urn)
     if o.scheme== C.SCHEME_S3:
         s3_client().delete_object(Bucket=o.netloc, Key=o.path[1:])
+        forget_signed_urls(urn)
     else:
         raise ValueError(f"Cannot delete object urn={urn}")
 
 
+class S3RangeReader(io.RawIOBase):
+    """Seekable, read-only file object over an S3 object that fetches only the byte ranges read.
+    Each ranged GET fetches at least block_size bytes, so walking a movie's box headers costs a
+    few requests rather than a download of the whole object."""
+
+    def __init__(self, urn, *, block_size=C.S3_RANGE_READ_BLOCK):
+        super().__init__()
+        o = urllib.parse.urlparse(urn)
+        if o.scheme != C.SCHEME_S3:
+            raise ValueError(f"Cannot range-read object urn={urn}")
+        self._object = {'Bucket': o.netloc, 'Key': o.path[1:]}
+        self.block_size = block_size
+        self.size = int(s3_client().head_object(**self._object)["ContentLength"])
+        self.bytes_fetched = 0
+        self.requests = 0
+        self._pos = 0
+        self._block = (0, b"")      # (offset, bytes) of the last ranged GET
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        if end <= self._pos:
+            return b""
+        block_start, block = self._block
+        if not block_start <= self._pos or end > block_start + len(block):
+            fetch_end = min(self.size, max(end, self._pos + self.block_size))
+            response = s3_client().get_object(**self._object, Range=f"bytes={self._pos}-{fetch_end - 1}")
+            block_start, block = self._pos, response["Body"].read()
+            self._block = (block_start, block)
+            self.bytes_fetched += len(block)
+            self.requests += 1
+        data = block[self._pos - block_start:end - block_start]
+        self._pos += len(data)
+        return data
+
+
 
 
 
@@ -130,6 +200,7 @@ def set_movie_data(*,movie_id, movie_data):
     purge_movie_data(movie_id=movie_id)
     purge_movie_frames( movie_id=movie_id )
     purge_movie_zipfile( movie_id=movie_id )
+    purge_movie_frame_index( movie_id=movie_id )
     oname = movie_object_key(
         deployment_id=storage_deployment_id(),
         course_id=course_id_for_movie_id(movie_id),
@@ -175,6 +246,8 @@ def purge_movie_frames(*,movie_id, frame_numbers=None):
         if frame_urn is not None:
             delete_object(frame_urn)
     ddbo.delete_movie_frames( frames )
+    if frame_numbers is None:
+        delete_trackpoint_chunks(movie_id=movie_id)
 
 
 def purge_movie_zipfile(*,movie_id):
@@ -187,11 +260,62 @@ def purge_movie_zipfile(*,movie_id):
         delete_object(urn)
         ddbo.update_movie(movie_id, {MOVIE_ZIPFILE_URN: None})
 
+def purge_movie_frame_index(*,movie_id):
+    """Delete the frame index object for a movie and clear MOVIE_FRAME_INDEX_URN in DB."""
+    logger.debug("purge_movie_frame_index movie_id=%s", movie_id)
+    ddbo = DDBO()
+    urn = ddbo.get_movie(movie_id).get(MOVIE_FRAME_INDEX_URN, None)
+    if urn is not None:
+        delete_object(urn)
+        ddbo.update_movie(movie_id, {MOVIE_FRAME_INDEX_URN: None})
+
+def purge_movie_frame_cache(*,movie_id):
+    """Delete the rendered-frame cache objects stored next to a movie's data."""
+    logger.debug("purge_movie_frame_cache movie_id=%s", movie_id)
+    urn = DDBO().get_movie(movie_id).get(MOVIE_DATA_URN, None)
+    if not urn:
+        return
+    bucket, key = parse_s3_urn(urn=urn)
+    client = s3_client()
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=frame_cache_prefix(source_movie_object_key=key)):
+        objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if objects:
+            client.delete_objects(Bucket=bucket, Delete={"Objects": objects, "Quiet": True})
+            for obj in objects:
+                forget_signed_urls(make_urn(object_name=obj["Key"], bucket=bucket))
+
+def purge_movie_export_cache(*, movie_id, keep_urn=None, keep_seconds=0):
+    """Delete the stored trackpoint exports next to a movie's data, except keep_urn and any stored
+    less than keep_seconds before it, which a concurrent request may still be redirecting to."""
+    logger.debug("purge_movie_export_cache movie_id=%s keep_urn=%s", movie_id, keep_urn)
+    urn = DDBO().get_movie(movie_id).get(MOVIE_DATA_URN, None)
+    if not urn:
+        return
+    bucket, key = parse_s3_urn(urn=urn)
+    keep_key = parse_s3_urn(urn=keep_urn)[1] if keep_urn else None
+    client = s3_client()
+    paginator = client.get_paginator("list_objects_v2")
+    stored = [obj for page in paginator.paginate(Bucket=bucket, Prefix=export_cache_prefix(source_movie_object_key=key))
+              for obj in page.get("Contents", [])]
+    kept = [obj["LastModified"] for obj in stored if obj["Key"] == keep_key]
+    if keep_key and not kept:
+        return                  # not listed yet; leave the cleanup to the next export
+    objects = [{"Key": obj["Key"]} for obj in stored
+               if not kept or (kept[0] - obj["LastModified"]).total_seconds() > keep_seconds]
+    for start in range(0, len(objects), 1000):
+        client.delete_objects(Bucket=bucket, Delete={"Objects": objects[start:start + 1000], "Quiet": True})
+    for obj in objects:
+        forget_signed_urls(make_urn(object_name=obj["Key"], bucket=bucket))
+
 def purge_movie(*,movie_id):
     """Actually delete a movie and all its frames"""
+    purge_movie_frame_cache(movie_id=movie_id)
+    purge_movie_export_cache(movie_id=movie_id)
     purge_movie_data(movie_id=movie_id)
     purge_movie_frames( movie_id=movie_id )
     purge_movie_zipfile( movie_id=movie_id )
+    purge_movie_frame_index( movie_id=movie_id )
 
 
 def delete_movie(*,movie_id, delete=1):
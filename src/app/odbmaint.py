@@ -126,6 +126,41 @@ def create_tables(*, ignore_table_exists=False, status: Callable[[str], None] |
                 logger.error("Error creating table %s: %s.  endpoint=%s", table_name, e, dynamodb.meta.client.meta.endpoint_url)
 
 
+def create_missing_indexes(*, status: Callable[[str], None] | None = None):
+    """Add the global secondary indexes in etc/dynamodb_tables.json that existing tables lack.
+    DynamoDB builds (backfills) a new index in the background; a table accepts one index
+    creation at a time, so run this again for the next index once the previous one is ACTIVE.
+    :return: the names of the indexes whose creation was started
+    """
+    table_prefix = table_prefix_from_env()
+    client = DDBO.resource().meta.client
+    started = []
+    for table_config in load_table_configurations():
+        table_name = table_prefix + table_config[TableName]
+        description = client.describe_table(TableName=table_name)['Table']
+        existing = {index[IndexName] for index in description.get(GlobalSecondaryIndexes, [])}
+        missing = [index for index in table_config.get(GlobalSecondaryIndexes, [])
+                   if index[IndexName] not in existing]
+        if not missing:
+            continue
+        index = missing[0]
+        key_names = {key[AttributeName] for key in index[KeySchema]}
+        attribute_definitions = [definition for definition in table_config[AttributeDefinitions]
+                                 if definition[AttributeName] in key_names]
+        if status:
+            status(f"Creating index {index[IndexName]} on {table_name}...")
+        client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=attribute_definitions,
+            GlobalSecondaryIndexUpdates=[{'Create': copy.deepcopy(index)}],
+        )
+        started.append(index[IndexName])
+        for later in missing[1:]:
+            if status:
+                status(f"Index {later[IndexName]} on {table_name} must be created by a later run.")
+    return started
+
+
 def drop_dynamodb_table(dynamodb, table_name: str, silent_warnings=False):
     """Drops a specified DynamoDB table from the local instance.
 
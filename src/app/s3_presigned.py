@@ -13,6 +13,8 @@ import logging
 import urllib.parse
 import hashlib
 import posixpath
+import threading
+import time
 
 import boto3
 from botocore.config import Config
@@ -23,6 +25,8 @@ from .constants import C
 logger = logging.getLogger(__name__)
 
 _S3_CLIENTS = {}
+_SIGNED_URLS = {}               # (urn, operation, expires, download_name) -> (url, expires_at)
+_SIGNED_URLS_LOCK = threading.Lock()
 SUPPORTED_SCHEMES = [ C.SCHEME_S3 ]
 S3 = 's3'
 
@@ -157,6 +161,26 @@ def analysis_zip_object_key(*, source_movie_object_key):
     )
 
 
+def frame_index_object_key(*, source_movie_object_key):
+    """Return the keyframe/frame-offset index key derived from an original movie key."""
+    return _derived_movie_object_key(
+        source_movie_object_key=source_movie_object_key,
+        template=C.S3_FRAME_INDEX_OBJECT_KEY_TEMPLATE,
+    )
+
+
+def frame_cache_prefix(*, source_movie_object_key):
+    """Return the key prefix of rendered-frame cache objects derived from an original movie key."""
+    source_stem, _ = posixpath.splitext(source_movie_object_key)
+    return C.S3_FRAME_CACHE_PREFIX_TEMPLATE.format(source_movie_stem=source_stem)
+
+
+def export_cache_prefix(*, source_movie_object_key):
+    """Return the key prefix of stored trackpoint-export objects derived from an original movie key."""
+    source_stem, _ = posixpath.splitext(source_movie_object_key)
+    return C.S3_EXPORT_CACHE_PREFIX_TEMPLATE.format(source_movie_stem=source_stem)
+
+
 def make_urn(*, object_name, scheme=C.SCHEME_S3, bucket=None):
     """Build an S3 URN, using an explicit legacy bucket or the configured bucket."""
     if scheme not in SUPPORTED_SCHEMES:
@@ -199,6 +223,33 @@ def analysis_zip_urn(*, movie_data_urn):
     )
 
 
+def frame_index_urn(*, movie_data_urn):
+    """Return a frame-index URN while preserving the source bucket."""
+    bucket, source_key = parse_s3_urn(urn=movie_data_urn)
+    return make_urn(
+        object_name=frame_index_object_key(source_movie_object_key=source_key),
+        bucket=bucket,
+    )
+
+
+def frame_cache_urn(*, movie_data_urn, digest):
+    """Return the URN of one rendered-frame cache object, named by its cache-key digest."""
+    bucket, source_key = parse_s3_urn(urn=movie_data_urn)
+    return make_urn(
+        object_name=f"{frame_cache_prefix(source_movie_object_key=source_key)}{digest}.jpg",
+        bucket=bucket,
+    )
+
+
+def export_cache_urn(*, movie_data_urn, version, extension):
+    """Return the URN of a stored trackpoint export for one movie content version."""
+    bucket, source_key = parse_s3_urn(urn=movie_data_urn)
+    return make_urn(
+        object_name=f"{export_cache_prefix(source_movie_object_key=source_key)}trackpoints-{version}.{extension}",
+        bucket=bucket,
+    )
+
+
 def replace_course_object_key(*, object_key, from_course_id, to_course_id):
     """Move a namespaced or legacy key between course prefixes."""
     legacy_prefix = f"{_template_value('from_course_id', from_course_id)}/"
@@ -218,7 +269,39 @@ def replace_course_object_key(*, object_key, from_course_id, to_course_id):
     return target_prefix + object_key[len(source_prefix):]
 
 
-def make_signed_url(*, urn, operation=C.GET, expires=3600, download_name=None):
+def make_signed_url(*, urn, operation=C.GET, expires=3600, download_name=None, version=None):
+    """Return a presigned URL for urn. URLs are memoized per (urn, operation, expires, download_name,
+    version) and reused until fewer than C.SIGNED_URL_MIN_REMAINING_SECONDS (or half of expires) remain,
+    so every URL handed out is valid for at least that long. Pass the object's version (see
+    odb.movie_object_version) for objects rewritten in place: another process may have replaced the
+    object, and a new version gets a new URL, so browsers do not serve the old body from their cache."""
+    cache_key = (urn, operation, expires, download_name, version)
+    now = time.time()
+    min_remaining = min(C.SIGNED_URL_MIN_REMAINING_SECONDS, expires / 2)
+    with _SIGNED_URLS_LOCK:
+        cached = _SIGNED_URLS.get(cache_key)
+    if cached and cached[1] - now >= min_remaining:
+        return cached[0]
+    url = _sign_url(urn=urn, operation=operation, expires=expires, download_name=download_name)
+    with _SIGNED_URLS_LOCK:
+        if len(_SIGNED_URLS) >= C.SIGNED_URL_CACHE_MAX_ENTRIES:
+            for stale_key in [k for k, (_, expires_at) in _SIGNED_URLS.items() if expires_at - now < min_remaining]:
+                del _SIGNED_URLS[stale_key]
+            while len(_SIGNED_URLS) >= C.SIGNED_URL_CACHE_MAX_ENTRIES:
+                del _SIGNED_URLS[next(iter(_SIGNED_URLS))]
+        _SIGNED_URLS[cache_key] = (url, now + expires)
+    return url
+
+def forget_signed_urls(urn=None):
+    """Drop memoized signed URLs for urn (all URLs if urn is None), e.g. after the object is replaced."""
+    with _SIGNED_URLS_LOCK:
+        if urn is None:
+            _SIGNED_URLS.clear()
+        else:
+            for cache_key in [k for k in _SIGNED_URLS if k[0] == urn]:
+                del _SIGNED_URLS[cache_key]
+
+def _sign_url(*, urn, operation, expires, download_name):
     logger.debug("make_signed_url urn=%s",urn)
     bucket, key = parse_s3_urn(urn=urn)
     op = {C.PUT:'put_object', C.GET:'get_object'}[operation]
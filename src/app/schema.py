@@ -167,6 +167,9 @@ class Movie(BaseModel):
     width: Annotated[int | None, Field(ge=0, le=10000)] = None
     height: Annotated[int | None, Field(ge=0, le=10000)] = None
     trackpoint_origin: Literal["bottom-left"] | None = None
+    trackpoint_storage: Literal["frames", "columnar"] | None = None  # None is "frames"
+    trackpoint_generation: Annotated[int | None, Field(ge=0)] = None  # bumped by each retrace
+    trackpoint_invalidations: list[list[int | None]] | None = None  # [generation, first, last] not yet purged
 
     total_frames: Annotated[int | None, Field(ge=0, le=999999)] = None
     trim_start_frame: Annotated[int | None, Field(ge=0, le=999999)] = None
@@ -175,12 +178,19 @@ class Movie(BaseModel):
 
     movie_data_urn: str | None = None
     movie_zipfile_urn: str | None = None
+    movie_frame_index_urn: str | None = None
     first_frame_urn: str | None = None
     processing_state: str | None = None  # unused legacy field; superseded by the status field in odb.py
     zip_frame_processing: dict | None = None  # {"total": int, "current": int}
 
     last_frame_tracked: Annotated[int | None, Field(ge=0)] = None
     needs_retracing: Annotated[int, Field(ge=0, le=1)] | None = None
+    traced_movie_gop: Annotated[int | None, Field(ge=1)] = None
+    traced_movie_frame_start: Annotated[int | None, Field(ge=0)] = None
+    traced_movie_frame_end: Annotated[int | None, Field(ge=0)] = None
+    traced_movie_stale_from: Annotated[int | None, Field(ge=0)] = None
+    traced_at: Annotated[int | None, Field(ge=0)] = None  # when the traced MP4 and frame zip were written
+    marker_map_version: Annotated[int | None, Field(ge=0)] = None  # bumped when the marker map changes
 
     version: Annotated[int | None, Field(ge=0)] = None
 
@@ -254,6 +264,8 @@ class MovieFrame(BaseModel):
     movie_id: str
     frame_number: Annotated[int, Field(ge=0)]
     trackpoints: list[Trackpoint]
+    trackpoint_generation: Annotated[int | None, Field(ge=0)] = None  # the movie's generation when written
+    tracked_frame_number: Annotated[int | None, Field(ge=0)] = None  # frame_number while trackpoints are stored
 
 
 class LogEntry(BaseModel):
@@ -1511,6 +1511,7 @@ class TracerController extends MovieController {
                         const statusText = `Tracing has started — ${TRACING_MAY_LEAVE_MESSAGE}`;
                         self.tracking_status.text(statusText);
                         $('#status-big').text(statusText);
+                        self.reset_polled_frames();
                         self.poll_for_track_end();
                         return;
                     }
@@ -1680,17 +1681,39 @@ class TracerController extends MovieController {
          * On poll error we log to console and only alert after 3 consecutive errors.
          */
   poll_for_track_end() {
+        if (this.polled_frames == null) {
+            this.reset_polled_frames();
+        }
         const params = {
             api_key:this.api_key,
             course_id:activeCourseId(),
             movie_id:this.movie_id,
-            get_all_if_tracking_completed: true
+            since_frame: this.polled_through_frame
         };
         const self = this;
-        $.post(`${API_BASE}api/get-movie-metadata`, params)
-            .done((data) => {
+        // Send the last poll's ETag; the server answers 304 if nothing changed since then.
+        $.ajax({
+            url: `${API_BASE}api/get-movie-metadata`,
+            method: 'POST',
+            data: params,
+            headers: self.poll_etag ? { 'If-None-Match': self.poll_etag } : {},
+        })
+            .done((data, _textStatus, xhr) => {
+                if (xhr.status === 304) {
+                    self.poll_error_count = 0;
+                    if (self.tracking_start_timed_out(self.poll_metadata)) {
+                        self.report_backend_lambda_unresponsive();
+                        return;
+                    }
+                    self.timeout = setTimeout(() => { self.poll_for_track_end(); }, STATUS_POLL_MSEC);
+                    return;
+                }
                 if (data.error === false) {
+                    self.poll_etag = xhr.getResponseHeader('ETag');
+                    self.poll_metadata = data.metadata;
                     self.poll_error_count = 0;
+                    self.merge_polled_frames(data);
+                    data.frames = self.polled_frames;
                     if (data.metadata.status === TRACING_COMPLETED_FLAG) {
                         if (self.tracking) {
                             self.movie_tracked(data);
@@ -1743,6 +1766,32 @@ class TracerController extends MovieController {
             });
     }
 
+    /** Forget the frames collected by poll_for_track_end; the next poll fetches every traced frame. */
+    reset_polled_frames() {
+        this.polled_frames = {};
+        this.polled_through_frame = -1;
+    }
+
+    /**
+     * Merge a since_frame response into polled_frames. A next_since_frame below what we sent
+     * means a retrace cleared those frames, so drop them.
+     */
+    merge_polled_frames(data) {
+        const next = data.next_since_frame;
+        if (next == null) {
+            return;
+        }
+        if (next < this.polled_through_frame) {
+            for (const key of Object.keys(this.polled_frames)) {
+                if (Number(key) > next) {
+                    delete this.polled_frames[key];
+                }
+            }
+        }
+        Object.assign(this.polled_frames, data.frames || {});
+        this.polled_through_frame = next;
+    }
+
     /** Tracing completed - stop polling, load zip (wait up to 5s if needed), then show full movie. */
     movie_tracked(_data) {
         this.tracking = false;
@@ -1776,19 +1825,18 @@ class TracerController extends MovieController {
                         api_key: self.api_key,
                         course_id: activeCourseId(),
                         movie_id: self.movie_id,
-                        frame_start: 0,
-                        frame_count: MAX_FRAMES,
-                        get_all_if_tracking_completed: true
+                        since_frame: self.polled_through_frame
                     }).done((resp) => {
                         if (resp.error || !resp.metadata) {
                             setTimeout(poll, zipPollMs);
                             return;
                         }
+                        self.merge_polled_frames(resp);
                         if (resp.metadata.movie_zipfile_url) {
                             resolve({
                                 zipUrl: resp.metadata.movie_zipfile_url,
                                 metadata: resp.metadata,
-                                frames: resp.frames || {}
+                                frames: self.polled_frames
                             });
                             return;
                         }
@@ -1034,20 +1034,38 @@ function list_movies_data( movies ) {
 // It's called from the document ready function and after a movie change request is sent to the server.
 // The functions after this implement the interactivity
 //
-function list_ready_function() {
-  console.log("list_ready_function()");
-  $('#message').html('Listing movies...');
+const LIST_MOVIES_PAGE_LIMIT = 100;
 
+// Fetch every page of api/list-movies, concatenating the movies of each page.
+function fetch_movie_pages(restart_marker, movies) {
   let formData = new FormData();
   formData.append("api_key",  api_key); // on the upload form
+  formData.append("view", "list");     // only the columns the list shows
+  formData.append("limit", LIST_MOVIES_PAGE_LIMIT);
+  if (restart_marker) {
+    formData.append("restart_marker", restart_marker);
+  }
   const requestedCourseViewId = typeof course_view_id === 'undefined' ? null : course_view_id;
   if (requestedCourseViewId) {
     formData.append("course_id", requestedCourseViewId);
   } else {
     appendCourseContext(formData);
   }
-  fetch(`${API_BASE}api/list-movies`, { method:"POST", body:formData })
+  return fetch(`${API_BASE}api/list-movies`, { method:"POST", body:formData })
     .then((response) => response.json())
+    .then((data) => {
+      if (data.error!=false || !data.restart_marker) {
+        return data.error!=false ? data : {...data, movies: movies.concat(data.movies)};
+      }
+      return fetch_movie_pages(data.restart_marker, movies.concat(data.movies));
+    });
+}
+
+function list_ready_function() {
+  console.log("list_ready_function()");
+  $('#message').html('Listing movies...');
+
+  fetch_movie_pages(null, [])
     .then((data) => {
       if (data.error!=false){
         $('#message').html('error: '+data.message);
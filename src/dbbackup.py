@@ -7,6 +7,7 @@ Selective backup, restore, inspection, and migration for Plant Tracer data.
 
 import argparse
 import base64
+import collections
 import concurrent.futures
 import contextlib
 import copy
@@ -14,9 +15,11 @@ import getpass
 import hashlib
 import json
 import os
+import shutil
 import socket
 import subprocess
 import sys
+import tempfile
 import threading
 import time
 import zipfile
@@ -55,7 +58,9 @@ from app.odb import (
     FRAME_NUMBER,
     FRAME_URN,
     FRAMES,
+    LAST_ACTIVITY_AT,
     MOVIE_DATA_URN,
+    MOVIE_FRAME_INDEX_URN,
     MOVIE_ID,
     MOVIE_TRACED_URN,
     MOVIE_ZIPFILE_URN,
@@ -73,9 +78,15 @@ from app.s3_presigned import make_urn, parse_s3_urn, replace_course_object_key,
 
 FORMAT_VERSION = 1
 DEFAULT_RESTORE_THREADS = 6
+DEFAULT_BACKUP_THREADS = 6
+STREAM_CHUNK_BYTES = 1024 * 1024
 MEMBER_MANIFEST = "manifest.json"
 MEMBER_README = "README"
 MOVIE_MEMBER_PREFIX = "movies/"
+STORE_OBJECTS_DIR = "objects"
+STORE_RUNS_DIR = "runs"
+STORE_SPOOL_DIR = "spool"
+STORE_DELETED_DIR = "deleted"
 TYPE_DESERIALIZER = TypeDeserializer()
 TYPE_SERIALIZER = TypeSerializer()
 
@@ -156,6 +167,14 @@ class MovieObject(BaseModel):
     sha256: str
 
 
+class SpooledMovieObject(BaseModel):
+    """A movie object downloaded to a local spool file."""
+
+    path: Path
+    size: int
+    sha256: str
+
+
 class MovieObjectCandidate(BaseModel):
     """A movie object that passed backup preflight."""
 
@@ -196,6 +215,16 @@ class Manifest(BaseModel):
     warnings: list[str] = Field(default_factory=list)
 
 
+class StoreRun(BaseModel):
+    """One run of an incremental backup store: its manifest and the run it is a diff against."""
+
+    run_id: str
+    base_run_id: str | None = None
+    changed_rows: dict[str, int]
+    deleted_rows: dict[str, int]
+    manifest: Manifest
+
+
 class ArchiveData(BaseModel):
     """A parsed .ptb archive."""
 
@@ -499,6 +528,7 @@ def sanitized_movie_row(movie: dict[str, Any]) -> dict[str, Any]:
     row = copy.deepcopy(movie)
     row[MOVIE_ZIPFILE_URN] = None
     row[MOVIE_TRACED_URN] = None
+    row[MOVIE_FRAME_INDEX_URN] = None
     return row
 
 
@@ -511,7 +541,16 @@ def add_row_by_key(
     rows_by_key[tuple(row[key] for key in keys)] = row
 
 
-def build_backup_dataset(ddbo, selection: Selection, *, include_deleted: bool) -> BackupDataset:
+def build_backup_dataset(
+        ddbo,
+        selection: Selection,
+        *,
+        include_deleted: bool,
+        base: ArchiveData | None = None) -> BackupDataset:
+    """Select the rows to back up. With a base snapshot, a movie whose row, including
+    last_activity_at, is unchanged keeps the base snapshot's frames instead of being queried."""
+    base_movies = {} if base is None else {movie[MOVIE_ID]: movie for movie in base.tables[MOVIES]}
+    base_frames = {} if base is None else movie_frame_rows_by_movie_id(base.tables[FRAMES])
     users_by_id: dict[Any, dict[str, Any]] = {}
     courses_by_id: dict[Any, dict[str, Any]] = {}
     course_users_by_key: dict[Any, dict[str, Any]] = {}
@@ -535,8 +574,13 @@ def build_backup_dataset(ddbo, selection: Selection, *, include_deleted: bool) -
     def add_movie(movie: dict[str, Any]) -> None:
         if not is_selected_movie(movie, include_deleted=include_deleted):
             return
-        add_row_by_key(movies_by_id, sanitized_movie_row(movie), MOVIE_ID)
-        for frame in get_movie_frames(ddbo, movie[MOVIE_ID]):
+        row = sanitized_movie_row(movie)
+        add_row_by_key(movies_by_id, row, MOVIE_ID)
+        if row.get(LAST_ACTIVITY_AT) is not None and base_movies.get(movie[MOVIE_ID]) == row:
+            frames = base_frames.get(movie[MOVIE_ID], [])
+        else:
+            frames = get_movie_frames(ddbo, movie[MOVIE_ID])
+        for frame in frames:
             add_row_by_key(frames_by_key, frame, MOVIE_ID, FRAME_NUMBER)
 
     if selection.all_items:
@@ -750,41 +794,110 @@ def backup_dataset_without_movies(
     )
 
 
-def read_existing_movie_object(
+def copy_stream(source, destination) -> tuple[int, str]:
+    """Copy a file-like object in STREAM_CHUNK_BYTES pieces. Returns its size and SHA-256."""
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := source.read(STREAM_CHUNK_BYTES):
+        digest.update(chunk)
+        destination.write(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def copy_existing_movie_object(
+        archive: zipfile.ZipFile,
+        member_name: str,
         candidate: MovieObjectCandidate,
-        existing_archive: zipfile.ZipFile | None) -> bytes:
+        existing_archive: zipfile.ZipFile | None) -> tuple[int, str]:
     movie_object = candidate.existing_movie_object
     if movie_object is None:
         raise DbBackupError(f"movie {candidate.movie_id} has no reusable archive object")
     if existing_archive is None:
         raise DbBackupError(f"movie {candidate.movie_id} cannot reuse an unopened archive")
     try:
-        body = existing_archive.read(movie_object.member_name)
+        source = existing_archive.open(movie_object.member_name)
     except KeyError as exc:
         raise DbBackupError(
             f"existing archive is missing {movie_object.member_name}"
         ) from exc
-    digest = hashlib.sha256(body).hexdigest()
+    with source, archive.open(member_name, mode="w", force_zip64=True) as member:
+        size, digest = copy_stream(source, member)
     if digest != movie_object.sha256:
         raise DbBackupError(
             f"checksum mismatch for existing archive member {movie_object.member_name}: "
             f"{digest} != {movie_object.sha256}"
         )
-    return body
+    return size, digest
 
 
-def read_movie_object(
-        candidate: MovieObjectCandidate,
-        existing_archive: zipfile.ZipFile | None = None) -> bytes:
-    if candidate.existing_movie_object is not None:
-        return read_existing_movie_object(candidate, existing_archive)
+def spool_movie_object(candidate: MovieObjectCandidate, spool_dir: Path) -> SpooledMovieObject:
+    backup_status(f"backup: downloading movie object {candidate.movie_id}")
+    path = spool_dir / f"{candidate.movie_id}.mp4"
     try:
-        return s3_client().get_object(
-            Bucket=candidate.bucket,
-            Key=candidate.key,
-        )["Body"].read()
+        body = s3_client().get_object(Bucket=candidate.bucket, Key=candidate.key)["Body"]
+        with body, path.open("wb") as spool:
+            size, digest = copy_stream(body, spool)
     except ClientError as exc:
         raise DbBackupError(f"cannot read movie object {candidate.urn}: {exc}") from exc
+    return SpooledMovieObject(path=path, size=size, sha256=digest)
+
+
+def write_movie_objects(
+        archive: zipfile.ZipFile,
+        candidates: list[MovieObjectCandidate],
+        existing_archive: zipfile.ZipFile | None,
+        *,
+        threads: int,
+        spool_dir: Path) -> list[MovieObject]:
+    """Add the candidates' movie objects to the archive in order.
+
+    ``threads`` downloads run ahead of this single writer; each streams its S3 body
+    to a spool file while hashing it, so no movie is held in memory. At most twice
+    ``threads`` downloads are spooled or in flight at once.
+    """
+    movie_objects: list[MovieObject] = []
+    downloads = iter([candidate for candidate in candidates if candidate.existing_movie_object is None])
+    pending: collections.deque = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+
+        def submit_next() -> None:
+            candidate = next(downloads, None)
+            if candidate is not None:
+                pending.append(executor.submit(spool_movie_object, candidate, spool_dir))
+
+        for _ in range(2 * threads):
+            submit_next()
+        try:
+            for candidate in candidates:
+                member_name = f"{MOVIE_MEMBER_PREFIX}{candidate.movie_id}.mp4"
+                if candidate.existing_movie_object is not None:
+                    backup_status(f"backup: reusing archived movie object {candidate.movie_id}")
+                    size, digest = copy_existing_movie_object(
+                        archive, member_name, candidate, existing_archive,
+                    )
+                else:
+                    spooled = pending.popleft().result()
+                    submit_next()
+                    archive.write(spooled.path, arcname=member_name)
+                    spooled.path.unlink()
+                    size, digest = spooled.size, spooled.sha256
+                movie_objects.append(
+                    MovieObject(
+                        movie_id=candidate.movie_id,
+                        member_name=member_name,
+                        urn=candidate.urn,
+                        bucket=candidate.bucket,
+                        key=candidate.key,
+                        size=size,
+                        sha256=digest,
+                    )
+                )
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    return movie_objects
 
 
 def make_manifest(
@@ -831,6 +944,8 @@ def backup_archive_temp_path(output: Path) -> Path:
 
 
 def command_backup(args) -> int:
+    if args.store is not None:
+        return command_backup_store(args)
     configure_table_prefix(args.table_prefix)
     selection = selection_from_args(args, default_all=True)
     options = BackupOptions(include_deleted=args.include_deleted)
@@ -852,7 +967,6 @@ def command_backup(args) -> int:
     for warning in preflight.warnings:
         backup_status(f"WARNING: {warning}")
     dataset = backup_dataset_without_movies(dataset, preflight.skipped_movie_ids)
-    movie_objects: list[MovieObject] = []
 
     temp_output = backup_archive_temp_path(output)
     backup_status(f"backup: creating archive {output}")
@@ -868,26 +982,16 @@ def command_backup(args) -> int:
             for table_name, rows in dataset.table_rows().items():
                 write_table_jsonl(archive, table_name, rows)
 
-            for candidate in preflight.movie_objects:
-                if candidate.existing_movie_object is not None:
-                    backup_status(f"backup: reusing archived movie object {candidate.movie_id}")
-                else:
-                    backup_status(f"backup: downloading movie object {candidate.movie_id}")
-                body = read_movie_object(candidate, existing_archive)
-                member_name = f"{MOVIE_MEMBER_PREFIX}{candidate.movie_id}.mp4"
-                digest = hashlib.sha256(body).hexdigest()
-                archive.writestr(member_name, body)
-                movie_objects.append(
-                    MovieObject(
-                        movie_id=candidate.movie_id,
-                        member_name=member_name,
-                        urn=candidate.urn,
-                        bucket=candidate.bucket,
-                        key=candidate.key,
-                        size=len(body),
-                        sha256=digest,
-                    )
-                )
+            spool_dir = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix=f".{output.name}.", dir=output.parent)
+            )
+            movie_objects = write_movie_objects(
+                archive,
+                preflight.movie_objects,
+                existing_archive,
+                threads=args.threads,
+                spool_dir=Path(spool_dir),
+            )
 
             manifest = make_manifest(
                 args=args,
@@ -913,6 +1017,251 @@ def command_backup(args) -> int:
     return 0
 
 
+def movie_object_path(sha256: str) -> str:
+    return f"{STORE_OBJECTS_DIR}/{sha256[:2]}/{sha256}"
+
+
+def store_movie_objects(
+        store: Path,
+        candidates: list[MovieObjectCandidate],
+        *,
+        threads: int) -> list[MovieObject]:
+    """Make sure the store holds every candidate's movie object, downloading on ``threads``
+    threads the ones it lacks. Objects are named by SHA-256, so each body is stored once."""
+    spool_dir = store / STORE_SPOOL_DIR
+    spool_dir.mkdir(exist_ok=True)
+
+    def store_one(candidate: MovieObjectCandidate) -> MovieObject:
+        existing = candidate.existing_movie_object
+        if existing is not None and (store / existing.member_name).exists():
+            backup_status(f"backup: reusing stored movie object {candidate.movie_id}")
+            size, digest = existing.size, existing.sha256
+        else:
+            spooled = spool_movie_object(candidate, spool_dir)
+            size, digest = spooled.size, spooled.sha256
+            object_path = store / movie_object_path(digest)
+            if object_path.exists():
+                spooled.path.unlink()
+            else:
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(spooled.path, object_path)
+        return MovieObject(
+            movie_id=candidate.movie_id,
+            member_name=movie_object_path(digest),
+            urn=candidate.urn,
+            bucket=candidate.bucket,
+            key=candidate.key,
+            size=size,
+            sha256=digest,
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(store_one, candidates))
+
+
+def row_key(table_name: str, row: dict[str, Any]) -> tuple:
+    return tuple(row[key] for key in ROW_SORT_KEYS[table_name])
+
+
+def table_diff(
+        table_name: str,
+        base_rows: list[dict[str, Any]],
+        rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Return the rows that are new or changed since base_rows, and the keys of removed rows."""
+    base_by_key = {row_key(table_name, row): row for row in base_rows}
+    keys = {row_key(table_name, row) for row in rows}
+    changed = [row for row in rows if base_by_key.get(row_key(table_name, row)) != row]
+    deleted = [
+        {key: row[key] for key in ROW_SORT_KEYS[table_name]}
+        for key_value, row in base_by_key.items()
+        if key_value not in keys
+    ]
+    return changed, deleted
+
+
+def write_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json_dumps(encode_item(row)) + "\n" for row in rows), encoding="utf-8")
+
+
+def read_jsonl(path: Path) -> list[dict[str, Any]]:
+    return [
+        decode_item(json.loads(line))
+        for line in path.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+
+
+def store_run_ids(store: Path) -> list[str]:
+    runs_dir = store / STORE_RUNS_DIR
+    if not runs_dir.is_dir():
+        return []
+    return sorted(path.name for path in runs_dir.iterdir()
+                  if path.is_dir() and not path.name.startswith("."))
+
+
+def read_store_run(store: Path, run_id: str) -> StoreRun:
+    path = store / STORE_RUNS_DIR / run_id / MEMBER_MANIFEST
+    try:
+        return StoreRun.model_validate(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError) as exc:
+        raise DbBackupError(f"cannot read backup run {run_id} in {store}: {exc}") from exc
+
+
+def read_store(store: str | Path, *, at: str | None = None) -> ArchiveData:
+    """Rebuild the snapshot of an incremental backup store as of run ``at`` (default: the latest)."""
+    store = Path(store)
+    run_ids = store_run_ids(store)
+    if not run_ids:
+        raise DbBackupError(f"{store} contains no backup runs")
+    if at is None:
+        at = run_ids[-1]
+    if at not in run_ids:
+        raise DbBackupError(f"{store} has no backup run {at}; runs: {', '.join(run_ids)}")
+    chain = [read_store_run(store, at)]
+    while chain[-1].base_run_id is not None:
+        chain.append(read_store_run(store, chain[-1].base_run_id))
+
+    rows_by_key: dict[str, dict[tuple, dict[str, Any]]] = {
+        table_name: {} for table_name in TABLE_MEMBER_BY_NAME
+    }
+    for run in reversed(chain):
+        run_dir = store / STORE_RUNS_DIR / run.run_id
+        for table_name, member_name in TABLE_MEMBER_BY_NAME.items():
+            table_rows = rows_by_key[table_name]
+            for key in read_jsonl(run_dir / STORE_DELETED_DIR / Path(member_name).name):
+                table_rows.pop(row_key(table_name, key), None)
+            for row in read_jsonl(run_dir / member_name):
+                table_rows[row_key(table_name, row)] = row
+
+    manifest = chain[0].manifest
+    tables = {
+        table_name: sort_rows(table_name, list(rows.values()))
+        for table_name, rows in rows_by_key.items()
+    }
+    for table_name, count in manifest.table_counts.items():
+        if len(tables[table_name]) != count:
+            raise DbBackupError(
+                f"backup run {at} in {store} rebuilds {len(tables[table_name])} "
+                f"{table_name} rows, but recorded {count}"
+            )
+    return ArchiveData(manifest=manifest, tables=tables)
+
+
+def store_base_run(store: Path, table_prefix: str, selection: Selection,
+                   options: BackupOptions) -> StoreRun | None:
+    """Return the latest run to diff against, or None if the next run must be a full snapshot."""
+    run_ids = store_run_ids(store)
+    if not run_ids:
+        return None
+    run = read_store_run(store, run_ids[-1])
+    store_prefix = normalized_table_prefix(run.manifest.source_table_prefix)
+    requested_prefix = normalized_table_prefix(table_prefix)
+    if store_prefix != requested_prefix:
+        raise DbBackupError(
+            f"{store} contains backups for DynamoDB table prefix "
+            f"{store_prefix!r}, not {requested_prefix!r}; refusing to mix them"
+        )
+    if run.manifest.selection != selection or run.manifest.options != options:
+        backup_status(f"backup: selection or options differ from run {run.run_id}; storing a full snapshot")
+        return None
+    return run
+
+
+def new_store_run_id(store: Path) -> str:
+    run_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    existing = set(store_run_ids(store))
+    suffix = 1
+    candidate = run_id
+    while candidate in existing:
+        suffix += 1
+        candidate = f"{run_id}-{suffix:03d}"
+    return candidate
+
+
+def command_backup_store(args) -> int:
+    """Add a run to an incremental backup store.
+
+    Movie objects are stored once under their SHA-256. Each run stores only the rows
+    that changed since the previous run, plus the keys of removed rows.
+    """
+    configure_table_prefix(args.table_prefix)
+    selection = selection_from_args(args, default_all=True)
+    options = BackupOptions(include_deleted=args.include_deleted)
+    store = Path(args.store)
+    store.mkdir(parents=True, exist_ok=True)
+    base_run = store_base_run(store, args.table_prefix, selection, options)
+    base = None if base_run is None else read_store(store, at=base_run.run_id)
+    existing_backup = None if base_run is None else ExistingBackup(path=store, manifest=base_run.manifest)
+
+    ddbo = odb.DDBO()
+    backup_status(f"backup: examining DynamoDB tables for {selection.label}")
+    dataset = build_backup_dataset(ddbo, selection, include_deleted=args.include_deleted, base=base)
+    backup_status(f"backup: preflight checking {len(dataset.movies)} movie objects")
+    preflight = preflight_movie_objects(dataset.movies, existing_backup)
+    warnings = [
+        "Backup may not be transactionally consistent if the application is active."
+    ] + preflight.warnings
+    for warning in preflight.warnings:
+        backup_status(f"WARNING: {warning}")
+    dataset = backup_dataset_without_movies(dataset, preflight.skipped_movie_ids)
+    movie_objects = store_movie_objects(store, preflight.movie_objects, threads=args.threads)
+
+    run_id = new_store_run_id(store)
+    temp_run_dir = store / STORE_RUNS_DIR / f".{run_id}.tmp"
+    changed_rows: dict[str, int] = {}
+    deleted_rows: dict[str, int] = {}
+    try:
+        for table_name, rows in dataset.table_rows().items():
+            base_rows = [] if base is None else base.tables[table_name]
+            changed, deleted = table_diff(table_name, base_rows, rows)
+            member_name = TABLE_MEMBER_BY_NAME[table_name]
+            write_jsonl(temp_run_dir / member_name, changed)
+            write_jsonl(temp_run_dir / STORE_DELETED_DIR / Path(member_name).name, deleted)
+            changed_rows[table_name] = len(changed)
+            deleted_rows[table_name] = len(deleted)
+        run = StoreRun(
+            run_id=run_id,
+            base_run_id=None if base_run is None else base_run.run_id,
+            changed_rows=changed_rows,
+            deleted_rows=deleted_rows,
+            manifest=make_manifest(
+                args=args,
+                selection=selection,
+                options=options,
+                dataset=dataset,
+                movie_objects=movie_objects,
+                warnings=warnings,
+            ),
+        )
+        (temp_run_dir / MEMBER_MANIFEST).write_text(
+            json.dumps(run.model_dump(by_alias=True), indent=2, sort_keys=True) + "\n",
+            encoding="utf-8",
+        )
+        temp_run_dir.replace(store / STORE_RUNS_DIR / run_id)
+    except Exception:
+        shutil.rmtree(temp_run_dir, ignore_errors=True)
+        raise
+    (store / MEMBER_README).write_text(backup_readme(), encoding="utf-8")
+
+    base_text = "full snapshot" if base_run is None else f"changes since {base_run.run_id}"
+    print(
+        f"wrote {store} run {run_id} ({base_text}): "
+        f"{sum(changed_rows.values())} changed rows, {sum(deleted_rows.values())} removed rows, "
+        f"{len(dataset.movies)} movies, {len(movie_objects)} movie objects"
+    )
+    return 0
+
+
+def read_backup(path: str | Path, *, at: str | None = None) -> ArchiveData:
+    """Read a .ptb archive, or the snapshot of an incremental backup store directory as of run ``at``."""
+    if Path(path).is_dir():
+        return read_store(path, at=at)
+    if at is not None:
+        raise DbBackupError("--at applies only to incremental backup store directories")
+    return read_archive(path)
+
+
 def read_archive(path: str | Path) -> ArchiveData:
     tables: dict[str, list[dict[str, Any]]] = {}
     with zipfile.ZipFile(path) as archive:
@@ -1172,7 +1521,7 @@ def print_archive_verbose(data: ArchiveData, *, stream) -> None:
 
 
 def command_inspect(args) -> int:
-    data = read_archive(args.archive)
+    data = read_backup(args.archive, at=args.at)
     if args.verbose:
         print_archive_verbose(data, stream=sys.stdout)
     else:
@@ -1266,20 +1615,34 @@ def write_rows(table, rows: list[dict[str, Any]]) -> None:
             batch.put_item(Item=row)
 
 
-def restore_one_movie_object(
-        archive_path: str | Path,
-        movie_object: MovieObject,
-        bucket_plan: RestoreBucketPlan) -> None:
-    with zipfile.ZipFile(archive_path) as archive:
-        body = archive.read(movie_object.member_name)
-    digest = hashlib.sha256(body).hexdigest()
+def check_movie_object_digest(movie_object: MovieObject, digest: str) -> None:
     if digest != movie_object.sha256:
         raise DbBackupError(
             f"checksum mismatch for {movie_object.member_name}: "
             f"{digest} != {movie_object.sha256}"
         )
-    bucket = restore_bucket_for_movie_object(movie_object, bucket_plan)
-    s3_client().put_object(Bucket=bucket, Key=movie_object.key, Body=body)
+
+
+def restore_one_movie_object(
+        archive_path: str | Path,
+        movie_object: MovieObject,
+        bucket_plan: RestoreBucketPlan) -> None:
+    if Path(archive_path).is_dir():
+        # Store objects can be large and restore uploads several at once, so hash the file
+        # in chunks and upload from the open handle rather than holding it in memory.
+        with open(Path(archive_path) / movie_object.member_name, "rb") as f:
+            with open(os.devnull, "wb") as sink:
+                _, digest = copy_stream(f, sink)
+            check_movie_object_digest(movie_object, digest)
+            f.seek(0)
+            bucket = restore_bucket_for_movie_object(movie_object, bucket_plan)
+            s3_client().put_object(Bucket=bucket, Key=movie_object.key, Body=f)
+    else:
+        with zipfile.ZipFile(archive_path) as archive:
+            body = archive.read(movie_object.member_name)
+        check_movie_object_digest(movie_object, hashlib.sha256(body).hexdigest())
+        bucket = restore_bucket_for_movie_object(movie_object, bucket_plan)
+        s3_client().put_object(Bucket=bucket, Key=movie_object.key, Body=body)
     print(
         f"restore: uploaded movie object {movie_object.movie_id} "
         f"to s3://{bucket}/{movie_object.key}",
@@ -1370,6 +1733,8 @@ def restore_rows(
         data.manifest.movies,
         bucket_plan,
     )
+    # Backups made before movie_tracked_frames_idx existed lack its key on tracked frames.
+    tables[FRAMES] = [odb.tracked_frame_item(row) for row in tables[FRAMES]]
 
     for table_name in TABLES_IN_RESTORE_ORDER:
         table = table_for_name(ddbo, table_name)
@@ -1378,6 +1743,11 @@ def restore_rows(
         else:
             write_rows(table, tables[table_name])
 
+    # Movie and frame rows are not read at the same instant, so recompute last_frame_tracked.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda movie: odb.check_last_frame_tracked(movie_id=movie[MOVIE_ID], repair=True),
+                          tables[MOVIES]))
+
     unique_email_rows = [{EMAIL: user[EMAIL]} for user in tables[USERS]]
     write_rows(ddbo.unique_emails, unique_email_rows)
 
@@ -1482,7 +1852,7 @@ def create_restore_target_tables(target_state: RestoreTargetState) -> None:
 
 def command_restore(args) -> int:
     configure_table_prefix(args.table_prefix)
-    data = selected_archive_data(read_archive(args.archive), selection_from_args(args))
+    data = selected_archive_data(read_backup(args.archive, at=args.at), selection_from_args(args))
     bucket_plan = restore_bucket_plan(data.manifest.movies)
     target_state = restore_target_state(odb.DDBO.resource(), args.table_prefix)
     ensure_restore_target_ready(target_state)
@@ -1539,7 +1909,7 @@ def command_restore(args) -> int:
 
 def command_send_restore_links(args) -> int:
     configure_table_prefix(args.table_prefix)
-    data = selected_archive_data(read_archive(args.archive), selection_from_args(args))
+    data = selected_archive_data(read_backup(args.archive, at=args.at), selection_from_args(args))
     ddbo = odb.DDBO()
     emails = sorted({user[EMAIL] for user in data.tables[USERS]})
     if not args.send:
@@ -1731,6 +2101,14 @@ def add_table_prefix(parser: argparse.ArgumentParser) -> None:
     )
 
 
+def add_store_run(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--at",
+        metavar="RUN_ID",
+        help="backup store run to read (default: the latest)",
+    )
+
+
 def add_selection(
         parser: argparse.ArgumentParser,
         *,
@@ -1781,17 +2159,29 @@ def build_parser() -> argparse.ArgumentParser:
 
     backup = subparsers.add_parser("backup", help="Create a .ptb backup archive")
     add_table_prefix(backup)
-    backup.add_argument("--output", required=True, help="Output .ptb file")
+    destination = backup.add_mutually_exclusive_group(required=True)
+    destination.add_argument("--output", help="Output .ptb file")
+    destination.add_argument(
+        "--store",
+        help="incremental backup store directory; adds a run holding only what changed",
+    )
     add_selection(backup, required=False)
     backup.add_argument(
         "--include-deleted",
         action="store_true",
         help="include deleted movies",
     )
+    backup.add_argument(
+        "--threads",
+        type=positive_int,
+        default=DEFAULT_BACKUP_THREADS,
+        help="parallel worker threads for S3 movie downloads",
+    )
 
     restore = subparsers.add_parser("restore", help="Restore a .ptb backup archive")
     add_table_prefix(restore)
-    restore.add_argument("archive", help=".ptb archive")
+    restore.add_argument("archive", help=".ptb archive or incremental backup store directory")
+    add_store_run(restore)
     add_selection(restore)
     restore.add_argument("--commit", action="store_true", help="write data")
     restore.add_argument(
@@ -1807,7 +2197,8 @@ def build_parser() -> argparse.ArgumentParser:
     )
 
     inspect = subparsers.add_parser("inspect", help="Inspect a .ptb backup archive")
-    inspect.add_argument("archive", help=".ptb archive")
+    inspect.add_argument("archive", help=".ptb archive or incremental backup store directory")
+    add_store_run(inspect)
     inspect.add_argument(
         "--verbose",
         action="store_true",
@@ -1824,7 +2215,8 @@ def build_parser() -> argparse.ArgumentParser:
         help="Send fresh login links to restored users",
     )
     add_table_prefix(send_links)
-    send_links.add_argument("archive", help=".ptb archive")
+    send_links.add_argument("archive", help=".ptb archive or incremental backup store directory")
+    add_store_run(send_links)
     add_selection(send_links, allow_movie=False)
     send_links.add_argument("--send", action="store_true", help="send email")
     send_links.add_argument(
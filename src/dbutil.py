@@ -24,7 +24,7 @@ from app.paths import TEST_DATA_DIR
 from app.odb import (
     ADMIN_FOR_COURSES, COURSE_ID, COURSE_KEY, COURSE_NAME, COURSES, EMAIL,
     ENABLED, DEFAULT_COURSE_ID, USER_ID, USER_NAME, DDBO, InvalidCourse_Id,
-    MOVIE_STATUS, MOVIE_STATE_READY, TITLE,
+    MOVIE_ID, MOVIE_STATUS, MOVIE_STATE_READY, TITLE,
 )
 from app.odb_movie_data import set_movie_data
 from app.constants import C, configure_local_environment, env_value
@@ -81,6 +81,22 @@ class DefaultCourseMigrationResult(BaseModel):
     committed: bool
 
 
+class LoginTimesBackfillResult(BaseModel):
+    """Summary returned by the login-times backfill."""
+
+    examined: int
+    changed: int
+    committed: bool
+
+
+class LastFrameTrackedCheckResult(BaseModel):
+    """Summary returned by the last_frame_tracked consistency check."""
+
+    examined: int
+    changed: int
+    committed: bool
+
+
 class SuperRoleChange(BaseModel):
     """Result of a super-role update."""
 
@@ -398,6 +414,47 @@ def migrate_default_course_fields(*, commit=False, ddbo=None):
     )
 
 
+def backfill_login_times(*, commit=False, ddbo=None):
+    """Set users' first_login_at/last_login_at from their api_keys where they are missing."""
+    ddbo = ddbo or DDBO()
+    examined = 0
+    changed = 0
+    for user in scan_all(ddbo.users, consistent_read=True):
+        examined += 1
+        if odb.FIRST_LOGIN_AT in user and odb.LAST_LOGIN_AT in user:
+            continue
+        first, last = ddbo.get_user_login_times(user[USER_ID])
+        if first is None or last is None:
+            continue
+        first = user.get(odb.FIRST_LOGIN_AT, first)
+        last = max(user.get(odb.LAST_LOGIN_AT, last), last)
+        changed += 1
+        action = "set" if commit else "would set"
+        print(f"{action} {user[USER_ID]}: first_login_at={first} last_login_at={last}")
+        if commit:
+            ddbo.update_table(ddbo.users, user[USER_ID], {odb.FIRST_LOGIN_AT: first, odb.LAST_LOGIN_AT: last})
+    return LoginTimesBackfillResult(examined=examined, changed=changed, committed=commit)
+
+
+def check_last_frame_tracked(*, commit=False, ddbo=None, movie_id=None):
+    """Report movies whose last_frame_tracked or tracked-frame index keys disagree with their trackpoints."""
+    ddbo = ddbo or DDBO()
+    movie_ids = [movie_id] if movie_id else [movie[MOVIE_ID] for movie in scan_all(ddbo.movies)]
+    changed = 0
+    for checked_movie_id in movie_ids:
+        result = odb.check_last_frame_tracked(movie_id=checked_movie_id, repair=commit)
+        if result['stored'] == result['actual'] and not result['mistagged_frames']:
+            continue
+        changed += 1
+        if result['tracing'] and result['stored'] != result['actual']:
+            action = "tracing, left"
+        else:
+            action = "repaired" if commit else "would repair"
+        print(f"{action} {checked_movie_id}: last_frame_tracked={result['stored']} "
+              f"actual={result['actual']} mistagged_frames={result['mistagged_frames']}")
+    return LastFrameTrackedCheckResult(examined=len(movie_ids), changed=changed, committed=commit)
+
+
 def superadmin_list(args):
     """Print users with a cross-course super role."""
     role = args.role
@@ -790,6 +847,12 @@ def drop_db():
     odbmaint.drop_tables()
 
 
+def create_indexes():
+    started = odbmaint.create_missing_indexes(status=lambda message: print(message, flush=True))
+    if not started:
+        print("All indexes exist.")
+
+
 def create_demo_course():
     result = populate_demo_user()
     verb = "created" if result.created else "already exists"
@@ -1008,6 +1071,19 @@ def build_parser():
         help="Rename legacy primary-course user fields; dry-run unless --commit is supplied",
     )
     migration_parser.add_argument("--commit", action="store_true")
+    login_times_parser = subparsers.add_parser(
+        "backfill-login-times",
+        aliases=["backfill_login_times"],
+        help="Copy users' first/last login times from their api_keys; dry-run unless --commit is supplied",
+    )
+    login_times_parser.add_argument("--commit", action="store_true")
+    last_frame_tracked_parser = subparsers.add_parser(
+        "check-last-frame-tracked",
+        aliases=["check_last_frame_tracked"],
+        help="Check movies' last_frame_tracked against their trackpoints; repair only if --commit is supplied",
+    )
+    last_frame_tracked_parser.add_argument("--movie_id", help="check only this movie")
+    last_frame_tracked_parser.add_argument("--commit", action="store_true")
     subparsers.add_parser(
         "list-prefixes",
         aliases=["list_prefixes"],
@@ -1096,6 +1172,11 @@ def build_parser():
         help="Create tables from etc/dynamodb_tables.json",
     )
     subparsers.add_parser("dropdb", help="Drop all configured DynamoDB tables")
+    subparsers.add_parser(
+        "create-indexes",
+        aliases=["create_indexes"],
+        help="Add configured global secondary indexes that existing tables are missing",
+    )
     subparsers.add_parser(
         "create-demo-course",
         aliases=["create_demo_course"],
@@ -1184,6 +1265,19 @@ def build_parser():
     )
     dump_movie_parser.add_argument("movie_id", help="movie id")
 
+    trackpoint_storage_parser = subparsers.add_parser(
+        "set-trackpoint-storage",
+        aliases=["set_trackpoint_storage"],
+        help="Move a movie's trackpoints to per-frame rows or to columnar chunks",
+    )
+    trackpoint_storage_parser.add_argument("movie_id", help="movie id")
+    trackpoint_storage_parser.add_argument(
+        "--storage",
+        choices=[odb.TRACKPOINT_STORAGE_FRAMES, odb.TRACKPOINT_STORAGE_COLUMNAR],
+        required=True,
+        help="trackpoint storage layout",
+    )
+
     purge_movies_parser = subparsers.add_parser(
         "purge-all-movies",
         aliases=["purge_all_movies"],
@@ -1229,6 +1323,20 @@ def main():  # pragma: no cover
             f"committed={result.committed}"
         )
         return 0
+    if args.command in ("backfill-login-times", "backfill_login_times"):
+        result = backfill_login_times(commit=args.commit)
+        print(
+            f"examined={result.examined} changed={result.changed} "
+            f"committed={result.committed}"
+        )
+        return 0
+    if args.command in ("check-last-frame-tracked", "check_last_frame_tracked"):
+        result = check_last_frame_tracked(commit=args.commit, movie_id=args.movie_id)
+        print(
+            f"examined={result.examined} changed={result.changed} "
+            f"committed={result.committed}"
+        )
+        return 0
     if args.command in ("admin-list", "admin_list"):
         admin_list()
         return 0
@@ -1269,6 +1377,9 @@ def main():  # pragma: no cover
     if args.command == "createdb":
         create_db()
         return 0
+    if args.command in ("create-indexes", "create_indexes"):
+        create_indexes()
+        return 0
     if args.command == "dropdb":
         drop_db()
         return 0
@@ -1298,6 +1409,10 @@ def main():  # pragma: no cover
     if args.command in ("dump-movie", "dump_movie"):
         dump_movie(args.movie_id)
         return 0
+    if args.command in ("set-trackpoint-storage", "set_trackpoint_storage"):
+        frames = odb.set_movie_trackpoint_storage(movie_id=args.movie_id, storage=args.storage)
+        print(f"{args.movie_id}: moved {frames} frames to {args.storage} trackpoint storage")
+        return 0
     if args.command in ("purge-all-movies", "purge_all_movies"):
         purge_all_movies(args, parser)
         return 0
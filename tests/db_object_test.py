@@ -30,6 +30,9 @@ def test_runtime_s3_object_keys_are_deterministic():
     assert s3_presigned.analysis_zip_object_key(
         source_movie_object_key=movie_key,
     ) == "movies/prod/c1/m2_zipfile.mov"
+    assert s3_presigned.frame_index_object_key(
+        source_movie_object_key=movie_key,
+    ) == "movies/prod/c1/m2_index.json"
     assert s3_presigned.frame_object_key(
         deployment_id="prod",
         course_id="c1",
@@ -160,6 +163,13 @@ def test_derived_movie_urns_preserve_legacy_bucket_path_and_extension():
     assert s3_presigned.analysis_zip_urn(
         movie_data_urn=legacy_urn,
     ) == "s3://legacy-bucket/archive/c1/m2_zipfile.mp4"
+    assert s3_presigned.frame_index_urn(
+        movie_data_urn=legacy_urn,
+    ) == "s3://legacy-bucket/archive/c1/m2_index.json"
+    assert s3_presigned.frame_cache_urn(
+        movie_data_urn=legacy_urn,
+        digest="abc",
+    ) == "s3://legacy-bucket/archive/c1/m2_frame_cache/abc.jpg"
 
 def test_make_urn(local_s3):
     name = s3_presigned.movie_object_key(
@@ -197,6 +207,27 @@ def test_write_read_delete_object(local_s3):
     assert odb_movie_data.read_object(urn=urn) is None
 
 
+def test_s3_range_reader_fetches_only_the_ranges_read(local_s3):
+    data = bytes(range(256)) * 1024
+    urn = s3_presigned.make_urn(object_name=f"range-test/{uuid.uuid4()}.bin")
+    odb_movie_data.write_object(urn=urn, object_data=data)
+    try:
+        reader = odb_movie_data.S3RangeReader(urn, block_size=1024)
+        assert reader.size == len(data)
+        assert reader.read(16) == data[:16]
+        assert reader.read(16) == data[16:32]
+        assert reader.requests == 1
+        reader.seek(-10, 2)
+        assert reader.read() == data[-10:]
+        assert reader.read(5) == b""
+        reader.seek(100_000)
+        assert reader.read(5000) == data[100_000:105_000]
+        assert reader.requests == 3
+        assert reader.bytes_fetched == 1024 + 10 + 5000
+    finally:
+        odb_movie_data.delete_object(urn=urn)
+
+
 def test_legacy_movie_urn_remains_readable(local_s3):
     legacy_urn = s3_presigned.make_urn(object_name="legacy/c1/m2.mp4")
     movie_data = b"legacy movie bytes"
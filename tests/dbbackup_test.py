@@ -1,5 +1,6 @@
 """Integration contract tests for the planned src/dbbackup.py CLI."""
 
+import hashlib
 import io
 import json
 import os
@@ -34,6 +35,7 @@ from app.odb import (
     LAST_FRAME_TRACKED,
     LOGS,
     MOVIE_DATA_URN,
+    MOVIE_FRAME_INDEX_URN,
     MOVIE_ID,
     MOVIE_STATE_READY,
     MOVIE_STATUS,
@@ -349,6 +351,7 @@ def create_movie(
             NEEDS_RETRACING: 0,
             MOVIE_ZIPFILE_URN: f"s3://{os.environ[C.PLANTTRACER_S3_BUCKET]}/{zip_key}",
             MOVIE_TRACED_URN: f"s3://{os.environ[C.PLANTTRACER_S3_BUCKET]}/{traced_key}",
+            MOVIE_FRAME_INDEX_URN: f"s3://{os.environ[C.PLANTTRACER_S3_BUCKET]}/{course_id}/{movie_id}_index.json",
         },
     )
     ddbo.put_movie_frame(
@@ -473,6 +476,8 @@ def assert_readme_warns_about_student_data(ptb: PtbContents) -> None:
 def assert_no_excluded_artifacts(ptb: PtbContents) -> None:
     forbidden_fragments = ("zipfile", "_traced", "-orig", ".zip")
     assert all(not any(fragment in name for fragment in forbidden_fragments) for name in ptb.names)
+    derived_urns = (MOVIE_ZIPFILE_URN, MOVIE_TRACED_URN, MOVIE_FRAME_INDEX_URN)
+    assert all(row.get(field) is None for row in ptb.tables[MOVIES] for field in derived_urns)
 
 
 def assert_uses_dynamodb_attribute_json(ptb: PtbContents) -> None:
@@ -567,6 +572,52 @@ def test_backup_warns_and_skips_missing_movie_object(
     assert any(backup_scenario.active_movie_id in warning for warning in ptb.manifest["warnings"])
 
 
+def test_backup_downloads_movie_objects_concurrently_and_records_checksums(
+    tmp_path,
+    backup_scenario: BackupScenario,
+):
+    archive_path = tmp_path / "threads.ptb"
+
+    result = run_dbbackup(
+        "backup",
+        "--table-prefix",
+        backup_scenario.source_prefix,
+        "--output",
+        str(archive_path),
+        "--course-id",
+        backup_scenario.movie_course_id,
+        "--include-deleted",
+        "--threads",
+        "2",
+    )
+
+    assert result.stderr.count("backup: downloading movie object") == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["threads.ptb"]
+    manifest_movies = read_ptb(archive_path).manifest["movies"]
+    expected_bytes = {
+        backup_scenario.active_movie_id: backup_scenario.active_movie_bytes,
+        backup_scenario.deleted_movie_id: backup_scenario.deleted_movie_bytes,
+    }
+    assert {movie["movie_id"] for movie in manifest_movies} == set(expected_bytes)
+    with zipfile.ZipFile(archive_path) as archive:
+        for movie in manifest_movies:
+            body = archive.read(movie["member_name"])
+            assert body == expected_bytes[movie["movie_id"]]
+            assert movie["size"] == len(body)
+            assert movie["sha256"] == hashlib.sha256(body).hexdigest()
+
+
+def test_copy_stream_hashes_in_chunks(monkeypatch):
+    monkeypatch.setattr(dbbackup, "STREAM_CHUNK_BYTES", 3)
+    destination = io.BytesIO()
+
+    assert dbbackup.copy_stream(io.BytesIO(b"plant tracer"), destination) == (
+        12,
+        hashlib.sha256(b"plant tracer").hexdigest(),
+    )
+    assert destination.getvalue() == b"plant tracer"
+
+
 def test_backup_overwrite_requires_same_prefix_and_reuses_movie_objects(
     tmp_path,
     backup_scenario: BackupScenario,
@@ -623,6 +674,65 @@ def test_backup_overwrite_requires_same_prefix_and_reuses_movie_objects(
         )
 
 
+def test_incremental_store_keeps_changes_and_rebuilds_each_run(
+    tmp_path,
+    prefix_tools,
+    backup_scenario: BackupScenario,
+):
+    store = tmp_path / "store"
+    backup_args = (
+        "backup",
+        "--table-prefix",
+        backup_scenario.source_prefix,
+        "--store",
+        str(store),
+        "--course-id",
+        backup_scenario.movie_course_id,
+    )
+
+    full = run_dbbackup(*backup_args)
+    assert "full snapshot" in full.stdout
+    unchanged = run_dbbackup(*backup_args)
+    assert "0 changed rows, 0 removed rows" in unchanged.stdout
+    assert "reusing stored movie object" in unchanged.stderr
+    objects = [path for path in (store / "objects").rglob("*") if path.is_file()]
+    assert [path.read_bytes() for path in objects] == [backup_scenario.active_movie_bytes]
+
+    ddbo = prefix_tools["set_prefix"](backup_scenario.source_prefix)
+    movie_id = backup_scenario.active_movie_id
+    ddbo.movie_frames.delete_item(Key={MOVIE_ID: movie_id, FRAME_NUMBER: 0})
+    ddbo.put_movie_frame({MOVIE_ID: movie_id, FRAME_NUMBER: 2,
+                          "trackpoints": [{"x": Decimal("12.0"), "y": Decimal("22.0"), "label": "Apex"}]})
+    ddbo.update_movie(movie_id, {"title": "Renamed backup movie"})
+    changed = run_dbbackup(*backup_args)
+    assert "2 changed rows, 1 removed rows" in changed.stdout
+
+    first_run, _, last_run = dbbackup.store_run_ids(store)
+    assert dbbackup.read_store_run(store, last_run).changed_rows[FRAMES] == 1
+    frames_at = {
+        run_id: sorted(int(row[FRAME_NUMBER]) for row in dbbackup.read_store(store, at=run_id).tables[FRAMES]
+                       if row[MOVIE_ID] == movie_id)
+        for run_id in (first_run, last_run)
+    }
+    assert frames_at == {first_run: [0, 1], last_run: [1, 2]}
+    titles = {row[MOVIE_ID]: row["title"] for row in dbbackup.read_store(store).tables[MOVIES]}
+    assert titles[movie_id] == "Renamed backup movie"
+
+    inspected = run_dbbackup("inspect", str(store), "--at", first_run)
+    assert "movie objects: 1" in inspected.stdout
+
+    [movie_object] = dbbackup.read_store(store).manifest.movies
+    restored = movie_object.model_copy(update={"key": f"restored-{uuid.uuid4().hex}.mov"})
+    bucket_plan = dbbackup.restore_bucket_plan([restored])
+    dbbackup.restore_one_movie_object(store, restored, bucket_plan)
+    assert s3_object_bytes(backup_scenario.bucket, restored.key) == backup_scenario.active_movie_bytes
+    delete_s3_objects(backup_scenario.bucket, restored.key)
+    (store / restored.member_name).write_bytes(b"corrupted")
+    with pytest.raises(dbbackup.DbBackupError, match="checksum mismatch"):
+        dbbackup.restore_one_movie_object(store, restored, bucket_plan)
+    assert not s3_object_exists(backup_scenario.bucket, restored.key)
+
+
 def test_list_prefixes_reports_complete_prefix_counts(prefix_tools):
     list_prefix = unique_name("list-prefix")
     partial_prefix = unique_name("partial-prefix")
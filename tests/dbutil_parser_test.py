@@ -82,6 +82,28 @@ def test_default_course_migration_requires_explicit_commit():
     assert commit.commit is True
 
 
+def test_check_last_frame_tracked_is_dry_run_unless_commit():
+    dry_run = parse_args("check-last-frame-tracked", "--movie_id", "m1")
+    commit = parse_args("check-last-frame-tracked", "--commit")
+
+    assert (dry_run.movie_id, dry_run.commit) == ("m1", False)
+    assert (commit.movie_id, commit.commit) == (None, True)
+
+
+def test_backfill_login_times_copies_api_key_times(new_course, capsys):
+    ddbo = new_course['ddbo']
+    user_id = new_course[odb.USER_ID]
+    ddbo.update_table(ddbo.api_keys, new_course[odb.API_KEY], {'first_used_at': 100, 'last_used_at': 200})
+    ddbo.update_table(ddbo.users, user_id, {odb.FIRST_LOGIN_AT: None, odb.LAST_LOGIN_AT: None})
+
+    assert dbutil.backfill_login_times(commit=False, ddbo=ddbo).changed >= 1
+    assert odb.FIRST_LOGIN_AT not in ddbo.get_user(user_id)
+    assert dbutil.backfill_login_times(commit=True, ddbo=ddbo).committed
+    user = ddbo.get_user(user_id)
+    assert (user[odb.FIRST_LOGIN_AT], user[odb.LAST_LOGIN_AT]) == (100, 200)
+    assert f"set {user_id}" in capsys.readouterr().out
+
+
 def test_create_course_missing_flags_usage_is_brief():
     usage = dbutil.create_course_usage_text(["course_id", "admin_email"])
 
@@ -21,6 +21,28 @@ def test_first_frame_to_track_rejects_negative_source_frame():
         movie_glue.first_frame_to_track(source_frame_number=-1)
 
 
+def test_traced_movie_is_patchable_requires_matching_unedited_prefix():
+    movie = {
+        movie_glue.MOVIE_TRACED_URN: "s3://bucket/movie_traced.mov",
+        movie_glue.MOVIE_ZIPFILE_URN: "s3://bucket/movie_zipfile.mov",
+        movie_glue.TRACED_MOVIE_GOP: tracer.TRACED_MOVIE_GOP,
+        movie_glue.TRACED_MOVIE_FRAME_START: 0,
+        movie_glue.TRACED_MOVIE_FRAME_END: 99,
+        movie_glue.TRACED_MOVIE_STALE_FROM: 40,
+    }
+
+    def patchable(**updates):
+        return movie_glue.traced_movie_is_patchable({**movie, **updates}, source_frame_number=40,
+                                                    movie_traced_frame_start=0)
+
+    assert patchable()
+    assert not patchable(**{movie_glue.TRACED_MOVIE_STALE_FROM: 39})
+    assert not patchable(**{movie_glue.TRACED_MOVIE_GOP: None})
+    assert not patchable(**{movie_glue.TRACED_MOVIE_FRAME_START: 5})
+    assert not patchable(**{movie_glue.TRACED_MOVIE_FRAME_END: 30})
+    assert not patchable(**{movie_glue.MOVIE_ZIPFILE_URN: None})
+
+
 def test_movie_rotation_defaults_invalid_metadata_to_zero():
     assert movie_glue.movie_rotation({movie_glue.MOVIE_ROTATION: "90"}) == 90
     assert movie_glue.movie_rotation({movie_glue.MOVIE_ROTATION: "unexpected"}) == 0
@@ -37,13 +59,16 @@ def test_analysis_frame_height_from_movie_uses_tracer_processed_frame():
 
 def test_trace_movie_v2_respects_frame_end(monkeypatch):
     frames = [np.zeros((8, 8, 3), dtype=np.uint8) for _frame_number in range(4)]
-    monkeypatch.setattr(tracer, "get_frames_from_url", lambda _movie_url, _rotation: frames)
+    monkeypatch.setattr(tracer, "get_frames_from_url", lambda _movie_url, _rotation, frame_start=0, frame_index=None: frames[frame_start:])
+
+    traced_frame_numbers = iter(range(1, 4))
 
-    def fake_trace_frame(*, gray_frame_prev, gray_frame, trackpoints, frame_number):
-        del gray_frame_prev, gray_frame, trackpoints
-        return [Trackpoint(x=frame_number, y=frame_number + 1, label="apex", frame_number=frame_number)]
+    def fake_optical_flow(_gray_frame_prev, _gray_frame, _input_points, _unused, **_kwargs):
+        frame_number = next(traced_frame_numbers)
+        return (np.array([[frame_number, frame_number + 1]], dtype=np.float32),
+                np.array([[1]], dtype=np.uint8), None)
 
-    monkeypatch.setattr(tracer, "cv2_trace_frame", fake_trace_frame)
+    monkeypatch.setattr(tracer.cv2, "calcOpticalFlowPyrLK", fake_optical_flow)
     callbacks = []
 
     trackpoints = tracer.trace_movie_v2(
@@ -66,11 +91,10 @@ def test_trace_movie_v2_clips_traced_mp4_to_output_range(monkeypatch):
         frame = np.zeros((12, 12, 3), dtype=np.uint8)
         frame[0, 0] = [frame_number, 0, 0]
         frames.append(frame)
-    monkeypatch.setattr(tracer, "get_frames_from_url", lambda _movie_url, _rotation: frames)
+    monkeypatch.setattr(tracer, "get_frames_from_url", lambda _movie_url, _rotation, frame_start=0, frame_index=None: frames[frame_start:])
 
-    def fake_trace_frame(*, gray_frame_prev, gray_frame, trackpoints, frame_number):
-        del gray_frame_prev, gray_frame, trackpoints
-        return [Trackpoint(x=6, y=6, label="apex", frame_number=frame_number)]
+    def fake_optical_flow(_gray_frame_prev, _gray_frame, input_points, _unused, **_kwargs):
+        return input_points.copy(), np.ones((len(input_points), 1), dtype=np.uint8), None
 
     appended_frames = []
 
@@ -81,7 +105,7 @@ def test_trace_movie_v2_clips_traced_mp4_to_output_range(monkeypatch):
         def close(self):
             pass
 
-    monkeypatch.setattr(tracer, "cv2_trace_frame", fake_trace_frame)
+    monkeypatch.setattr(tracer.cv2, "calcOpticalFlowPyrLK", fake_optical_flow)
     monkeypatch.setattr(tracer.imageio, "get_writer", lambda *_args, **_kwargs: FakeWriter())
 
     tracer.trace_movie_v2(
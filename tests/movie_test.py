@@ -22,7 +22,7 @@ from app import odb_movie_data
 from app import apikey
 
 from app.odb import API_KEY,COURSE_ID,MOVIE_ID,USER_ID
-from app.constants import MIME
+from app.constants import MIME, C
 from app.schema import Trackpoint
 from app.s3_presigned import s3_client
 from app.constants import logger
@@ -720,6 +720,43 @@ def test_trim_metadata_defaults_and_trackpoint_download_filter(client, new_movie
     ]
 
 
+def test_get_movie_metadata_since_frame_returns_only_new_frames(client, new_movie):
+    api_key = new_movie[API_KEY]
+    movie_id = new_movie[MOVIE_ID]
+
+    def poll(since_frame):
+        resp = client.post('/api/get-movie-metadata', data={
+            'api_key': api_key, 'movie_id': movie_id, 'since_frame': since_frame})
+        assert resp.status_code == 200
+        res = resp.get_json()
+        return res['frames'], res['next_since_frame']
+
+    assert poll(-1) == ({}, -1)
+    for frame_number in range(3):
+        odb.put_frame_trackpoints(movie_id=movie_id, frame_number=frame_number,
+                                  trackpoints=[Trackpoint(x=10, y=20 + frame_number, label='apex')])
+    frames, next_since_frame = poll(-1)
+    assert sorted(frames) == ['0', '1', '2'] and next_since_frame == 2
+
+    # A frame written but not yet recorded in last_frame_tracked is left for the next poll.
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=3,
+                              trackpoints=[Trackpoint(x=10, y=23, label='apex')])
+    odb.set_movie_metadata(movie_id=movie_id, movie_metadata={odb.LAST_FRAME_TRACKED: 2})
+    assert poll(2) == ({}, 2)
+    odb.set_movie_metadata(movie_id=movie_id, movie_metadata={odb.LAST_FRAME_TRACKED: 3})
+    frames, next_since_frame = poll(2)
+    assert list(frames) == ['3'] and next_since_frame == 3
+    assert frames['3']['markers'][0]['y'] == 23
+
+    # A retrace from frame 1 moves the frontier back.
+    odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=1)
+    assert poll(3) == ({}, 1)
+
+    resp = client.post('/api/get-movie-metadata', data={
+        'api_key': api_key, 'movie_id': movie_id, 'since_frame': -2})
+    assert resp.status_code == 400
+
+
 def test_set_movie_trim_requires_exactly_one_bound(client, new_movie):
     api_key = new_movie[API_KEY]
     movie_id = new_movie[MOVIE_ID]
@@ -1008,3 +1045,150 @@ def test_movie_writes_reject_trace_and_foreign_analysis_leases(client, new_movie
         assert response.get_json()['message'] == (
             "This movie is currently being traced and is read-only."
         )
+
+
+def test_list_movies_view_list_returns_list_columns(client, new_movie):
+    resp = client.post('/api/list-movies', data={'api_key': new_movie[API_KEY], 'view': 'list'})
+    movies = resp.get_json()['movies']
+    movie = next(m for m in movies if m['movie_id'] == new_movie[MOVIE_ID])
+    assert movie['title'] == new_movie['movie_title']
+    assert set(movie) <= set(odb.MOVIE_LIST_FIELDS) | {odb.MOVIE_TRACED_URL, 'tracking_lock'}
+    assert odb.MOVIE_DATA_URN not in movie
+
+
+def test_list_movies_pages_with_restart_markers_fields_and_sort(client, new_movie):
+    user_id = new_movie[USER_ID]
+    course_id = new_movie[COURSE_ID]
+    movie_ids = [odb.create_new_movie(user_id=user_id, course_id=course_id, title=f"page {i}", description="")
+                 for i in range(2)]
+    try:
+        base = {'api_key': new_movie[API_KEY], 'course_id': course_id, 'fields': 'title'}
+        seen = []
+        restart_marker = None
+        while True:
+            data = dict(base, limit=2, **({'restart_marker': restart_marker} if restart_marker else {}))
+            resp = client.post('/api/list-movies', data=data).get_json()
+            assert resp['error'] is False and len(resp['movies']) <= 2
+            assert all(set(movie) <= {MOVIE_ID, 'title', *odb.MOVIE_LIST_REQUIRED_FIELDS, 'tracking_lock'}
+                       for movie in resp['movies'])
+            seen.extend(movie[MOVIE_ID] for movie in resp['movies'])
+            restart_marker = resp['restart_marker']
+            if restart_marker is None:
+                break
+        assert sorted(seen) == sorted({new_movie[MOVIE_ID], *movie_ids})
+
+        resp = client.post('/api/list-movies', data=dict(base, sort='last_activity_at')).get_json()
+        activity = [odb.get_movie(movie_id=movie[MOVIE_ID])[odb.LAST_ACTIVITY_AT] for movie in resp['movies']]
+        assert activity == sorted(activity, reverse=True) and len(activity) == 3
+
+        assert client.post('/api/list-movies', data=dict(base, fields='bogus')).status_code == 400
+        assert client.post('/api/list-movies', data=dict(base, sort='title')).status_code == 400
+        assert client.post('/api/list-movies', data=dict(base, restart_marker='junk')).status_code == 400
+    finally:
+        new_movie['ddbo'].batch_delete_movie_ids(movie_ids)
+
+
+def test_signed_urls_are_memoized_and_signed_lazily(client, new_movie, monkeypatch):
+    movie_id = new_movie[MOVIE_ID]
+    urn = odb.get_movie(movie_id=movie_id)[odb.MOVIE_DATA_URN]
+    signed = []
+    sign_url = s3_presigned._sign_url   # pylint: disable=protected-access
+    monkeypatch.setattr(s3_presigned, '_sign_url', lambda **kwargs: signed.append(kwargs) or sign_url(**kwargs))
+    s3_presigned.forget_signed_urls()
+
+    url = s3_presigned.make_signed_url(urn=urn)
+    assert s3_presigned.make_signed_url(urn=urn) == url
+    assert len(signed) == 1
+    s3_presigned.make_signed_url(urn=urn, expires=60)
+    assert len(signed) == 2
+    odb_movie_data.write_object(urn, get_movie_bytes(movie_id))   # replacing the object forgets its URLs
+    s3_presigned.make_signed_url(urn=urn)
+    assert len(signed) == 3
+    # Another process may have replaced it: a new object version gets a new URL.
+    s3_presigned.make_signed_url(urn=urn, version=1)
+    assert s3_presigned.make_signed_url(urn=urn, version=1) == s3_presigned.make_signed_url(urn=urn, version=1)
+    s3_presigned.make_signed_url(urn=urn, version=2)
+    assert len(signed) == 5
+    now = s3_presigned.time.time()
+    monkeypatch.setattr(s3_presigned.time, 'time', lambda: now + 3600 - 60)
+    s3_presigned.make_signed_url(urn=urn)
+    assert len(signed) == 6
+    monkeypatch.undo()
+
+    resp = client.post('/api/get-movie-metadata',
+                       data={'api_key': new_movie[API_KEY], 'movie_id': movie_id, 'urls': 'lazy'})
+    lazy_url = resp.get_json()['metadata']['movie_data_url']
+    assert '/api/get-movie-url?' in lazy_url and 'X-Amz-Signature' not in lazy_url
+    resp = client.get(lazy_url + '&api_key=' + new_movie[API_KEY])
+    assert resp.status_code == 302
+    assert resp.headers['Location'] == s3_presigned.make_signed_url(urn=urn)
+    assert requests.get(resp.headers['Location'], timeout=C.DEFAULT_GET_TIMEOUT).content == get_movie_bytes(movie_id)
+
+    resp = client.get('/api/get-movie-url', query_string={'api_key': new_movie[API_KEY], 'movie_id': movie_id,
+                                                          'kind': 'bogus'})
+    assert resp.status_code == 400
+    resp = client.get('/api/get-movie-url', query_string={'api_key': new_movie[API_KEY], 'movie_id': movie_id,
+                                                          'kind': 'traced'})
+    assert resp.status_code == 404
+
+
+def test_movie_metadata_and_trackpoints_answer_304_when_unchanged(client, new_movie, monkeypatch):
+    movie_id = new_movie[MOVIE_ID]
+    assert odb.movie_version_token(odb.get_movie(movie_id=movie_id)) is None   # just written
+    monkeypatch.setattr(C, 'MOVIE_ETAG_SETTLE_SECONDS', -60)
+    data = {'api_key': new_movie[API_KEY], 'movie_id': movie_id}
+
+    resp = client.post('/api/get-movie-metadata', data=data)
+    etag = resp.headers['ETag']
+    resp = client.post('/api/get-movie-metadata', data=data, headers={'If-None-Match': etag})
+    assert resp.status_code == 304 and resp.data == b''
+    resp = client.post('/api/get-movie-metadata', data=dict(data, frame_start=0, frame_count=1),
+                       headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+
+    resp = client.post('/api/get-movie-trackpoints', data=dict(data, format='json'))
+    trackpoints_etag = resp.headers['ETag']
+    assert client.post('/api/get-movie-trackpoints', data=dict(data, format='json'),
+                       headers={'If-None-Match': trackpoints_etag}).status_code == 304
+
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=0,
+                              trackpoints=[Trackpoint(x=10, y=20, label='apex')])
+    resp = client.post('/api/get-movie-metadata', data=data, headers={'If-None-Match': etag})
+    assert resp.status_code == 200 and resp.headers['ETag'] != etag
+    resp = client.post('/api/get-movie-trackpoints', data=dict(data, format='json'),
+                       headers={'If-None-Match': trackpoints_etag})
+    assert resp.status_code == 200 and len(resp.get_json()['trackpoint_dicts']) == 1
+
+    before = odb.get_movie(movie_id=movie_id)
+    odb.rename_movie_marker(movie_id=movie_id, old_label="apex", new_label="tip")
+    after = odb.get_movie(movie_id=movie_id)
+    assert after[odb.MARKER_MAP_VERSION] == before.get(odb.MARKER_MAP_VERSION, 0) + 1
+    assert odb.movie_version_token(after) != odb.movie_version_token(before)
+
+
+def test_editing_a_tracked_frame_changes_the_etag(client, new_movie, monkeypatch):
+    movie_id = new_movie[MOVIE_ID]
+    monkeypatch.setattr(C, 'MOVIE_ETAG_SETTLE_SECONDS', -60)
+    data = {'api_key': new_movie[API_KEY], 'movie_id': movie_id, 'format': 'json'}
+    ddbo = odb.DDBO()
+    for frame_number in (0, 1):
+        odb.put_frame_trackpoints(movie_id=movie_id, frame_number=frame_number,
+                                  trackpoints=[Trackpoint(x=10, y=20, label='apex')])
+    # Pretend the writes happened a while ago, so a same-second edit cannot hide behind them.
+    ddbo.update_movie(movie_id, {odb.LAST_ACTIVITY_AT: 1}, touch_activity=False)
+    etag = client.post('/api/get-movie-trackpoints', data=data).headers['ETag']
+
+    # Frame 0 is behind last_frame_tracked, so only last_activity_at records the edit.
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=0,
+                              trackpoints=[Trackpoint(x=30, y=40, label='apex')])
+    movie = odb.get_movie(movie_id=movie_id)
+    assert movie[odb.LAST_FRAME_TRACKED] == 1 and movie[odb.LAST_ACTIVITY_AT] > 1
+    resp = client.post('/api/get-movie-trackpoints', data=data, headers={'If-None-Match': etag})
+    assert resp.status_code == 200 and resp.headers['ETag'] != etag
+
+    # Trace flushes leave last_activity_at to finish_movie_trace.
+    ddbo.update_movie(movie_id, {odb.LAST_ACTIVITY_AT: 1}, touch_activity=False)
+    with odb.FrameTrackpointWriter(movie_id=movie_id) as writer:
+        writer.put(frame_number=2, trackpoints=[Trackpoint(x=10, y=20, label='apex')])
+    movie = odb.get_movie(movie_id=movie_id)
+    assert movie[odb.LAST_FRAME_TRACKED] == 2 and movie[odb.LAST_ACTIVITY_AT] == 1
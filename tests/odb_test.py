@@ -5,6 +5,7 @@ import json
 from decimal import Decimal
 
 import pytest
+from boto3.dynamodb.conditions import Key
 
 from app import odb
 from app.odb import (
@@ -43,6 +44,102 @@ def test_update_movie_maintains_last_activity(new_movie):
     assert movie[odb.LAST_ACTIVITY_AT] > 100
 
 
+def test_read_cache_memoizes_reads_and_invalidates_on_write(new_movie):
+    ddbo = new_movie["ddbo"]
+    movie_id = new_movie[MOVIE_ID]
+    user_id = new_movie[USER_ID]
+    assert odb.current_read_cache() is None
+    with odb.read_cache() as cache:
+        movie = ddbo.get_movie(movie_id)
+        movie[odb.TITLE] = "mutated by caller"
+        assert ddbo.get_movie(movie_id)[odb.TITLE] != "mutated by caller"
+        assert ddbo.get_movie(movie_id, fields=[odb.TITLE]) == {odb.TITLE: ddbo.get_movie(movie_id)[odb.TITLE]}
+        ddbo.get_user(user_id)
+        ddbo.get_user(user_id)
+        assert (cache.hits, cache.misses) == (4, 2)
+
+        ddbo.update_movie(movie_id, {odb.TITLE: "Read cache test"})
+        assert ddbo.get_movie(movie_id)[odb.TITLE] == "Read cache test"
+        lock = ddbo.acquire_movie_trace_lock(movie=movie, started_by_user_id=user_id,
+                                             started_by_user_name="tester")
+        assert ddbo.get_movie(movie_id)[odb.TRACE_JOB_ID] == lock.job_id
+        assert cache.misses == 4
+    assert odb.current_read_cache() is None
+
+
+def test_validate_api_key_caches_and_writes_back_usage(new_course):
+    ddbo = new_course["ddbo"]
+    api_key = new_course[API_KEY]
+    before = ddbo.get_api_key_dict(api_key)[odb.USE_COUNT]
+    with odb.read_cache():
+        for _ in range(3):
+            assert odb.validate_api_key(api_key)[USER_ID] == new_course[USER_ID]
+    assert ddbo.get_api_key_dict(api_key)[odb.USE_COUNT] == before
+    assert odb.flush_api_key_usage(force=False) == 0
+    assert odb.flush_api_key_usage() == 1
+    after = ddbo.get_api_key_dict(api_key)
+    assert after[odb.USE_COUNT] == before + 3
+    assert after['last_used_at'] >= after['first_used_at']
+
+    # Disabling the user drops the cached validation.
+    ddbo.update_table(ddbo.users, new_course[USER_ID], {odb.ENABLED: 0})
+    try:
+        with pytest.raises(odb.InvalidAPI_Key):
+            odb.validate_api_key(api_key)
+    finally:
+        ddbo.update_table(ddbo.users, new_course[USER_ID], {odb.ENABLED: 1})
+    assert odb.validate_api_key(api_key)[USER_ID] == new_course[USER_ID]
+
+
+def test_batch_get_users_and_courses_and_login_times(new_course):
+    ddbo = new_course["ddbo"]
+    user_id = new_course[USER_ID]
+    admin_id = new_course["admin_id"]
+    users = ddbo.get_users_batch([user_id, admin_id, "u-missing", user_id])
+    assert set(users) == {user_id, admin_id}
+    assert users[user_id] == ddbo.get_user(user_id)
+    assert ddbo.get_courses_batch([new_course[COURSE_ID], "no such course"]) == {
+        new_course[COURSE_ID]: ddbo.get_course(new_course[COURSE_ID])}
+
+    odb.validate_api_key(new_course[API_KEY])
+    user = ddbo.get_user(user_id)
+    api_key_dict = ddbo.get_api_key_dict(new_course[API_KEY])
+    assert user[odb.FIRST_LOGIN_AT] == api_key_dict['first_used_at']
+    assert user[odb.LAST_LOGIN_AT] == api_key_dict['last_used_at']
+    recs = odb.list_users_courses(user_id=admin_id, course_id=new_course[COURSE_ID])
+    listed = next(u for u in recs[odb.USERS] if u[USER_ID] == user_id)
+    assert (listed['first'], listed['last']) == (user[odb.FIRST_LOGIN_AT], user[odb.LAST_LOGIN_AT])
+
+
+def test_list_movies_queries_courses_concurrently_and_pages(new_movie):
+    ddbo = new_movie["ddbo"]
+    user_id = new_movie[USER_ID]
+    course_id = 'list-movies-' + rand8()
+    odb.create_course(course_id=course_id, course_name=course_id, course_key='test-' + rand8())
+    movie_ids = []
+    try:
+        odb.register_email(new_movie["user_email"], 'Course User', course_id=course_id)
+        movie_ids = [odb.create_new_movie(user_id=user_id, course_id=course_id, title=f"movie {i}", description="")
+                     for i in range(3)]
+        listed = odb.list_movies(user_id=user_id, fields=odb.MOVIE_LIST_FIELDS)
+        assert {new_movie[MOVIE_ID], *movie_ids} <= {movie[MOVIE_ID] for movie in listed}
+        assert all(set(movie) <= set(odb.MOVIE_LIST_FIELDS) for movie in listed)
+        assert odb.MOVIE_DATA_URN in odb.list_movies(user_id=user_id, course_id=new_movie[COURSE_ID])[0]
+
+        page1, marker = ddbo.query_movies_for_course_id(course_id, fields=[MOVIE_ID], limit=2)
+        page2, marker2 = ddbo.query_movies_for_course_id(course_id, fields=[MOVIE_ID], limit=2,
+                                                          exclusive_start_key=marker)
+        assert len(page1) == 2 and marker is not None
+        assert {movie[MOVIE_ID] for movie in page1 + page2} == set(movie_ids)
+        assert page1[0] == {MOVIE_ID: page1[0][MOVIE_ID]}
+        if marker2:
+            assert ddbo.query_movies_for_course_id(course_id, exclusive_start_key=marker2)[0] == []
+    finally:
+        ddbo.batch_delete_movie_ids(movie_ids)
+        odb.unregister_from_course(course_id=course_id, user_id=user_id)
+        odb.delete_course(course_id=course_id)
+
+
 def test_movie_trace_lease_lifecycle(new_movie):
     ddbo = new_movie["ddbo"]
     movie_id = new_movie[MOVIE_ID]
@@ -67,6 +164,32 @@ def test_movie_trace_lease_lifecycle(new_movie):
     assert ddbo.get_movie(movie_id)[odb.MOVIE_STATUS] == odb.MOVIE_STATE_TRACING_COMPLETED
 
 
+def test_frame_trackpoint_writer_batches_frames(new_movie):
+    ddbo = new_movie["ddbo"]
+    movie_id = new_movie[MOVIE_ID]
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=0,
+                              trackpoints=[Trackpoint(x=1, y=2, label="apex", frame_number=0)])
+    ddbo.put_movie_frame({MOVIE_ID: movie_id, odb.FRAME_NUMBER: 2,
+                         odb.TRACKPOINT_MIGRATION_ORIGIN: odb.TRACKPOINT_ORIGIN_BOTTOM_LEFT})
+
+    with odb.FrameTrackpointWriter(movie_id=movie_id, max_frames=3, max_seconds=3600) as writer:
+        for frame_number in range(1, 5):
+            writer.put(frame_number=frame_number,
+                       trackpoints=[Trackpoint(x=frame_number, y=2, label="apex", frame_number=frame_number)])
+        # Three frames were flushed by the size threshold; frame 4 is still buffered.
+        assert ddbo.get_movie(movie_id)[LAST_FRAME_TRACKED] == 3
+        assert "trackpoints" not in (ddbo.get_movie_frame(movie_id, 4) or {})
+
+    assert ddbo.get_movie(movie_id)[LAST_FRAME_TRACKED] == 4
+    assert ddbo.get_movie_frame(movie_id, 2)[odb.TRACKPOINT_MIGRATION_ORIGIN] == odb.TRACKPOINT_ORIGIN_BOTTOM_LEFT
+    marker_id = ddbo.get_movie_frame(movie_id, 0)["trackpoints"][0][odb.MARKER_ID]
+    for frame_number in range(1, 5):
+        (trackpoint,) = ddbo.get_movie_frame(movie_id, frame_number)["trackpoints"]
+        assert trackpoint[odb.MARKER_ID] == marker_id
+        assert trackpoint["x"] == frame_number
+    assert [tp["frame_number"] for tp in odb.get_movie_trackpoints(movie_id=movie_id)] == [0, 1, 2, 3, 4]
+
+
 def test_movie_trace_lease_rejects_an_active_owner_and_logs_failure(new_movie):
     ddbo = new_movie["ddbo"]
     movie = ddbo.get_movie(new_movie[MOVIE_ID])
@@ -586,12 +709,15 @@ def test_clear_movie_tracking_after_frame(local_ddb):
             trackpoints=[Trackpoint(x=10 + frame_number, y=20 + frame_number, label=label)],
         )
 
-    deleted = odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=0)
-    assert deleted == 2
+    assert odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=0) == 1
     assert odb.last_tracked_movie_frame(movie_id=movie_id) == 0
     assert odb.get_movie_trackpoints(movie_id=movie_id) == [
         {'frame_number': 0, 'x': 10, 'y': 20, 'label': 'frame0'}
     ]
+    assert odb.purge_superseded_trackpoints(movie_id=movie_id) == 2
+    assert odb.get_movie_trackpoints(movie_id=movie_id) == [
+        {'frame_number': 0, 'x': 10, 'y': 20, 'label': 'frame0'}
+    ]
 
 
 def test_clear_movie_tracking_after_frame_respects_frame_end(local_ddb):
@@ -603,9 +729,8 @@ def test_clear_movie_tracking_after_frame_respects_frame_end(local_ddb):
             trackpoints=[Trackpoint(x=10 + frame_number, y=20 + frame_number, label=f'frame{frame_number}')],
         )
 
-    deleted = odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=0, frame_end=1)
-
-    assert deleted == 1
+    assert odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=0, frame_end=1) == 1
+    assert odb.purge_superseded_trackpoints(movie_id=movie_id) == 1
     assert odb.get_movie_trackpoints(movie_id=movie_id) == [
         {'frame_number': 0, 'x': 10, 'y': 20, 'label': 'frame0'},
         {'frame_number': 2, 'x': 12, 'y': 22, 'label': 'frame2'},
@@ -613,6 +738,166 @@ def test_clear_movie_tracking_after_frame_respects_frame_end(local_ddb):
     ]
 
 
+@pytest.mark.parametrize('storage', [odb.TRACKPOINT_STORAGE_FRAMES, odb.TRACKPOINT_STORAGE_COLUMNAR])
+def test_retrace_supersedes_trackpoints_by_generation_and_purges_later(local_ddb, monkeypatch, mocker, storage):
+    monkeypatch.setattr(odb.C, 'TRACKPOINT_CHUNK_FRAMES', 4)
+    movie_id = create_trim_test_movie(local_ddb, total_frames=16)
+    for frame_number in range(16):
+        if frame_number != 6:
+            odb.put_frame_trackpoints(movie_id=movie_id, frame_number=frame_number,
+                                      trackpoints=[Trackpoint(x=frame_number, y=1, label='Apex')])
+    odb.set_movie_trackpoint_storage(movie_id=movie_id, storage=storage)
+    frame_reads = [mocker.spy(odb, 'iter_movie_frames_in_range'), mocker.spy(odb, 'iter_trackpoint_chunks'),
+                   mocker.spy(odb.DDBO, 'tracked_frame_keys'), mocker.spy(odb.DDBO, 'get_frames')]
+
+    # Frames 3..12 are superseded by one update of the movie; no frame is read or written.
+    assert odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=2, frame_end=12) == 1
+    assert all(spy.call_count == 0 for spy in frame_reads)
+    assert [tp['frame_number'] for tp in odb.get_movie_trackpoints(movie_id=movie_id)] == [0, 1, 2, 13, 14, 15]
+    assert odb.last_tracked_movie_frame(movie_id=movie_id) == 15
+
+    # The retrace writes at the new generation, so its frames are current.
+    with odb.FrameTrackpointWriter(movie_id=movie_id) as writer:
+        writer.put(frame_number=3, trackpoints=[Trackpoint(x=99, y=1, label='Apex')])
+    tracked = odb.get_movie_trackpoints(movie_id=movie_id)
+    assert [(tp['frame_number'], tp['x']) for tp in tracked[:5]] == [(0, 0), (1, 1), (2, 2), (3, 99), (13, 13)]
+
+    assert odb.purge_superseded_trackpoints(movie_id=movie_id) == 8
+    assert odb.TRACKPOINT_INVALIDATIONS not in local_ddb.get_movie(movie_id)
+    assert odb.get_movie_trackpoints(movie_id=movie_id) == tracked
+    if storage == odb.TRACKPOINT_STORAGE_COLUMNAR:
+        chunks = odb.iter_trackpoint_chunks(local_ddb.movie_frames, movie_id, 0, odb.TRACKPOINT_CHUNK_MAX)
+        assert [chunk for chunk, _ in chunks] == [0, 3]
+    else:
+        assert [int(key[odb.FRAME_NUMBER]) for key in local_ddb.tracked_frame_keys(movie_id, 0)] == [0, 1, 2, 3, 13, 14, 15]
+
+    assert odb.clear_movie_tracking(movie_id) == 2
+    assert odb.get_movie_trackpoints(movie_id=movie_id) == []
+    assert odb.last_tracked_movie_frame(movie_id=movie_id) is None
+    assert odb.purge_superseded_trackpoints(movie_id=movie_id) == 7
+
+
+def test_trackpoint_chunk_encoding_round_trips():
+    frames = {
+        0: [{'x': 1, 'y': 2, 'label': 'Apex', odb.MARKER_ID: 'm1', 'color': 'red'},
+            {'x': 3, 'y': 4, 'label': 'Ruler', odb.MARKER_ID: 'm2', 'status': 0}],
+        1: [{'x': 5, 'y': 6, 'label': 'Apex', odb.MARKER_ID: 'm1', 'color': 'red'}],
+        2: [{'x': 7, 'y': 8, 'label': 'Apex', odb.MARKER_ID: 'm1', 'color': 'red', 'err': 1},
+            {'x': 9, 'y': 10, 'label': 'Ruler', odb.MARKER_ID: 'm2', 'status': 1}],
+    }
+    chunk = odb.encode_trackpoint_chunk(frames)
+    assert len(chunk[odb.CHUNK_COLUMNS]) == 2
+    apex, ruler = chunk[odb.CHUNK_COLUMNS][0], chunk[odb.CHUNK_COLUMNS][1]
+    assert apex['x'] == [1, 5, 7] and odb.CHUNK_OFFSETS not in apex
+    assert apex[odb.CHUNK_CONSTANTS] == {'color': 'red', 'label': 'Apex'}
+    assert apex[odb.CHUNK_VALUES] == {'err': [None, None, 1]}
+    assert ruler[odb.CHUNK_OFFSETS] == [0, 2]
+    assert ruler[odb.CHUNK_VALUES] == {'status': [0, 1]}
+    assert odb.decode_trackpoint_chunk(chunk) == frames
+    assert odb.decode_trackpoint_chunk(odb.encode_trackpoint_chunk({5: []})) == {5: []}
+
+
+def test_columnar_trackpoint_storage(local_ddb, monkeypatch):
+    monkeypatch.setattr(odb.C, 'TRACKPOINT_CHUNK_FRAMES', 4)
+    movie_id = create_trim_test_movie(local_ddb, total_frames=12)
+    for frame_number in range(6):
+        odb.put_frame_trackpoints(
+            movie_id=movie_id,
+            frame_number=frame_number,
+            trackpoints=[Trackpoint(x=10 + frame_number, y=20, label='Apex', color='red'),
+                         Trackpoint(x=30, y=40 + frame_number, label='Ruler 0mm', undeletable=True)],
+        )
+    before = odb.get_movie_trackpoints(movie_id=movie_id)
+
+    assert odb.set_movie_trackpoint_storage(movie_id=movie_id, storage=odb.TRACKPOINT_STORAGE_COLUMNAR) == 6
+    assert local_ddb.get_movie(movie_id)[odb.TRACKPOINT_STORAGE] == odb.TRACKPOINT_STORAGE_COLUMNAR
+    assert all('trackpoints' not in frame for frame in local_ddb.get_frames(movie_id))
+    chunks = list(odb.iter_trackpoint_chunks(local_ddb.movie_frames, movie_id, 0, odb.TRACKPOINT_CHUNK_MAX))
+    assert [chunk for chunk, _ in chunks] == [0, 1]
+    assert odb.get_movie_trackpoints(movie_id=movie_id) == before
+    assert odb.get_movie_trackpoints(movie_id=movie_id, frame_start=3, frame_end=4) == before[6:10]
+
+    with odb.FrameTrackpointWriter(movie_id=movie_id, max_frames=3, max_seconds=3600) as writer:
+        for frame_number in range(6, 10):
+            writer.put(frame_number=frame_number,
+                       trackpoints=[Trackpoint(x=frame_number, y=2, label='Apex', frame_number=frame_number)])
+    assert odb.last_tracked_movie_frame(movie_id=movie_id) == 9
+    assert odb.get_frame_trackpoints(movie_id=movie_id, frame_number=9)[0]['x'] == 9
+
+    odb.rename_movie_marker(movie_id=movie_id, old_label='Apex', new_label='Tip')
+    assert {tp['label'] for tp in odb.get_movie_trackpoints(movie_id=movie_id)} == {'Tip', 'Ruler 0mm'}
+
+    assert odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=4) == 1
+    assert odb.last_tracked_movie_frame(movie_id=movie_id) == 4
+    assert odb.purge_superseded_trackpoints(movie_id=movie_id) == 5
+    chunks = list(odb.iter_trackpoint_chunks(local_ddb.movie_frames, movie_id, 0, odb.TRACKPOINT_CHUNK_MAX))
+    assert [chunk for chunk, _ in chunks] == [0, 1]
+
+    tracked = odb.get_movie_trackpoints(movie_id=movie_id)
+    assert odb.set_movie_trackpoint_storage(movie_id=movie_id, storage=odb.TRACKPOINT_STORAGE_FRAMES) == 5
+    assert not list(odb.iter_trackpoint_chunks(local_ddb.movie_frames, movie_id, 0, odb.TRACKPOINT_CHUNK_MAX))
+    assert odb.get_movie_trackpoints(movie_id=movie_id) == tracked
+
+    odb.set_movie_trackpoint_storage(movie_id=movie_id, storage=odb.TRACKPOINT_STORAGE_COLUMNAR)
+    odb.clear_movie_tracking(movie_id)
+    assert odb.get_movie_trackpoints(movie_id=movie_id) == []
+    assert odb.last_tracked_movie_frame(movie_id=movie_id) is None
+
+
+def test_last_frame_tracked_is_maintained_and_checked(local_ddb):
+    movie_id = create_trim_test_movie(local_ddb, total_frames=8)
+    for frame_number in range(6):
+        local_ddb.put_movie_frame({MOVIE_ID: movie_id, odb.FRAME_NUMBER: frame_number,
+                                   'frame_urn': f"s3://bogus/{frame_number}.jpg"})
+    for frame_number in (0, 1, 3):
+        odb.put_frame_trackpoints(movie_id=movie_id, frame_number=frame_number,
+                                  trackpoints=[Trackpoint(x=frame_number, y=2, label='Apex')])
+    assert local_ddb.get_movie(movie_id)[LAST_FRAME_TRACKED] == 3
+
+    def indexed_frames():
+        response = local_ddb.movie_frames.query(IndexName=odb.MOVIE_TRACKED_FRAMES_IDX,
+                                                KeyConditionExpression=Key(MOVIE_ID).eq(movie_id))
+        return [int(item[odb.FRAME_NUMBER]) for item in response['Items']]
+    assert indexed_frames() == [0, 1, 3]
+
+    # A bounded retrace keeps the frames after it; the frontier returns to them once it is done.
+    odb.clear_movie_tracking_after_frame(movie_id=movie_id, frame_number=0, frame_end=1)
+    assert local_ddb.get_movie(movie_id)[LAST_FRAME_TRACKED] == 0
+    assert odb.purge_superseded_trackpoints(movie_id=movie_id) == 1
+    assert indexed_frames() == [0, 3]
+    assert odb.refresh_last_frame_tracked(movie_id=movie_id) == 3
+    assert local_ddb.get_movie(movie_id)[LAST_FRAME_TRACKED] == 3
+    with odb.FrameTrackpointWriter(movie_id=movie_id) as writer:
+        writer.put(frame_number=1, trackpoints=[Trackpoint(x=1, y=2, label='Apex')])
+    assert local_ddb.get_movie(movie_id)[LAST_FRAME_TRACKED] == 3
+
+    # A frame written without the index key, as before the index existed, is found and repaired.
+    local_ddb.movie_frames.put_item(Item={MOVIE_ID: movie_id, odb.FRAME_NUMBER: 5,
+                                          'trackpoints': [{'x': 5, 'y': 2, 'label': 'Apex'}]})
+    assert odb.check_last_frame_tracked(movie_id=movie_id) == {
+        MOVIE_ID: movie_id, 'stored': 3, 'actual': 5, 'mistagged_frames': 1, 'tracing': False}
+    assert local_ddb.get_movie(movie_id)[LAST_FRAME_TRACKED] == 3
+    assert odb.check_last_frame_tracked(movie_id=movie_id, repair=True)['mistagged_frames'] == 1
+    assert indexed_frames() == [0, 1, 3, 5]
+    assert local_ddb.get_movie(movie_id)[LAST_FRAME_TRACKED] == 5
+    assert odb.check_last_frame_tracked(movie_id=movie_id)['mistagged_frames'] == 0
+
+    odb.set_movie_metadata(movie_id=movie_id, movie_metadata={LAST_FRAME_TRACKED: None})
+    assert odb.get_movie_metadata(movie_id=movie_id, get_last_frame_tracked=True)[LAST_FRAME_TRACKED] == 5
+
+
+def test_last_tracked_frame_of_a_movie_written_before_the_index(local_ddb):
+    movie_id = create_trim_test_movie(local_ddb, total_frames=4)
+    for frame_number in range(4):
+        item = {MOVIE_ID: movie_id, odb.FRAME_NUMBER: frame_number, 'frame_urn': f"s3://bogus/{frame_number}.jpg"}
+        if frame_number < 3:
+            item['trackpoints'] = [{'x': frame_number, 'y': 2, 'label': 'Apex'}]
+        local_ddb.movie_frames.put_item(Item=item)
+    assert not local_ddb.movie_frames.query(IndexName=odb.MOVIE_TRACKED_FRAMES_IDX,
+                                            KeyConditionExpression=Key(MOVIE_ID).eq(movie_id))['Items']
+    assert odb.last_tracked_movie_frame(movie_id=movie_id) == 2
+
+
 def test_movie_trim_defaults_validate_and_filter_trackpoints(local_ddb):
     movie_id = create_trim_test_movie(local_ddb, total_frames=3)
     metadata = odb.movie_metadata_with_trim_defaults(odb.get_movie(movie_id=movie_id))
@@ -33,7 +33,7 @@ def test_load_table_configurations_reads_json_table_contract():
         index[odbmaint.IndexName]
         for index in movies[odbmaint.GlobalSecondaryIndexes]
     }
-    assert movie_index_names == {"course_id_idx", "user_id_idx"}
+    assert movie_index_names == {"course_id_idx", "user_id_idx", "course_activity_idx"}
 
 
 def test_load_table_configurations_returns_independent_copies():
@@ -72,3 +72,24 @@ def test_create_tables_reports_creation_progress(local_ddb, monkeypatch):
             assert f"[{table_number}/8] Already exists: {prefix + table_name}" in messages
     finally:
         odbmaint.drop_tables(silent_warnings=True)
+
+
+def test_create_missing_indexes_adds_indexes_to_existing_tables(local_ddb, monkeypatch):
+    prefix = f"indexes-{uuid.uuid4()}-"
+    messages = []
+    monkeypatch.setenv(C.DYNAMODB_TABLE_PREFIX, prefix)
+    monkeypatch.setattr(C, "TABLE_CREATE_SLEEP_TIME", 0)
+
+    try:
+        odbmaint.create_tables(status=messages.append)
+        client = local_ddb.resource().meta.client
+        client.update_table(TableName=prefix + "movies",
+                            GlobalSecondaryIndexUpdates=[{"Delete": {"IndexName": "course_activity_idx"}}])
+
+        messages.clear()
+        assert odbmaint.create_missing_indexes(status=messages.append) == ["course_activity_idx"]
+        assert messages == [f"Creating index course_activity_idx on {prefix}movies..."]
+        indexes = client.describe_table(TableName=prefix + "movies")["Table"]["GlobalSecondaryIndexes"]
+        assert "course_activity_idx" in {index["IndexName"] for index in indexes}
+    finally:
+        odbmaint.drop_tables(silent_warnings=True)
@@ -6,10 +6,11 @@ import xml.etree.ElementTree as ET
 from decimal import Decimal
 
 import pytest
+import requests
 from PIL import Image
 from pydantic import ValidationError
 
-from app import odb, schema
+from app import flask_api, odb, schema
 from app import odb_movie_data
 from app.odb import (
     API_KEY,
@@ -172,6 +173,7 @@ def test_put_frame_trackpoints_marks_movie_as_needing_retrace(client, new_movie)
     assert resp.get_json()["error"] is False
     movie = odb.get_movie(movie_id=new_movie[MOVIE_ID])
     assert movie[NEEDS_RETRACING] == 1
+    assert movie[odb.TRACED_MOVIE_STALE_FROM] == 0
 
 
 def test_rename_marker_api_renames_stored_trackpoints(client, new_movie):
@@ -561,6 +563,38 @@ def test_xlsx_exports_trackpoints_and_metadata(client, new_movie):
     ]
 
 
+def test_trackpoint_table_pivots_frames_once_into_dense_columns():
+    def frames():
+        yield 0, [{"frame_number": 0, "label": "Apex", "x": 100, "y": 200, "color": "red"}]
+        yield 2, [{"frame_number": 2, "label": "Apex", "x": 110, "y": 190, "status": 0},
+                  {"frame_number": 2, "label": "Base", "x": 30, "y": 40, "err": Decimal("1.5")}]
+        yield 5, [{"frame_number": 5, "label": "Base", "x": Decimal("35.5"), "y": 40}]
+
+    table = flask_api._TrackpointTable(frames())  # pylint: disable=protected-access
+
+    assert table.frame_numbers == [0, 2, 5]
+    assert table.labels == ["Apex", "Base"]
+    assert len(table.trackpoint_dicts) == 4
+    assert table.rows(False, 1) == [
+        {"frame_number": 0, "Apex x (px)": 100, "Apex y (px)": 200},
+        {"frame_number": 2, "Apex x (px)": 110, "Apex y (px)": 190, "Base x (px)": 30, "Base y (px)": 40},
+        {"frame_number": 5, "Base x (px)": 35.5, "Base y (px)": 40},
+    ]
+    assert table.rows(True, 0.1)[2] == {"frame_number": 5, "Base x (mm)": 3.55, "Base y (mm)": 4.0}
+    summary = table.marker_summary_rows()
+    apex, base = summary[0], summary[1]
+    assert (apex["first_frame"], apex["last_frame"], apex["trackpoint_count"]) == (0, 2, 2)
+    assert (apex["color"], apex["status_values_seen"]) == ("red", "0")
+    assert (base["first_frame"], base["last_frame"], base["error_values_seen"]) == (2, 5, "1.5")
+    chart = table.chart_data(None, 1, False)
+    assert chart["marker_labels"] == ["Apex", "Base"]
+    assert [list(row.values()) for row in chart["rows"]] == [
+        [0, 0.0, 0.0, "", ""],
+        [2, 10.0, -10.0, 0.0, 0.0],
+        [5, "", "", 5.5, 0.0],
+    ]
+
+
 def test_xlsx_trackpoint_download_respects_trim_bounds(client, new_movie):
     movie_id = new_movie[MOVIE_ID]
     odb.set_movie_metadata(movie_id=movie_id, movie_metadata={
@@ -589,6 +623,95 @@ def test_xlsx_trackpoint_download_respects_trim_bounds(client, new_movie):
     ]
 
 
+def test_csv_export_streams_and_matches_xlsx_rows(client, new_movie, monkeypatch):
+    movie_id = new_movie[MOVIE_ID]
+    odb.set_movie_metadata(movie_id=movie_id, movie_metadata={HEIGHT: 480, "total_frames": 4})
+    # Rulers first appear on frame 1; a label appears only on frame 3; Gone stays in the marker map
+    # after its only point is removed, and gets no columns.
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=0,
+                              trackpoints=[Trackpoint(x=Decimal(5), y=Decimal(5), label="Gone")])
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=0,
+                              trackpoints=[Trackpoint(x=Decimal(100), y=Decimal(200), label="Apex")])
+    for frame_number in (1, 2, 3):
+        trackpoints = [
+            Trackpoint(x=Decimal(100 + frame_number), y=Decimal(200), label="Apex"),
+            Trackpoint(x=Decimal(10), y=Decimal(10), label="Ruler 0mm"),
+            Trackpoint(x=Decimal(10), y=Decimal(110), label="Ruler 10mm"),
+        ]
+        if frame_number == 3:
+            trackpoints.append(Trackpoint(x=Decimal(30), y=Decimal(40), label="Base"))
+        odb.put_frame_trackpoints(movie_id=movie_id, frame_number=frame_number, trackpoints=trackpoints)
+    # Send one row per chunk, and finish the header with a scan because Base comes after the read-ahead.
+    monkeypatch.setattr(odb.C, "TRACKPOINT_EXPORT_CHUNK_BYTES", 1)
+    monkeypatch.setattr(odb.C, "TRACKPOINT_EXPORT_LOOKAHEAD_FRAMES", 2)
+
+    data = {API_KEY: new_movie[API_KEY], MOVIE_ID: movie_id}
+    resp = client.post("/api/get-movie-trackpoints", data=data)
+    assert resp.status_code == 200 and resp.is_streamed
+    csv_rows = list(csv.reader(io.StringIO(resp.data.decode("utf-8"))))
+    xlsx_rows = _xlsx_rows(client.post("/api/get-movie-trackpoints", data=dict(data, format="xlsx")).data,
+                           "xl/worksheets/sheet1.xml")
+
+    assert csv_rows[0] == xlsx_rows[0] == [
+        "frame_number", "Apex x (mm)", "Apex y (mm)", "Base x (mm)", "Base y (mm)",
+        "Ruler 0mm x (px)", "Ruler 0mm y (px)", "Ruler 10mm x (px)", "Ruler 10mm y (px)",
+    ]
+    assert len(csv_rows) == 5
+    assert csv_rows[1] == ["0", "10.0", "20.0", "", "", "", "", "", ""]
+    assert csv_rows[4] == ["3", "10.3", "20.0", "3.0", "4.0", "10", "10", "10", "110"]
+    for csv_row, xlsx_row in zip(csv_rows[1:], xlsx_rows[1:]):
+        assert [float(value) for value in csv_row if value] == [float(value) for value in xlsx_row if value != ""]
+    # The header is the first chunk.
+    first_chunk = next(iter(client.post("/api/get-movie-trackpoints", data=data).response))
+    assert first_chunk.decode("utf-8") == ",".join(csv_rows[0]) + "\r\n"
+
+
+def test_settled_exports_are_stored_once_per_version_and_redirected(client, new_movie, mocker, monkeypatch):
+    movie_id = new_movie[MOVIE_ID]
+    odb.set_movie_metadata(movie_id=movie_id, movie_metadata={HEIGHT: 480, "total_frames": 2})
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=0,
+                              trackpoints=[Trackpoint(x=Decimal(100), y=Decimal(200), label="Apex")])
+    data = {API_KEY: new_movie[API_KEY], MOVIE_ID: movie_id}
+    direct_csv = client.post("/api/get-movie-trackpoints", data=data).data
+
+    monkeypatch.setattr(odb.C, "MOVIE_ETAG_SETTLE_SECONDS", -60)
+    render = mocker.spy(flask_api, "_write_trackpoint_export")
+    resp = client.post("/api/get-movie-trackpoints", data=data)
+    assert resp.status_code == 302
+    assert requests.get(resp.headers["Location"], timeout=10).content == direct_csv
+    first_urn = flask_api.export_cache_urn(
+        movie_data_urn=odb.get_movie(movie_id=movie_id)[odb.MOVIE_DATA_URN],
+        version=odb.movie_content_version(odb.get_movie(movie_id=movie_id)),
+        extension="csv",
+    )
+    assert odb_movie_data.object_exists(first_urn)
+    assert client.post("/api/get-movie-trackpoints", data=data).status_code == 302
+    assert render.call_count == 1
+
+    xlsx = client.post("/api/get-movie-trackpoints", data=dict(data, format="xlsx"))
+    assert xlsx.status_code == 302
+    assert _xlsx_rows(requests.get(xlsx.headers["Location"], timeout=10).content,
+                      "xl/worksheets/sheet1.xml")[0] == ["frame_number", "Apex x (px)", "Apex y (px)"]
+
+    # A trackpoint write is a new version: it is rendered again, and the older exports are kept while
+    # a concurrent request may still be redirecting to them...
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=1,
+                              trackpoints=[Trackpoint(x=Decimal(101), y=Decimal(201), label="Apex")])
+    resp = client.post("/api/get-movie-trackpoints", data=data)
+    assert resp.status_code == 302
+    assert len(list(csv.reader(io.StringIO(requests.get(resp.headers["Location"], timeout=10).text)))) == 3
+    assert render.call_count == 3
+    assert odb_movie_data.object_exists(first_urn)
+
+    # ...and removed by a later version once they are old enough.
+    monkeypatch.setattr(odb.C, "TRACKPOINT_EXPORT_KEEP_SECONDS", -60)
+    odb.put_frame_trackpoints(movie_id=movie_id, frame_number=2,
+                              trackpoints=[Trackpoint(x=Decimal(102), y=Decimal(202), label="Apex")])
+    assert client.post("/api/get-movie-trackpoints", data=data).status_code == 302
+    assert render.call_count == 4
+    assert not odb_movie_data.object_exists(first_urn)
+
+
 def test_csv_uses_pixels_when_rulers_at_default_position(client, new_movie):
     movie_id = new_movie[MOVIE_ID]
     height = 480